@@ -0,0 +1,168 @@
+"""
+Created on Mon Oct 19 14:13:18 2026
+
+@author: agent
+@goal: Indexes the analysts of each team and shift by the time they become free (min-heap by fixed_tsp plus the set of free analysts)
+"""
+
+import heapq
+from Code.Utils import Utils
+
+class AnalystAvailability:
+    def __init__(self, analysts_info):
+        """
+        Initiates an AnalystAvailability. Each (team, shift) keeps its active analysts (in the team order), a min-heap of
+        (fixed_tsp, order, analyst) entries and the analysts already free. Heap entries whose fixed_tsp is outdated are skipped when popped.
+
+        Parameters
+        ----------
+        analysts_info : dict
+            Comprises all data about teams and their operators.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.analysts_info = analysts_info
+        self.index = {}
+        for team in analysts_info:
+            self.index[team] = {}
+            shifts = {analysts_info[team]["analysts"][analyst]["shift"] for analyst in analysts_info[team]["analysts"]}
+            for shift in shifts:
+                analysts = Utils.get_operators_in_shift(analysts_info[team], shift)
+                if analysts:
+                    self.index[team][shift] = {"analysts": analysts, "order": {analyst: idx for idx, analyst in enumerate(analysts)}, "heap": [], "free": set()}
+                    self.reset_shift(team, shift)
+
+    def reset_shift(self, team, shift):
+        """
+        Rebuilds the heap of a shift (e.g., when the shift starts and all its analysts get a new fixed_tsp).
+
+        Parameters
+        ----------
+        team : str
+            Team being analyzed.
+        shift : int
+            Work shift.
+
+        Returns
+        -------
+        None.
+
+        """
+        if shift not in self.index[team]:
+            return
+
+        shift_index = self.index[team][shift]
+        analysts = self.analysts_info[team]["analysts"]
+        shift_index["heap"] = [(analysts[analyst]["fixed_tsp"], idx, analyst) for idx, analyst in enumerate(shift_index["analysts"])]
+        heapq.heapify(shift_index["heap"])
+        shift_index["free"] = set()
+
+    def update_analyst(self, team, analyst):
+        """
+        Updates an analyst after its fixed_tsp changed (e.g., the analyst closed a ticket).
+
+        Parameters
+        ----------
+        team : str
+            Team being analyzed.
+        analyst : str
+            Operator updated.
+
+        Returns
+        -------
+        None.
+
+        """
+        data = self.analysts_info[team]["analysts"][analyst]
+        shift_index = self.index[team].get(data["shift"])
+        if shift_index is None or analyst not in shift_index["order"]:
+            return
+
+        shift_index["free"].discard(analyst)
+        heapq.heappush(shift_index["heap"], (data["fixed_tsp"], shift_index["order"][analyst], analyst))
+
+    def get_analysts(self, team, shift):
+        """
+        Gets the active analysts working in a shift.
+
+        Parameters
+        ----------
+        team : str
+            Team being analyzed.
+        shift : int
+            Work shift.
+
+        Returns
+        -------
+        list
+            Operators of the shift (team order).
+
+        """
+        if shift not in self.index[team]:
+            return []
+        return list(self.index[team][shift]["analysts"])
+
+    def get_free_analysts(self, team, shift, tsp):
+        """
+        Gets the analysts of a shift that are free at a timestamp.
+
+        Parameters
+        ----------
+        team : str
+            Team being analyzed.
+        shift : int
+            Work shift.
+        tsp : float
+            Timestamp being analyzed.
+
+        Returns
+        -------
+        list
+            Free operators (team order).
+
+        """
+        if shift not in self.index[team]:
+            return []
+
+        shift_index = self.index[team][shift]
+        analysts = self.analysts_info[team]["analysts"]
+        heap, free = shift_index["heap"], shift_index["free"]
+        while heap and heap[0][0] <= tsp:
+            fixed_tsp, _, analyst = heapq.heappop(heap)
+            if analysts[analyst]["fixed_tsp"] == fixed_tsp:
+                free.add(analyst)
+        # Timestamps may go back (pending tickets), so the free analysts are checked again
+        return sorted((analyst for analyst in free if analysts[analyst]["fixed_tsp"] <= tsp), key=shift_index["order"].get)
+
+    def get_min_endtime(self, team, shift):
+        """
+        Gets the minimum fixed_tsp of the analysts of a shift.
+
+        Parameters
+        ----------
+        team : str
+            Team being analyzed.
+        shift : int
+            Work shift.
+
+        Returns
+        -------
+        float
+            Minimum timestamp (inf if the shift has no analysts).
+
+        """
+        if shift not in self.index[team]:
+            return float('inf')
+
+        shift_index = self.index[team][shift]
+        analysts = self.analysts_info[team]["analysts"]
+        heap = shift_index["heap"]
+        while heap and analysts[heap[0][2]]["fixed_tsp"] != heap[0][0]:
+            heapq.heappop(heap)
+        min_tsp = heap[0][0] if heap else float('inf')
+        for analyst in shift_index["free"]:
+            min_tsp = min(min_tsp, analysts[analyst]["fixed_tsp"])
+        return min_tsp
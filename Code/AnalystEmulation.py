@@ -5,9 +5,11 @@ Created on Mon Feb  6 11:05:57 2023
 """
 
 from Code.Utils import Utils, BufferedRandomChoiceGenerator
+from Code.TreatmentStatistics import TreatmentStatistics
+from Code.AnalystAvailability import AnalystAvailability
 
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 
 class AnalystEmulation:
 
@@ -53,6 +55,10 @@ class AnalystEmulation:
         self.shifts = shifts
         self.ticket_verification_selector = treatment_params["ticket_verification_selector"]
         self.ticket_similarity_selector = treatment_params["ticket_similarity_selector"]
+        self.analyst_selection = treatment_params.get("analyst_selection", "exhaustive")
+        self.analyst_sample_size = treatment_params.get("analyst_sample_size", 3)
+        # Timestamps where the open and queued tickets are snapshotted (test datasets)
+        self.snapshot_cutoffs = sorted(datetime.strptime(cutoff, '%d-%m-%Y %H:%M:%S').replace(tzinfo=timezone.utc).timestamp() for cutoff in treatment_params.get("snapshot_cutoffs", []))
 
         self.analysts_info = analysts_info
         self.family_pool = family_pool
@@ -63,11 +69,40 @@ class AnalystEmulation:
 
         self.aux_data = aux_data
         self.priority_queues = {}
+        self.statistics = TreatmentStatistics(shifts)
 
         for team in self.analysts_info:
             self.priority_queues[team] = {}
             Utils.instantiate_priority_queues(self.aux_data.priority_levels, self.priority_queues[team])
 
+    def snapshot_priority_queues(self, team, tickets_info, cutoff_idx):
+        """
+        Stores the queue priority of the tickets of the team waiting in the priority queues when the treatment reaches a cutoff.
+        The treatment is event based, so the queues are snapshotted right before the first allocation of the team at or after the cutoff: 
+        the priorities are the ones of the last queue update (made when the previous ticket closed), the aging between that update and the cutoff is not applied.
+        The priorities are stored by team and cutoff, so the escalated copies of a ticket keep their own snapshots.
+
+        Parameters
+        ----------
+        team : str
+            Team being analyzed.
+        tickets_info : dict
+            Comprises information about all tickets.
+        cutoff_idx : int
+            Index of the cutoff reached.
+
+        Returns
+        -------
+        None.
+
+        """
+        cutoff_tsp = self.snapshot_cutoffs[cutoff_idx]
+        for priority in self.priority_queues[team]:
+            for ticket_id in self.priority_queues[team][priority]["tickets"]:
+                if tickets_info[ticket_id]["raised_tsp"] <= cutoff_tsp:
+                    tickets_info[ticket_id].setdefault("queue_priorities", {}).setdefault(team, {})[cutoff_idx] = priority
+        Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Priority queues of {team} snapshotted at {cutoff_tsp}')
+
     def update_steps_duration(self, ticket):
         """
         Updates the speed of each analyst-step.
@@ -130,6 +165,7 @@ class AnalystEmulation:
         locked_techniques = Utils.get_locked_techniques(self.special_steps)
         family_subtechniques = Utils.get_family_middle_subtechniques(self.family_steps_pool)
         Utils.set_seed(self.seed)
+        availability = AnalystAvailability(self.analysts_info)
         first_team = list(self.analysts_info.keys())[0]
         last_team = list(self.analysts_info.keys())[-1]
 
@@ -146,48 +182,65 @@ class AnalystEmulation:
                 use_subfamily_action_choices = BufferedRandomChoiceGenerator([True, False], [self.analyst_subfamily_action_probability, 1 - self.analyst_subfamily_action_probability], 5000)
                 use_same_action_choices = BufferedRandomChoiceGenerator([True, False], [self.analyst_same_action_probability, 1 - self.analyst_same_action_probability], 5000)
                 original_keys = list(tickets_updated.keys())
+                next_cutoff = 0
 
-                curr_shift = Utils.get_ticket_shift(tickets_updated[curr_id]["allocated"].time(), self.shifts)
+                curr_shift = Utils.get_ticket_shift(tickets_updated[curr_id]["allocated_tsp"], self.shifts)
                 prev_shift = curr_shift
-                analysts_in_shift = Utils.get_operators_in_shift(self.analysts_info[team], curr_shift)
+                analysts_in_shift = availability.get_analysts(team, curr_shift)
         
                 while curr_id != None:   
                     print("Ticket id:", curr_id)
-                    Utils.update_analysts_in_next_shift(self.analysts_info[team]["analysts"], team, tickets_updated[curr_id]["allocated"], prev_shift, curr_shift, self.analysts_info, None, self.shifts, self.aux_data)
-                    Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Ticket id: {curr_id}, Allocated: {tickets_updated[curr_id]["allocated"]}, Priority: {tickets_updated[curr_id]["priority"]}')
+                    Utils.update_analysts_in_next_shift(self.analysts_info[team]["analysts"], team, tickets_updated[curr_id]["allocated_tsp"], prev_shift, curr_shift, self.analysts_info, None, self.shifts, self.aux_data)
+                    if prev_shift != curr_shift:
+                        availability.reset_shift(team, curr_shift)
+                    while next_cutoff < len(self.snapshot_cutoffs) and tickets_updated[curr_id]["allocated_tsp"] >= self.snapshot_cutoffs[next_cutoff]:
+                        self.snapshot_priority_queues(team, tickets_updated, next_cutoff)
+                        next_cutoff += 1
+                    Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Ticket id: {curr_id}, Allocated: {tickets_updated[curr_id]["allocated_tsp"]}, Priority: {tickets_updated[curr_id]["priority"]}')
 
                     if team == first_team:
                         Utils.check_escalated_similar_tickets(curr_id, tickets_updated, tickets_inheritance, self.ticket_similarity_selector, self.subfamily_pool, last_team, self.aux_data)
                     
-                    ticket_closed, close_shift = self.assign_analyst(curr_id, curr_shift, analysts_in_shift, tickets_updated, self.priority_queues, tickets_inheritance, locked_techniques, mode, use_subfamily_action_choices, use_same_action_choices, family_subtechniques)
+                    with self.aux_data.report.span("assign_analyst"):
+                        ticket_closed, close_shift = self.assign_analyst(curr_id, curr_shift, analysts_in_shift, availability, tickets_updated, self.priority_queues, tickets_inheritance, locked_techniques, mode, use_subfamily_action_choices, use_same_action_choices, family_subtechniques)
 
                     if ticket_closed:    
                         Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, "Ticket closed")
+                        self.aux_data.report.count("tickets_processed")
                         self.update_ticket_transfer_ticket(tickets_updated[curr_id], family_subtechniques)
+                        self.aux_data.report.observe("ticket_duration", tickets_updated[curr_id]["duration_outlier"])
+                        self.statistics.add_ticket(tickets_updated[curr_id])
                         Utils.update_analyst_data(tickets_updated[curr_id], curr_id, self.analysts_info)
+                        availability.update_analyst(team, tickets_updated[curr_id]["analyst"])
                         Utils.remove_ticket_priority_queue(tickets_updated[curr_id], self.priority_queues)
                         self.update_steps_duration(tickets_updated[curr_id])
                         self.update_analysts_skill(tickets_updated[curr_id], self.analysts_info, self.subfamily_steps_speeds)
 
-                        Utils.check_pending_tickets_priorities(self.analysts_info, analysts_in_shift, team, tickets_updated[curr_id]["allocated_tsp"], tickets_updated, self.priority_queues, self.aux_data)   
+                        Utils.check_pending_tickets_priorities(availability, curr_shift, team, tickets_updated[curr_id]["allocated_tsp"], tickets_updated, self.priority_queues, self.aux_data)   
                         Utils.update_family_resolution(tickets_updated[curr_id], families_resolution)
                 
                         if tickets_updated[curr_id]["replication_status"] != None:
                             Utils.debug_and_log_data(True, self.aux_data.logger, f'Ticket {curr_id} will be replicated due to {tickets_updated[curr_id]["replication_status"]}')
                             n_replicated = Utils.replicate_ticket(self.analysts_info.keys(), tickets_updated[curr_id], tickets, self.priority_queues, n_replicated, self.aux_data)
+                            self.aux_data.report.count("replications")
                             
                     prev_shift = curr_shift
-                    curr_id, original_dict_idx, curr_shift, analysts_in_shift = Utils.get_next_ticket(tickets_updated[curr_id], close_shift, curr_shift, analysts_in_shift, original_dict_idx, tickets_updated, original_keys, self.analysts_info, self.priority_queues, families_resolution[team], self.shifts, self.aux_data)
+                    if self.aux_data.report.enabled:
+                        self.aux_data.report.observe("queue_depth", sum(len(self.priority_queues[team][priority]["tickets"]) for priority in self.priority_queues[team]))
+                    with self.aux_data.report.span("get_next_ticket"):
+                        curr_id, original_dict_idx, curr_shift, analysts_in_shift = Utils.get_next_ticket(tickets_updated[curr_id], close_shift, curr_shift, analysts_in_shift, original_dict_idx, tickets_updated, original_keys, availability, self.priority_queues, families_resolution[team], self.shifts, self.aux_data)
 
                 wait_time, curr_time = Utils.get_function_time_spent(initial_time)
                 Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Number of Replicated Tickets: {n_replicated}. \nTime spent in treating the tickets: {wait_time} seconds')
                 Utils.check_next_existing_teams(tickets, team)
 
-        tickets_processed = Utils.process_tickets_solved(tickets, list(self.analysts_info.keys()), self.subfamily_pool, self.aux_data.logger)
+        Utils.set_tickets_dates(tickets)
+        with self.aux_data.report.span("merge_team_tickets"):
+            tickets_processed = Utils.process_tickets_solved(tickets, list(self.analysts_info.keys()), self.subfamily_pool, self.aux_data.logger)
         #print("Aqui:", tickets_processed)
         return tickets_processed, family_subtechniques
    
-    def assign_analyst(self, ticket_id, curr_shift, analysts_in_shift, tickets_info, priority_queues, tickets_inheritance, locked, mode, use_subfamily_action_choices, use_same_action_choices, family_subtechniques):
+    def assign_analyst(self, ticket_id, curr_shift, analysts_in_shift, availability, tickets_info, priority_queues, tickets_inheritance, locked, mode, use_subfamily_action_choices, use_same_action_choices, family_subtechniques):
         """
         Assigns an analyst and action after assessing the operators and actions available for ticket treatment
 
@@ -199,6 +252,8 @@ class AnalystEmulation:
             Work shift being analyzed.
         analysts_in_shift : list
             Operators working in the work shift analyzed.
+        availability : AnalystAvailability
+            Analysts of each team and shift indexed by the time they become free.
         tickets_info : dict
             Comprises information about all tickets.
         priority_queues : dict
@@ -208,7 +263,8 @@ class AnalystEmulation:
         locked : dict
             List of techniques that can not be used for operator-action generation, like initiate, end, and transfer steps.
         mode : int
-            0 - Find first free operator; else - find next fastest operator.
+            0 - Find first free operator; else - find next fastest operator. With the lazy analyst selection,
+            mode 0 stops at the first valid operator and the other modes at analyst_sample_size valid operators.
         use_subfamily_action_choices : BufferedRandomChoiceGenerator            
             Generator that tells whether an operator should use the subfamily action or not.
         use_same_action_choices : BufferedRandomChoiceGenerator
@@ -226,22 +282,25 @@ class AnalystEmulation:
         """
         ticket_tsp = tickets_info[ticket_id]["allocated_tsp"]   
         if analysts_in_shift:
-            analysts_free = Utils.get_free_analysts_tsp(self.analysts_info[tickets_info[ticket_id]["team"]]["analysts"], analysts_in_shift, ticket_tsp, self.aux_data, False)
+            analysts_free = Utils.get_free_analysts_tsp(availability, tickets_info[ticket_id]["team"], curr_shift, ticket_tsp, self.aux_data)
             if analysts_free:
                 Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Operators available in shift: {analysts_free}')
-                ticket_date = tickets_info[ticket_id]["allocated"]
                 analysts_available = []
                 close_shift = False
                 
-                for analyst in analysts_free:
+                if self.analyst_selection == "lazy":
+                    # Candidates are drawn in random order and evaluated until the first valid one (or a sample of the fastest mode) is found
+                    candidates = random.sample(analysts_free, len(analysts_free))
+                    max_available = 1 if mode == 0 else self.analyst_sample_size
+                else:
+                    candidates, max_available = analysts_free, len(analysts_free)
+
+                for analyst in candidates:
                     Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Current analyst: {analyst}')
-                    analyst_sol, sol_status, new_action = self.check_next_analyst_action(tickets_info[ticket_id], analyst, self.subfamily_analysts_action, locked, use_subfamily_action_choices, use_same_action_choices)
-                    act_dur, transitions = Utils.get_action_duration(tickets_info[ticket_id]["family"], analyst_sol, tickets_info[ticket_id]["team"], analyst, self.subfamily_steps_speeds[tickets_info[ticket_id]["subfamily"]][tickets_info[ticket_id]["team"]][analyst], self.family_steps_pool, family_subtechniques, self.aux_data)
-                    
-                    valid_operator = self.check_valid_analyst(tickets_info, ticket_date, tickets_info[ticket_id]["subfamily"], tickets_info[ticket_id]["team"], analyst, act_dur, tickets_info[ticket_id]["outlier"])
-                    if valid_operator:
-                        self.update_subfamily_data(tickets_info[ticket_id]["subfamily"], tickets_info[ticket_id]["family"], tickets_info[ticket_id]["team"], analyst, analyst_sol, act_dur, transitions)
+                    if self.evaluate_analyst(tickets_info, ticket_id, ticket_tsp, analyst, locked, use_subfamily_action_choices, use_same_action_choices, family_subtechniques):
                         analysts_available.append(analyst)
+                        if len(analysts_available) >= max_available:
+                            break
 
                 if analysts_available:
                     Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Analysts available: {analysts_available}')
@@ -300,7 +359,7 @@ class AnalystEmulation:
                 ticket["replication_status"] = "Verification"
                 Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, "To replicate due to distant actions")
             
-        Utils.update_data(ticket, allocated = ticket["allocated"], allocated_tsp = ticket["allocated_tsp"], analyst = analyst, action = analyst_data["action"], duration = analyst_data["duration"])
+        Utils.update_data(ticket, analyst = analyst, action = analyst_data["action"], duration = analyst_data["duration"])
 
     def update_ticket_transfer_ticket(self, ticket, family_subtechniques):
         """
@@ -320,7 +379,7 @@ class AnalystEmulation:
         None.
 
         """
-        ticket_date = ticket["allocated"]
+        ticket_tsp = ticket["allocated_tsp"]
         
         if ticket["replication_status"] != None:
             subfamily = ticket["subfamily"]
@@ -338,16 +397,53 @@ class AnalystEmulation:
             action = self.initiate_steps_speeds(subfamily, team, analyst, action, self.aux_data.debug)
             action_dur, action_transitions = Utils.get_action_duration(ticket["family"], action, team, analyst, self.subfamily_steps_speeds[subfamily][team][analyst], self.family_steps_pool, family_subtechniques, self.aux_data)
 
-            if Utils.check_shift_ending(ticket_date, action_dur, self.shifts, self.aux_data):
+            if Utils.check_shift_ending(ticket_tsp, action_dur, self.shifts, self.aux_data):
                 Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, "Analyst working after his shift ends!")
                 
             Utils.update_data(ticket, action = action, duration = action_dur, steps_transitions = action_transitions)
         
         self.update_ticket_duration(ticket)
             
-        ticket['fixed'] = ticket_date + timedelta(0, 0, 0, 0, ticket["duration_outlier"])
-        ticket['fixed_tsp'] = ticket['allocated_tsp'] + (60 * ticket["duration_outlier"]) 
-        Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Allocation date: {ticket_date} - Fixed: {ticket["fixed"]}')
+        ticket['fixed_tsp'] = ticket_tsp + (60 * ticket["duration_outlier"]) 
+        Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Allocation date: {ticket_tsp} - Fixed: {ticket["fixed_tsp"]}')
+
+    def evaluate_analyst(self, tickets_info, ticket_id, ticket_tsp, analyst, locked, use_subfamily_action_choices, use_same_action_choices, family_subtechniques):
+        """
+        Builds the action of an operator for the ticket and checks if the operator can treat it before the shift ends.
+
+        Parameters
+        ----------
+        tickets_info : dict
+            Comprises information about all tickets.
+        ticket_id : int
+            Ticket identifier.
+        ticket_tsp : float
+            Allocated timestamp of the ticket.
+        analyst : str
+            Operator being analyzed.
+        locked : dict
+            List of techniques that can not be used for operator-action generation, like initiate, end, and transfer steps.
+        use_subfamily_action_choices : BufferedRandomChoiceGenerator            
+            Generator that tells whether an operator should use the subfamily action or not.
+        use_same_action_choices : BufferedRandomChoiceGenerator
+            Generator that tells whether an operator should use a similar action to another employed in previous treatments.
+        family_subtechniques : dict
+            Comprises all techniques and subtechniques employed in the ticket families analyzed.
+
+        Returns
+        -------
+        valid_operator : bool
+            Whether the operator can treat the ticket.
+
+        """
+        ticket = tickets_info[ticket_id]
+        analyst_sol, sol_status, new_action = self.check_next_analyst_action(ticket, analyst, self.subfamily_analysts_action, locked, use_subfamily_action_choices, use_same_action_choices)
+        act_dur, transitions = Utils.get_action_duration(ticket["family"], analyst_sol, ticket["team"], analyst, self.subfamily_steps_speeds[ticket["subfamily"]][ticket["team"]][analyst], self.family_steps_pool, family_subtechniques, self.aux_data)
+        
+        valid_operator = self.check_valid_analyst(tickets_info, ticket_tsp, ticket["subfamily"], ticket["team"], analyst, act_dur, ticket["outlier"])
+        if valid_operator:
+            self.update_subfamily_data(ticket["subfamily"], ticket["family"], ticket["team"], analyst, analyst_sol, act_dur, transitions)
+        return valid_operator
 
     def check_next_analyst_action(self, ticket, analyst, subfamily_actions, special_tech, use_subfamily_action_choices, use_same_action_choices):
         """
@@ -458,7 +554,7 @@ class AnalystEmulation:
                 
         return action
 
-    def check_valid_analyst(self, all_tickets, ticket_date, subfamily, team, operator, action_duration, outlier):
+    def check_valid_analyst(self, all_tickets, ticket_tsp, subfamily, team, operator, action_duration, outlier):
         """
         Checks if operator-action surpasses their shift.
 
@@ -466,8 +562,8 @@ class AnalystEmulation:
         ----------
         all_tickets : dict
             Comprises information about all tickets within the team being analyzed.
-        ticket_date : datetime
-            Allocated datetime of the ticket.
+        ticket_tsp : float
+            Allocated timestamp of the ticket.
         subfamily : str
             Current subfamily being analyzed.
         team : str
@@ -484,12 +580,12 @@ class AnalystEmulation:
 
         """
         action_duration = Utils.get_action_duration_outlier(action_duration, outlier, self.aux_data.outlier_cost)
-        if not Utils.check_shift_ending(ticket_date, action_duration, self.shifts, self.aux_data):
+        if not Utils.check_shift_ending(ticket_tsp, action_duration, self.shifts, self.aux_data):
             operator_status = True
-            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Current Date: {ticket_date}, {operator} takes {action_duration} min')
+            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Current Date: {ticket_tsp}, {operator} takes {action_duration} min')
         else:
             operator_status = False
-            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Curr Date: {ticket_date}, {operator} surpasses shift with action taking {action_duration}')
+            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Curr Date: {ticket_tsp}, {operator} surpasses shift with action taking {action_duration}')
 
         return operator_status
 
@@ -0,0 +1,385 @@
+"""
+Created on Mon Oct 19 13:55:22 2026
+
+@author: agent
+@goal: Stores and restores the state of the generation after each stage (resume after failures or output changes)
+"""
+
+import os, json, pickle, gzip, hashlib, random
+import numpy as np
+import pandas as pd
+from Code.Utils import Utils
+
+class Checkpoint:
+    STAGES = ["families", "tickets", "actions", "treatment"]
+    # Parameters that do not change the generated tickets (output and instrumentation related)
+    IGNORED_PARAMS = ["format_selected_idx", "print_plots", "logger_active", "debug", "profiling", "profiler", "checkpoints", "resume_generation", "data_format", "json_export", "stage_cache", "stage_cache_budget_mb"]
+    # Attributes rebuilt from the parameters (or shared with the pipeline) that are not stored
+    EXCLUDED_ATTRIBUTES = ["aux_data", "suspicious_data", "ip_sampler"]
+
+    def __init__(self, output_path, gen_id, generation_params, treatment_params, enabled):
+        """
+        Initiates a Checkpoint. The checkpoints are keyed by the generation identifier and by the hash of the configuration.
+
+        Parameters
+        ----------
+        output_path : str
+            Output folder.
+        gen_id : str
+            Unique generation identifier.
+        generation_params : dict
+            Comprises all data about parameters related to ticket generation.
+        treatment_params : dict
+            Comprises all data about parameters related to ticket treatment.
+        enabled : bool
+            If the checkpoints should be stored.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.enabled = enabled
+        self.config_hash = Checkpoint.get_config_hash(generation_params, treatment_params)
+        self.path = f'{output_path}/Checkpoints/{gen_id}_{self.config_hash}'
+
+    def get_config_hash(generation_params, treatment_params):
+        """
+        Hashes the parameters that influence the generation.
+
+        Parameters
+        ----------
+        generation_params : dict
+            Comprises all data about parameters related to ticket generation.
+        treatment_params : dict
+            Comprises all data about parameters related to ticket treatment.
+
+        Returns
+        -------
+        str
+            Configuration hash.
+
+        """
+        def default(value):
+            if isinstance(value, np.ndarray):
+                return hashlib.sha1(value.tobytes()).hexdigest()
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                return hashlib.sha1(pd.util.hash_pandas_object(value).values.tobytes()).hexdigest()
+            return str(value)
+
+        params = {key: value for key, value in generation_params.items() if key not in Checkpoint.IGNORED_PARAMS}
+        # The suspicious countries may hold interface widgets, only their time windows are relevant
+        params["suspicious_countries"] = Utils.compile_suspicious_windows(generation_params["suspicious_countries"])
+        content = json.dumps([params, treatment_params], sort_keys=True, default=default)
+        return hashlib.sha1(content.encode()).hexdigest()[:12]
+
+    def get_stage_file(self, stage):
+        """
+        Gets the file of a stage checkpoint.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+
+        Returns
+        -------
+        str
+            Checkpoint file.
+
+        """
+        return f'{self.path}/{Checkpoint.STAGES.index(stage)}_{stage}.pkl.gz'
+
+    def has_stage(self, stage):
+        """
+        Checks if a stage was already completed.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+
+        Returns
+        -------
+        bool
+            If the checkpoint exists.
+
+        """
+        return os.path.exists(self.get_stage_file(stage))
+
+    def get_last_stage(self):
+        """
+        Gets the last stage completed (the checkpoint of a stage comprises the data of the previous ones).
+
+        Returns
+        -------
+        last_stage : int
+            Index of the last stage completed (-1 if there are no checkpoints).
+
+        """
+        last_stage = -1
+        for idx, stage in enumerate(Checkpoint.STAGES):
+            if self.has_stage(stage):
+                last_stage = idx
+        return last_stage
+
+    def get_state(obj):
+        """
+        Gets the attributes of an object that must be stored.
+
+        Parameters
+        ----------
+        obj : object
+            TicketGenerator or AnalystEmulation.
+
+        Returns
+        -------
+        dict
+            Attributes of the object.
+
+        """
+        return {key: value for key, value in obj.__dict__.items() if key not in Checkpoint.EXCLUDED_ATTRIBUTES}
+
+    def dump_state(stage_file, objects, extra=None):
+        """
+        Writes the state of the objects and of the random generators into a compressed pickle (written atomically).
+
+        Parameters
+        ----------
+        stage_file : str
+            Output file.
+        objects : dict
+            Objects to store (e.g., ticket_generator).
+        extra : dict, optional
+            Other data produced by the stage. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        os.makedirs(os.path.dirname(stage_file), exist_ok=True)
+        data = {"objects": {name: Checkpoint.get_state(obj) for name, obj in objects.items()}, "extra": extra,
+                "random_state": random.getstate(), "np_random_state": np.random.get_state()}
+        with gzip.open(f'{stage_file}.tmp', "wb", compresslevel=1) as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f'{stage_file}.tmp', stage_file)
+
+    def restore_state(stage_file, objects, kept_attributes=()):
+        """
+        Restores the state of the objects and of the random generators written by dump_state.
+
+        Parameters
+        ----------
+        stage_file : str
+            Input file.
+        objects : dict
+            Objects to restore (e.g., ticket_generator).
+        kept_attributes : tuple, optional
+            Attributes of the objects that are not overwritten. The default is ().
+
+        Returns
+        -------
+        dict
+            Other data produced by the stage.
+
+        """
+        with gzip.open(stage_file, "rb") as f:
+            data = pickle.load(f)
+
+        for name, obj in objects.items():
+            obj.__dict__.update({key: value for key, value in data["objects"][name].items() if key not in kept_attributes})
+        random.setstate(data["random_state"])
+        np.random.set_state(data["np_random_state"])
+        return data.get("extra")
+
+    def save_stage(self, stage, objects, extra=None):
+        """
+        Stores the state of the objects (and the random generators) after a stage.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+        objects : dict
+            Objects to store (e.g., ticket_generator).
+        extra : dict, optional
+            Other data produced by the stage. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.enabled:
+            return
+
+        Checkpoint.dump_state(self.get_stage_file(stage), objects, extra)
+        print(f'Checkpoint of stage {stage} saved')
+
+    def load_stage(self, stage, objects):
+        """
+        Restores the state of the objects (and the random generators) stored after a stage.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+        objects : dict
+            Objects to restore (e.g., ticket_generator).
+
+        Returns
+        -------
+        dict
+            Other data produced by the stage.
+
+        """
+        extra = Checkpoint.restore_state(self.get_stage_file(stage), objects)
+        print(f'Stage {stage} restored from checkpoint')
+        return extra
+
+class StageCache:
+    # Attributes of the current run that are kept when a cached state is restored
+    RUN_ATTRIBUTES = ["_id"]
+
+    def __init__(self, output_path, generation_params, countries, countries_path, budget_mb, enabled):
+        """
+        Initiates a StageCache. The generation stages (families, tickets and actions) only depend on the generation parameters,
+        the countries and the seed, so their outputs are shared by the runs with the same hash (e.g., treatment parameter sweeps).
+
+        Parameters
+        ----------
+        output_path : str
+            Output folder.
+        generation_params : dict
+            Comprises all data about parameters related to ticket generation.
+        countries : list
+            Countries available to the tickets.
+        countries_path : str
+            Countries file path.
+        budget_mb : float
+            Disk budget of the cache (MB). The least recently used entries are removed when it is exceeded.
+        enabled : bool
+            If the cache should be used.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.enabled = enabled
+        # The countries file is identified by its path, size and modification time
+        countries_stat = os.stat(countries_path) if os.path.exists(countries_path) else None
+        countries_file = [countries_path, countries_stat.st_size, countries_stat.st_mtime_ns] if countries_stat else [countries_path]
+        self.key = Checkpoint.get_config_hash(dict(generation_params, countries=countries, countries_file=countries_file), {})
+        self.path = f'{output_path}/Cache'
+        self.budget = budget_mb * 1024 * 1024
+
+    def get_stage_file(self, stage):
+        """
+        Gets the file of a cached stage.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+
+        Returns
+        -------
+        str
+            Cache file.
+
+        """
+        return f'{self.path}/{self.key}_{stage}.pkl.gz'
+
+    def has_stage(self, stage):
+        """
+        Checks if a stage is cached.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+
+        Returns
+        -------
+        bool
+            If the stage is cached.
+
+        """
+        return self.enabled and os.path.exists(self.get_stage_file(stage))
+
+    def save_stage(self, stage, objects):
+        """
+        Caches the state of the objects (and the random generators) after a stage and evicts the least recently used entries.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+        objects : dict
+            Objects to store (e.g., ticket_generator).
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.enabled:
+            return
+
+        stage_file = self.get_stage_file(stage)
+        Checkpoint.dump_state(stage_file, objects)
+        print(f'Stage {stage} cached ({self.key})')
+        self.evict(stage_file)
+
+    def load_stage(self, stage, objects):
+        """
+        Restores the state of the objects (and the random generators) of a cached stage.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name.
+        objects : dict
+            Objects to restore (e.g., ticket_generator).
+
+        Returns
+        -------
+        None.
+
+        """
+        stage_file = self.get_stage_file(stage)
+        Checkpoint.restore_state(stage_file, objects, StageCache.RUN_ATTRIBUTES)
+        # The modification time records the last use
+        os.utime(stage_file)
+        print(f'Stage {stage} restored from cache ({self.key})')
+
+    def evict(self, keep_file):
+        """
+        Removes the least recently used entries until the cache fits the disk budget.
+
+        Parameters
+        ----------
+        keep_file : str
+            Entry that is never removed (the one just stored).
+
+        Returns
+        -------
+        None.
+
+        """
+        entries = []
+        for filename in os.listdir(self.path):
+            if filename.endswith(".pkl.gz"):
+                stat = os.stat(f'{self.path}/{filename}')
+                entries.append((stat.st_mtime, stat.st_size, f'{self.path}/{filename}'))
+
+        total_size = sum(entry[1] for entry in entries)
+        for _, size, filename in sorted(entries):
+            if total_size <= self.budget:
+                break
+            if os.path.normpath(filename) != os.path.normpath(keep_file):
+                os.remove(filename)
+                total_size -= size
+                print(f'Cache entry {os.path.basename(filename)} removed')
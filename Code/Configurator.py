@@ -6,19 +6,20 @@ Created on Fri Apr  2 12:10:27 2021
 """
 
 from Code.Utils import Utils
+from Code.RealDataAggregator import RealDataAggregator
 
-from PyQt5.QtWidgets import QFileDialog
-import os, json, string, random, ijson, sys, pytz
+import os, json, string, random, ijson, sys, pytz, hashlib
 import pandas as pd
 from datetime import datetime
-import pendulum
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.experimental import enable_iterative_imputer
-from sklearn.impute import IterativeImputer
 from ruamel.yaml import YAML
 
 class Configurator:
+    # Version of the real data profiles (must be increased when the real data processing changes)
+    PROFILE_VERSION = 3
+    # Number of rows read at once from the real dataset
+    REAL_DATA_CHUNK_SIZE = 100000
+    
     def read_configuration_file(domain, path):
         """
         Reads the configuration file
@@ -145,6 +146,15 @@ class Configurator:
             generation_params["week_equal_probabilities"] = config_data["generation_parameters"]["week_equal_probabilities"]
             generation_params["max_priority_levels"] = config_data["generation_parameters"]["max_priority_levels"]
             generation_params["with_ip"] = config_data["generation_parameters"]['with_ip']
+            generation_params["profiling"] = config_data["generation_parameters"].get("profiling", False)
+            generation_params["profiler"] = config_data["generation_parameters"].get("profiler", "none")
+            generation_params["checkpoints"] = config_data["generation_parameters"].get("checkpoints", False)
+            generation_params["resume_generation"] = config_data["generation_parameters"].get("resume_generation", "none")
+            generation_params["append_generation"] = config_data["generation_parameters"].get("append_generation", "none")
+            generation_params["data_format"] = config_data["generation_parameters"].get("data_format", "json")
+            generation_params["json_export"] = config_data["generation_parameters"].get("json_export", False)
+            generation_params["stage_cache"] = config_data["generation_parameters"].get("stage_cache", False)
+            generation_params["stage_cache_budget_mb"] = config_data["generation_parameters"].get("stage_cache_budget_mb", 2048)
             generation_params["action_operations"] = config_data["action_operations"]
             generation_params["ips_pool"] = config_data["ips_pool"]
             generation_params["default_alert_pool"] = config_data["families"]
@@ -160,6 +170,9 @@ class Configurator:
             treatment_params["actions_similarity"] = config_data["generation_parameters"]['actions_similarity']
             treatment_params["min_learning_counter"] = config_data["generation_parameters"]['min_learning_counter']
             treatment_params["max_learning_counter"] = config_data["generation_parameters"]['max_learning_counter']
+            treatment_params["analyst_selection"] = config_data["generation_parameters"].get("analyst_selection", "exhaustive")
+            treatment_params["analyst_sample_size"] = config_data["generation_parameters"].get("analyst_sample_size", 3)
+            treatment_params["snapshot_cutoffs"] = config_data["generation_parameters"].get("snapshot_cutoffs", [])
 
             suspicious_countries = config_data["suspicious_countries"]
             suspicious_countries = dict(sorted(suspicious_countries.items()))
@@ -242,6 +255,7 @@ class Configurator:
             Comprises all the information present in the configuration file.
 
         """
+        from PyQt5.QtWidgets import QFileDialog
         options = QFileDialog.Options()
         options |= QFileDialog.DontUseNativeDialog
         filename, _ = QFileDialog.getOpenFileName(window, "Open File", path, "", options=options)
@@ -262,6 +276,7 @@ class Configurator:
             Comprises all the information present in the configuration file.
 
         """
+        from PyQt5.QtWidgets import QFileDialog
         options = QFileDialog.Options()
         filename, _ = QFileDialog.getSaveFileName(window, 'Save as... File', 'Custom_cfg', filter="YAML (*.yaml)",options=options)
         return filename
@@ -348,235 +363,6 @@ class Configurator:
         #print("Countries:", countries)
         return countries
 
-    def solve_family_anomalies(dataset):
-        """
-        Handles null families and subfamilies in the real dataset.
-
-        Parameters
-        ----------
-        dataset : dataframe
-            Dataframe of the real dataset.
-
-        Returns
-        -------
-        test_dict : dict
-            Dataset in dict format.
-        dataset : dataframe
-            Updated dataset.
-
-        """
-        families_info = {}
-        incidents_info = dataset.groupby(['Family', 'Subfamily']).size()
-        test_dict = dataset.to_dict("index")
-
-        for incident_data, count in incidents_info.items():
-            if count != 0:
-                family = incident_data[0]
-                subfamily = incident_data[1]
-                if family not in families_info:
-                    families_info[family] = []
-                if incident_data not in families_info[family]:
-                    families_info[family].append(subfamily)
-
-        for i in test_dict:
-            if pd.isnull(test_dict[i]['Family']):
-                if pd.isnull(test_dict[i]['Subfamily']):
-                    family_picked = random.choice(list(families_info.keys()))
-                    dataset.loc[dataset["ID"] == test_dict[i]['ID'], "Family"] = family_picked
-                    test_dict[i]['Family'] = family_picked
-                    subfamily_picked = random.choice(families_info[family_picked])
-                    dataset.loc[dataset["ID"] == test_dict[i]['ID'], "Subfamily"] = subfamily_picked
-                    test_dict[i]['Subfamily'] = subfamily_picked
-                else:    
-                    family_picked = test_dict[i]['Subfamily'].split("-")[0]
-                    if family_picked not in dataset['Family'].cat.categories:
-                        dataset['Family'] = dataset['Family'].cat.add_categories(family_picked)
-                        families_info[family_picked] = []
-                    if test_dict[i]['Subfamily'] not in families_info[family_picked]:
-                        families_info[family_picked].append(test_dict[i]['Subfamily'])
-                        
-                    dataset.loc[dataset["ID"] == test_dict[i]['ID'], "Family"] = family_picked
-                    test_dict[i]['Family'] = family_picked
-                    
-        return test_dict, dataset
-    
-    def convert_timestamps(list_):
-        """
-        Converts timestamps into pendulum instances (if possible).
-
-        Parameters
-        ----------
-        list_ : list
-            Timestamps of the steps used in ticket treatment.
-
-        Returns
-        -------
-        temp: list
-            Updated list of timestamps with correct format.
-
-        """
-        temp = []
-        if len(list_) != 1:
-            for k in list_:
-                try:
-                    #print(k)
-                    dt_object = pendulum.from_timestamp(int(float(k)))
-                    temp.append(dt_object.replace(tzinfo=None))
-                except:
-                    return []
-        return temp
-    
-    def convert_timestamp_to_datetimelist(timestamps):
-        """
-        Checks for null and wrong timestamp format.     
-
-        Parameters
-        ----------
-        timestamps : str
-            Timestamps to be analyzed.
-
-        Returns
-        -------
-        result : list
-            Timestamps with the correct format.
-
-        """
-        
-        if pd.isnull(timestamps):
-            result = -1
-        else:
-            result = timestamps.replace('[', '')
-            result = result.replace(']', '')
-            result = result.split(', ')
-            result = Configurator.convert_timestamps(result)
-            if not result:
-                print("Entry removed!")
-                result = 0
-        return result
-    
-    def solve_timestamp_anomalies(dataset, temp_dict, subfamilies_mean):
-        """
-        Fixes anomalies with the timestamps    
-
-        Parameters
-        ----------
-        dataset : dataset
-            Dataset being analyzed.
-        temp_dict : dict
-            Dataset in dict format for easier attribute access.
-        subfamilies_mean : dict
-            Comprises information about the time spent and number of occorrences of each subfamily.
-
-        Returns
-        -------
-        dataset : dataframe
-            Updated dataframe.
-
-        """
-        ticket_durations, raised = [], []
-
-        for i in temp_dict:
-            if temp_dict[i]['Steps'] == -1:
-                print("Index:", i)
-                subfamily = temp_dict[i]["Subfamily"]
-                sub_mean = int(subfamilies_mean[subfamily]["time_spent"] / subfamilies_mean[subfamily]["count"])
-                sub_mean = random.randint(sub_mean - 4 , sub_mean + 4)
-                subfamilies_mean[subfamily]["time_spent"] += sub_mean
-                subfamilies_mean[subfamily]["count"] += 1
-                fixed_date = subfamilies_mean[subfamily]["min init date"].add(minutes = sub_mean)
-                dataset.loc[dataset["ID"] == temp_dict[i]['ID'], "Fixed"] = fixed_date
-                ticket_durations.append(sub_mean)
-                raised.append(subfamilies_mean[subfamily]["min init date"])
-                subfamilies_mean[subfamily]["min init date"] = fixed_date
-            else:
-                min_date = min(temp_dict[i]['Steps'])
-                max_date = max(temp_dict[i]['Steps'])
-                time_diff = max_date - min_date
-                minutes = round(time_diff.total_seconds() / 60)
-                ticket_durations.append(minutes)
-                raised.append(min_date)
-            
-        dataset["Ticket Duration"] = ticket_durations
-        dataset["raised"] = raised
-        return dataset
-    
-    def get_ticket_duration(start, end, subfamily):
-        """
-        Gets the total duration of a ticket    
-
-        Parameters
-        ----------
-        start : int
-            First step timestamp.
-        end : int
-            Last step timestamp.
-        subfamily : str
-            Subfamily being analyzed.
-
-        Returns
-        -------
-        minutes : int
-            Ticket duration in minutes.
-
-        """
-        time_diff = end - start
-        minutes = round(time_diff.total_seconds() / 60)
-        return minutes
-    
-    def get_subfamilies_mean(dataset, temp_dict):
-        """
-        Gets the mean of each subfamily.    
-
-        Parameters
-        ----------
-        dataset : dataframe
-            Dataset being analyzed.
-        temp_dict : dict
-            Dataset in dict format for easier access.
-
-        Returns
-        -------
-        subfamilies_mean : dict
-            Comprises information about the time spent and number of occorrences of each subfamily.
-
-        """
-        subfamilies_mean = {}
-        all_subfamilies = dataset['Subfamily'].unique()
-        all_subfamilies = [item for item in all_subfamilies if not(pd.isnull(item)) == True]
-        min_init_date = pendulum.datetime(2100, 6, 1).replace(tzinfo=None)
-        
-        for i in temp_dict:
-            if temp_dict[i]["Steps"] != -1:
-                subfamily = temp_dict[i]["Subfamily"]
-                if subfamily not in subfamilies_mean:
-                    subfamilies_mean[subfamily] = {}
-                    subfamilies_mean[subfamily]["time_spent"] = 0
-                    subfamilies_mean[subfamily]["count"] = 1
-                    subfamilies_mean[subfamily]["min init date"] = min_init_date
-                else:
-                    subfamilies_mean[subfamily]["count"] += 1
-                    
-                min_date = min(temp_dict[i]["Steps"])
-                max_date = max(temp_dict[i]["Steps"])
-                time_spent = Configurator.get_ticket_duration(min_date, max_date, subfamily)
-                subfamilies_mean[subfamily]["time_spent"] += time_spent
-                    
-                if min_date < subfamilies_mean[subfamily]["min init date"]:
-                    subfamilies_mean[subfamily]["min init date"] = min_date
-                
-        avg = 0
-        for subfamily in subfamilies_mean:
-            avg += subfamilies_mean[subfamily]["time_spent"] /subfamilies_mean[subfamily]["count"]
-
-        avg = avg/len(subfamilies_mean)
-        for sub in all_subfamilies:
-            if sub not in subfamilies_mean:
-                subfamilies_mean[subfamily] = {}
-                subfamilies_mean["time_spent"] = avg
-                subfamilies_mean["count"] = 1
-               
-        return subfamilies_mean
-        
     def get_ticket_seasonality(filename, is_database, connection, show_real_data):
         """
         Gets the seasonality of the real dataset (either from databases or custom samples).
@@ -607,64 +393,46 @@ class Configurator:
             Comprises the families and the encoded families.
         real_family_probs: dict
             Comprises the probabilities of the real families.
-        real_dataset: dataframe
-            Refers to the updated real dataset (maped families).
+        real_dataset: dict
+            Comprises the histograms of the real dataset (maped families, hours, weekdays, months and durations).
 
         """
         ticket_seasonality, family_seasonality, family_mean_duration = {}, {}, {}
         n_col = 1
         
-        if is_database:   
-            ### Change according to existing database
-            cursor = connection.cursor()
-            columns_to_read = ['ID', 'Subfamily', 'discovered_date', 'end_date', 'operator_action_timestamps']
-            database_columns = ', '.join(list(map(str.lower, columns_to_read)))
-            cursor.execute(f'SELECT {database_columns} FROM test_table')
-            rows = cursor.fetchall()
-
-            dataset = pd.DataFrame(rows, columns=columns_to_read)
-            dataset.rename(columns={'operator_action_timestamps': 'Steps'}, inplace = True)
-            dataset['Family'] = dataset['Subfamily'].apply(lambda x: x.split("-")[0])
-        else:
-            columns_to_read = ['ref_num', 'discovered_date', 'end_date', 'category', 'alert_code', 'time_stamp']
-            filepath = "./Resources/Datasets/" + filename 
-            if ".xlsx" in filename:
-                dataset = pd.read_excel(filepath, usecols=columns_to_read, index_col=None)
-            else:
-                dataset = pd.read_csv(filepath, usecols=columns_to_read, index_col=None, sep=";")
-            dataset.rename(columns={'ref_num': 'ID', 'category': 'Family', 'alert_code': 'Subfamily', 'time_stamp': 'Steps'}, inplace = True)
-
-        dataset['ID'] = dataset['ID'].astype(np.int32)
-        dataset['Family'] = dataset['Family'].astype("category")
-        dataset['Subfamily'] = dataset['Subfamily'].astype("category")
-        
-        dataset.rename(columns={'raised': 'Raised (UTC)'}, inplace = True)
-        dataset.rename(columns={'discovered_date': 'Raised (UTC)', 'end_date': 'Fixed'}, inplace = True)
-        dataset = dataset.dropna(subset=['Steps', 'Family', 'Subfamily'], how= "all")
-        
-        dataset['Steps'] = dataset['Steps'].apply(Configurator.convert_timestamp_to_datetimelist)
-        dataset = dataset[dataset['Steps'] != 0]
-        print("length:", dataset.shape[0])
+        # The profile of a file is reused while its content does not change
+        profile_path = None
+        if not is_database:
+            if filename.endswith(".profile"):
+                profile = Configurator.load_real_profile("./Resources/Datasets/" + filename)
+                if profile is None:
+                    raise ValueError(f'Real data profile {filename} is not compatible with this version')
+                return Configurator.unpack_real_profile(profile)
+            
+            profile_path = Configurator.get_profile_path("./Resources/Datasets/" + filename)
+            profile = Configurator.load_real_profile(profile_path)
+            if profile is not None:
+                print(f'Real data profile loaded: {profile_path}')
+                if show_real_data:
+                    print("The real data plots are not available when the profile is loaded")
+                return Configurator.unpack_real_profile(profile)
         
-        temp_dict, dataset = Configurator.solve_family_anomalies(dataset)
-        subfamilies_mean = Configurator.get_subfamilies_mean(dataset, temp_dict)
-        dataset = Configurator.solve_timestamp_anomalies(dataset, temp_dict, subfamilies_mean)
-        dataset["raised"] = pd.to_datetime(dataset['raised'], dayfirst=True)
+        aggregator = RealDataAggregator()
+        for chunk in Configurator.read_real_data(filename, is_database, connection, Configurator.REAL_DATA_CHUNK_SIZE):
+            aggregator.add_chunk(chunk)
+        aggregator.finalize()
+        print("length:", aggregator.n_tickets)
         
-        dataset.sort_values(by='raised', inplace=True)
-        dataset['Year/month'] = dataset['raised'].apply(lambda x: datetime.strftime(x, '%m'))
-        family_duration_distribution = dataset.groupby('Family')['Ticket Duration'].mean().reset_index(name="mean")
+        family_duration_distribution = aggregator.get_family_duration_distribution()
         family_duration_distribution['mean'] = family_duration_distribution['mean'].apply(lambda x: x*0.1)
         family_mean_duration = family_duration_distribution.set_index('Family')['mean'].to_dict()
-        family_distribution = dataset.groupby(['Year/month', 'Family']).size().reset_index(name="Count")
-        daily_tickets = dataset.groupby(dataset['raised'].dt.strftime('%m-%d')).size().reset_index(name='ticket_count')
-        daily_tickets.columns = ['Month_day', 'Ticket_count']
+        family_distribution = aggregator.get_family_distribution()
+        daily_tickets = aggregator.get_daily_tickets()
 
-        ticket_series = dataset['Year/month'].value_counts()
-        ticket_series = ticket_series.sort_index()
-        ticket_seasonality = Configurator.get_daily_probabibilies(len(dataset), daily_tickets)
+        ticket_series = family_distribution.groupby('Year/month')['Count'].sum()
+        ticket_seasonality = Configurator.get_daily_probabibilies(aggregator.n_tickets, daily_tickets)
         
-        has_one_year_data, all_day_month_combinations = Configurator.check_real_dataset_completeness(dataset, daily_tickets)
+        has_one_year_data, all_day_month_combinations = Configurator.check_real_dataset_completeness(aggregator.start_date, daily_tickets)
         if not has_one_year_data:
             ticket_seasonality = Configurator.interpolate_missing_data(ticket_seasonality, all_day_month_combinations)
         
@@ -679,25 +447,240 @@ class Configurator:
             ticket_number = ticket_series.get(key = row["Year/month"])
             family_seasonality[month_name][family] = row["Count"]/ticket_number
             
-        all_families = dataset['Family'].unique()
+        all_families = aggregator.get_families()
         for l in family_seasonality.keys():
             for fam in all_families:
                 if fam not in family_seasonality[l]:
                     family_seasonality[l][fam] = 0
                 
-        mapping = Utils.encode_families(list(dataset['Family'].unique()))
-        real_family_probs, real_dataset = Configurator.plot_real_data(dataset, family_duration_distribution, n_col, mapping, show_real_data)
+        mapping = Utils.encode_families(all_families)
+        real_family_probs, family_counts = Configurator.plot_real_data(family_distribution, family_duration_distribution, aggregator.get_family_counts(), n_col, mapping, show_real_data)
+        histograms = aggregator.histograms.get_histograms()
+        histograms["family"] = family_counts
+        
+        profile = Configurator.build_real_profile(filename, ticket_seasonality, family_seasonality, family_mean_duration, mapping, real_family_probs, histograms)
+        if profile_path is not None:
+            Configurator.save_real_profile(profile_path, profile)
+
+        return Configurator.unpack_real_profile(profile)
+    
+    def read_real_data(filename, is_database, connection, chunk_size):
+        """
+        Reads the real dataset in chunks. Databases are read through a server-side cursor (psycopg2) or fetchmany
+        (other DB-API connections, e.g. sqlite3), csv files through read_csv chunks and xlsx files through a read-only 
+        workbook, so the dataset is never loaded at once.
+        BEWARE! MUST be adapted to the real dataset explored (table and columns names).
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file.
+        is_database : bool
+            If it is a database or not (csv or excel).
+        connection : connection
+            Database connection (psycopg2 or any DB-API connection).
+        chunk_size : int
+            Number of rows of each chunk.
+
+        Yields
+        ------
+        dataset : dataframe
+            Chunk of the real dataset (ID, Family, Subfamily, Raised (UTC), Fixed and Steps columns).
+
+        """
+        if is_database:   
+            ### Change according to existing database
+            columns_to_read = ['ID', 'Subfamily', 'discovered_date', 'end_date', 'operator_action_timestamps']
+            database_columns = ', '.join(list(map(str.lower, columns_to_read)))
+            if type(connection).__module__.startswith("psycopg2"):
+                cursor = connection.cursor(name="snooker_real_data")
+                cursor.itersize = chunk_size
+            else:
+                cursor = connection.cursor()
+            cursor.execute(f'SELECT {database_columns} FROM test_table')
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    dataset = pd.DataFrame(rows, columns=columns_to_read)
+                    dataset.rename(columns={'operator_action_timestamps': 'Steps', 'discovered_date': 'Raised (UTC)', 'end_date': 'Fixed'}, inplace = True)
+                    dataset['Family'] = dataset['Subfamily'].str.split("-").str[0]
+                    yield dataset
+            finally:
+                cursor.close()
+        else:
+            columns_to_read = ['ref_num', 'discovered_date', 'end_date', 'category', 'alert_code', 'time_stamp']
+            columns_names = {'ref_num': 'ID', 'category': 'Family', 'alert_code': 'Subfamily', 'time_stamp': 'Steps', 'discovered_date': 'Raised (UTC)', 'end_date': 'Fixed'}
+            filepath = "./Resources/Datasets/" + filename 
+            if ".xlsx" in filename:
+                chunks = Configurator.read_excel_chunks(filepath, columns_to_read, chunk_size)
+            else:
+                chunks = pd.read_csv(filepath, usecols=columns_to_read, index_col=None, sep=";", dtype=str, chunksize=chunk_size)
+            for dataset in chunks:
+                dataset.rename(columns=columns_names, inplace = True)
+                yield dataset
+    
+    def read_excel_chunks(filepath, columns_to_read, chunk_size):
+        """
+        Reads a xlsx file in chunks (rows are streamed from a read-only workbook).
+
+        Parameters
+        ----------
+        filepath : str
+            Path of the file.
+        columns_to_read : list
+            Columns to keep.
+        chunk_size : int
+            Number of rows of each chunk.
+
+        Yields
+        ------
+        dataframe
+            Chunk of the file.
+
+        """
+        from openpyxl import load_workbook
+        workbook = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = list(next(rows))
+            columns_idx = [header.index(column) for column in columns_to_read]
+            chunk = []
+            for row in rows:
+                chunk.append([row[idx] if idx < len(row) else None for idx in columns_idx])
+                if len(chunk) == chunk_size:
+                    yield pd.DataFrame(chunk, columns=columns_to_read).astype(object)
+                    chunk = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns_to_read).astype(object)
+        finally:
+            workbook.close()
+    
+    def get_profile_path(filepath):
+        """
+        Gets the profile path of a real dataset (keyed by the SHA-256 of the file content).
+
+        Parameters
+        ----------
+        filepath : str
+            Path of the real dataset.
+
+        Returns
+        -------
+        str
+            Path of the profile.
+
+        """
+        sha256 = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return f'./Resources/Profiles/{sha256.hexdigest()}.profile'
+    
+    def build_real_profile(source, ticket_seasonality, family_seasonality, family_mean_duration, mapping, real_family_probs, histograms):
+        """
+        Builds the profile of a real dataset. The profile only holds aggregated data (no tickets), so it can be shared instead of the real dataset.
+
+        Parameters
+        ----------
+        source : str
+            Name of the real dataset.
+        ticket_seasonality: dict
+            Comprises the daily seasonality of the real tickets.
+        family_seasonality: dict
+            Comprises the monthly seasonality of the real families.
+        family_mean_duration: dict
+            Comprises the mean duration of each family.
+        mapping: dict
+            Comprises the families and the encoded families.
+        real_family_probs: series
+            Comprises the probabilities of the real families.
+        histograms: dict
+            Comprises the histograms of the real dataset (encoded families, hours, weekdays, months and durations).
 
-        return ticket_seasonality, family_seasonality, family_mean_duration, mapping, real_family_probs, real_dataset
+        Returns
+        -------
+        dict
+            Real data profile.
 
-    def check_real_dataset_completeness(dataset, daily_tickets):
+        """
+        return {"version": Configurator.PROFILE_VERSION, "source": source, "created": datetime.now().isoformat(),
+                "ticket_seasonality": ticket_seasonality, "family_seasonality": family_seasonality, "family_mean_duration": family_mean_duration, 
+                "mapping": mapping, "real_family_probs": real_family_probs.to_dict(), "histograms": histograms}
+    
+    def save_real_profile(profile_path, profile):
+        """
+        Stores a real data profile.
+
+        Parameters
+        ----------
+        profile_path : str
+            Path of the profile.
+        profile : dict
+            Real data profile.
+
+        Returns
+        -------
+        None.
+
+        """
+        os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+        with open(f'{profile_path}.tmp', "w") as f:
+            json.dump(profile, f, indent=2, default=Utils.json_default)
+        os.replace(f'{profile_path}.tmp', profile_path)
+        print(f'Real data profile saved: {profile_path}')
+    
+    def load_real_profile(profile_path):
+        """
+        Loads a real data profile.
+
+        Parameters
+        ----------
+        profile_path : str
+            Path of the profile.
+
+        Returns
+        -------
+        profile : dict
+            Real data profile (None if it does not exist or was built by another version).
+
+        """
+        if not os.path.exists(profile_path):
+            return None
+        with open(profile_path) as f:
+            profile = json.load(f)
+        if profile.get("version") != Configurator.PROFILE_VERSION:
+            print(f'Real data profile {profile_path} is outdated (version {profile.get("version")})')
+            return None
+        return profile
+    
+    def unpack_real_profile(profile):
+        """
+        Gets the real data artifacts of a profile. The real dataset is represented by its histograms.
+
+        Parameters
+        ----------
+        profile : dict
+            Real data profile.
+
+        Returns
+        -------
+        tuple
+            Ticket seasonality, family seasonality, family mean duration, mapping, real family probabilities and real dataset histograms.
+
+        """
+        real_family_probs = pd.Series(profile["real_family_probs"]).sort_index()
+        return profile["ticket_seasonality"], profile["family_seasonality"], profile["family_mean_duration"], profile["mapping"], real_family_probs, profile["histograms"]
+
+    def check_real_dataset_completeness(start_date, daily_tickets):
         """
         Checks if the real dataset has missing data in terms of dates.
 
         Parameters
         ----------
-        dataset : dataframe
-            Real dataset.
+        start_date : timestamp
+            Raise date of the first real ticket.
         daily_tickets : dataframe
             Dataset with two columns (Month-day and ticket count).
 
@@ -709,7 +692,6 @@ class Configurator:
             List of month-day combinations.
 
         """
-        start_date = dataset['raised'].min()
         full_year_start_date = pd.Timestamp(year=start_date.year, month=1, day=1)
         #print("Full year start date:", full_year_start_date)
         full_year_end_date = pd.Timestamp(year=start_date.year, month=12, day=31)
@@ -747,6 +729,8 @@ class Configurator:
             Updated dataframe with interpolated missing dates.
 
         """
+        from sklearn.experimental import enable_iterative_imputer
+        from sklearn.impute import IterativeImputer
         df = pd.DataFrame.from_dict(ticket_seasonality, orient='index').reset_index()
         df.columns = ['day_month', 'probability', 'ticket_count']
     
@@ -789,16 +773,18 @@ class Configurator:
 
         return ticket_seasonality
     
-    def plot_real_data(dataset, family_duration_distribution, n_col, mapping, plot_data):
+    def plot_real_data(family_distribution, family_duration_distribution, family_counts, n_col, mapping, plot_data):
         """
         Plots real families's frequency over the year
 
         Parameters
         ----------
-        dataset : Dataframe
-            Real dataset.
+        family_distribution : Dataframe
+            Dataset containing the number of tickets of each family in each month.
         family_duration_distribution : Dataframe
             Dataset containing the mean duration of each family
+        family_counts : dict
+            Comprises the number of tickets of each family.
         n_col : int
             Column to read.
         mapping : dict
@@ -808,18 +794,20 @@ class Configurator:
 
         Returns
         -------
-        family_probs_data : dict
+        family_probs_data : series
             Comprises the probability of each real family.
-        dataset : dataframe
-            Updated real dataset.
+        encoded_counts : dict
+            Comprises the number of tickets of each real family (encoded).
 
         """
         inverse_mapping = {v: k for k, v in mapping.items()}
-        dataset["Family"] = dataset["Family"].map(inverse_mapping)
-        family_probs_data = dataset['Family'].value_counts(normalize=True).sort_index()
+        encoded_counts = {inverse_mapping[family]: count for family, count in family_counts.items()}
+        family_probs_data = pd.Series(encoded_counts, dtype=np.float64).sort_index()
+        family_probs_data = family_probs_data / family_probs_data.sum()
         
         if plot_data:
-            freq = dataset.pivot_table(index="Year/month", columns="Family", aggfunc="size", fill_value=0)
+            import matplotlib.pyplot as plt
+            freq = family_distribution.pivot_table(index="Year/month", columns="Family", values="Count", aggfunc="sum", fill_value=0)
         
             families = sorted(freq.columns)
             months = freq.index
@@ -859,26 +847,36 @@ class Configurator:
             plt.savefig('Plots\\real_mean_fix_duration.png', bbox_inches='tight')
             plt.show()
         
-        return family_probs_data, dataset
+        return family_probs_data, encoded_counts
         
     def get_suspicious_ips():
         """
-        Gets the suspicious IPs.
+        Gets the suspicious IPs. The IPs are packed into an uint32 array and their categories are dictionary-encoded.
+        The packed table is cached next to the source file and rebuilt only when the source file changes.
 
         Returns
         -------
         suspicious_ips : dict
-            Comprises information regarding suspicious IPs.
+            Comprises the packed IPs ("ips"), the category code of each IP ("categories"), the category labels ("labels") and the source file ("source").
 
         """
         path = 'Resources/Ips/bad_ips.txt'
-        print(f'Suspicious file Size is {os.stat(path).st_size / (1024 * 1024)} MB')
-        suspicious_ips = {}
-        with open(path) as infile:
-            for line in infile:
-                line_split = line.split("\t")
-                suspicious_ips[line_split[0]] = line_split[1].rstrip()
-                
+        cache_path = 'Resources/Ips/bad_ips.npz'
+        source_stat = os.stat(path)
+        print(f'Suspicious file Size is {source_stat.st_size / (1024 * 1024)} MB')
+        
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cache:
+                if cache["source"][0] == source_stat.st_size and cache["source"][1] == source_stat.st_mtime_ns:
+                    return {"ips": cache["ips"], "categories": cache["categories"], "labels": cache["labels"].tolist(), "source": path}
+        
+        table = pd.read_csv(path, sep="\t", header=None, names=["ip", "category"], dtype=str, usecols=[0, 1])
+        octets = table["ip"].str.split(".", expand=True).astype(np.uint32).to_numpy()
+        ips = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+        codes, labels = pd.factorize(table["category"].str.strip())
+        suspicious_ips = {"ips": ips, "categories": codes.astype(np.uint8 if len(labels) < 256 else np.uint16), "labels": labels.tolist(), "source": path}
+        
+        np.savez(cache_path, ips=suspicious_ips["ips"], categories=suspicious_ips["categories"], labels=np.array(suspicious_ips["labels"]), source=np.array([source_stat.st_size, source_stat.st_mtime_ns], dtype=np.int64))
         return suspicious_ips
 
     def instantiate_special_steps(max_transfer_steps):
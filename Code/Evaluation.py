@@ -0,0 +1,234 @@
+"""
+Created on Mon Oct 19 14:04:58 2026
+
+@author: agent
+@goal: Compares the real and synthetic datasets through the histograms of their families, raise hours, weekdays, months and durations
+"""
+
+import json, os
+import numpy as np
+import pandas as pd
+
+class DistributionHistograms:
+    # Durations are binned in powers of two (minutes)
+    DURATION_BINS = 32
+    SIZES = {"hour": 24, "weekday": 7, "month": 12, "duration": DURATION_BINS}
+
+    def __init__(self):
+        """
+        Initiates a DistributionHistograms. The histograms are updated chunk by chunk (np.bincount).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.families = {}
+        self.histograms = {name: np.zeros(size, dtype=np.int64) for name, size in DistributionHistograms.SIZES.items()}
+        self.histograms["family"] = np.zeros(0, dtype=np.int64)
+
+    def get_duration_bins(durations):
+        """
+        Gets the bin of each duration (bin k holds durations in [2^k - 1, 2^(k+1) - 1[).
+
+        Parameters
+        ----------
+        durations : array
+            Durations (minutes).
+
+        Returns
+        -------
+        array
+            Bin of each duration.
+
+        """
+        durations = np.nan_to_num(np.asarray(durations, dtype=np.float64), nan=0)
+        return np.minimum(np.floor(np.log2(np.maximum(durations, 0) + 1)), DistributionHistograms.DURATION_BINS - 1).astype(np.int64)
+
+    def add(self, raised, families, durations):
+        """
+        Adds tickets to the histograms.
+
+        Parameters
+        ----------
+        raised : array
+            Raise date of each ticket (datetimes, strings or seconds).
+        families : array
+            Family of each ticket.
+        durations : array
+            Duration (minutes) of each ticket.
+
+        Returns
+        -------
+        None.
+
+        """
+        if len(raised) == 0:
+            return
+
+        raised = np.asarray(raised)
+        dates = pd.DatetimeIndex(pd.to_datetime(raised, unit='s') if np.issubdtype(raised.dtype, np.number) else pd.to_datetime(raised))
+        self.histograms["hour"] += np.bincount(dates.hour.to_numpy(), minlength=24)
+        self.histograms["weekday"] += np.bincount(dates.dayofweek.to_numpy(), minlength=7)
+        self.histograms["month"] += np.bincount(dates.month.to_numpy() - 1, minlength=12)
+        self.histograms["duration"] += np.bincount(DistributionHistograms.get_duration_bins(durations), minlength=DistributionHistograms.DURATION_BINS)
+
+        # Families are dictionary-encoded, new families extend the histogram
+        codes, uniques = pd.factorize(np.asarray(families, dtype=object))
+        global_codes = np.array([self.families.setdefault(family, len(self.families)) for family in uniques], dtype=np.int64)
+        family_counts = np.bincount(global_codes[codes[codes >= 0]], minlength=len(self.families))
+        family_counts[:len(self.histograms["family"])] += self.histograms["family"]
+        self.histograms["family"] = family_counts
+
+    def get_histograms(self):
+        """
+        Gets the histograms (JSON serializable).
+
+        Returns
+        -------
+        dict
+            Family counts (dict) and hour, weekday, month and duration counts (lists).
+
+        """
+        histograms = {name: self.histograms[name].tolist() for name in DistributionHistograms.SIZES}
+        histograms["family"] = {family: int(self.histograms["family"][code]) for family, code in self.families.items()}
+        return histograms
+
+class Evaluation:
+    ORDINAL = ["hour", "weekday", "month", "duration"]
+
+    def compare_distributions(real_counts, synthetic_counts, ordinal):
+        """
+        Computes divergence metrics between two histograms.
+
+        Parameters
+        ----------
+        real_counts : array
+            Real histogram.
+        synthetic_counts : array
+            Synthetic histogram (same bins).
+        ordinal : bool
+            If the bins are ordered (adds the Kolmogorov-Smirnov statistic).
+
+        Returns
+        -------
+        metrics : dict
+            KL divergence, Jensen-Shannon divergence, Hellinger distance and total variation distance.
+
+        """
+        real_counts, synthetic_counts = np.asarray(real_counts, dtype=np.float64), np.asarray(synthetic_counts, dtype=np.float64)
+        if real_counts.sum() == 0 or synthetic_counts.sum() == 0:
+            return None
+        p, q = real_counts / real_counts.sum(), synthetic_counts / synthetic_counts.sum()
+        # Smoothing avoids infinite divergences on empty bins
+        eps = 1e-10
+        p_s, q_s = (p + eps) / (1 + eps * len(p)), (q + eps) / (1 + eps * len(q))
+        m = (p_s + q_s) / 2
+
+        metrics = {"kl_divergence": float(np.sum(p_s * np.log(p_s / q_s))),
+                   "jensen_shannon": float(0.5 * np.sum(p_s * np.log(p_s / m)) + 0.5 * np.sum(q_s * np.log(q_s / m))),
+                   "hellinger": float(np.sqrt(np.sum((np.sqrt(p) - np.sqrt(q)) ** 2)) / np.sqrt(2)),
+                   "total_variation": float(0.5 * np.abs(p - q).sum())}
+        if ordinal:
+            metrics["ks_statistic"] = float(np.abs(np.cumsum(p) - np.cumsum(q)).max())
+        return metrics
+
+    def compare_histograms(real_histograms, synthetic_histograms):
+        """
+        Compares the real and synthetic histograms.
+
+        Parameters
+        ----------
+        real_histograms : dict
+            Histograms of the real dataset.
+        synthetic_histograms : dict
+            Histograms of the synthetic dataset.
+
+        Returns
+        -------
+        metrics : dict
+            Metrics of each distribution (family, hour, weekday, month and duration).
+
+        """
+        metrics = {}
+        families = sorted(set(real_histograms["family"]) | set(synthetic_histograms["family"]))
+        metrics["family"] = Evaluation.compare_distributions([real_histograms["family"].get(family, 0) for family in families],
+                                                             [synthetic_histograms["family"].get(family, 0) for family in families], False)
+        for name in Evaluation.ORDINAL:
+            if name in real_histograms and name in synthetic_histograms:
+                metrics[name] = Evaluation.compare_distributions(real_histograms[name], synthetic_histograms[name], True)
+        return metrics
+
+    def evaluate_output_file(filename, real_histograms, chunk_size=100000):
+        """
+        Compares a generated dataset (csv) with the real histograms, reading the file in chunks.
+
+        Parameters
+        ----------
+        filename : str
+            Path of the generated dataset.
+        real_histograms : dict
+            Histograms of the real dataset.
+        chunk_size : int, optional
+            Number of rows of each chunk. The default is 100000.
+
+        Returns
+        -------
+        dict
+            Metrics of each distribution and synthetic histograms.
+
+        """
+        synthetic = DistributionHistograms()
+        for chunk in pd.read_csv(filename, sep=";", usecols=["raised", "family", "duration"], chunksize=chunk_size):
+            synthetic.add(chunk["raised"].to_numpy(), chunk["family"].to_numpy(), chunk["duration"].to_numpy())
+        synthetic_histograms = synthetic.get_histograms()
+        return {"metrics": Evaluation.compare_histograms(real_histograms, synthetic_histograms), "synthetic_histograms": synthetic_histograms}
+
+    def save_metrics(output_path, evaluation):
+        """
+        Stores the evaluation metrics into a JSON file.
+
+        Parameters
+        ----------
+        output_path : str
+            Output path to save the JSON file.
+        evaluation : dict
+            Metrics and histograms.
+
+        Returns
+        -------
+        None.
+
+        """
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(evaluation, f, indent=2)
+        print(f'Evaluation metrics saved in {output_path}')
+
+def main():
+    """
+    Compares a generated dataset (csv) with a real data profile, reading the dataset in chunks.
+
+    Returns
+    -------
+    None.
+
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="SNOOKER real vs synthetic evaluation")
+    parser.add_argument("dataset", help="Generated dataset (csv)")
+    parser.add_argument("profile", help="Real data profile (Resources/Profiles)")
+    parser.add_argument("--output", help="JSON file to store the metrics")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    with open(args.profile) as f:
+        real_histograms = json.load(f)["histograms"]
+    evaluation = Evaluation.evaluate_output_file(args.dataset, real_histograms, args.chunk_size)
+    for distribution, metrics in evaluation["metrics"].items():
+        print(f'{distribution}: {metrics}')
+    evaluation["real_histograms"] = real_histograms
+    Evaluation.save_metrics(args.output or f'{os.path.splitext(args.dataset)[0]}_evaluation.json', evaluation)
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ from Code.Generator.TicketGenerator import TicketGenerator
 from Code.Utils import Utils
 from Code.AnalystEmulation import AnalystEmulation
 from Code.Configurator import Configurator
+from Code.RunReport import RunReport
+from Code.Checkpoint import Checkpoint, StageCache
 
 from datetime import datetime
 import psutil, uuid
@@ -32,10 +34,17 @@ class DatasetGenerator:
         None.
 
         """
-        self.gen_id = uuid.uuid4()
         self.canceled = generation.canceled 
         self.domain = generation.args[0]
         self.generation_params = generation.args[1]
+        # Resuming a generation reuses its identifier (and its checkpoints)
+        if self.generation_params["resume_generation"] not in [None, "none", ""]:
+            self.gen_id = self.generation_params["resume_generation"]
+        # Appending to a generation reuses its identifier (and its output files)
+        elif self.generation_params["append_generation"] not in [None, "none", ""]:
+            self.gen_id = self.generation_params["append_generation"]
+        else:
+            self.gen_id = uuid.uuid4()
         self.treatment_params = generation.args[2]
         self.countries = generation.args[3]
         self.output_params = generation.args[4]
@@ -43,6 +52,7 @@ class DatasetGenerator:
         self.cpu_usage_before = generation.args[6]
         self.output_path = f'{config_path}/{self.domain}'
         self.logger = Utils.create_log(self.output_path, f'Generation_Log_{self.gen_id}', logger_active)
+        self.report = RunReport(self.generation_params["profiling"], self.generation_params["profiler"])
 
     def build_datasets(self, countries_path):
         """
@@ -83,47 +93,106 @@ class DatasetGenerator:
         Utils.set_seed(self.generation_params["seed"])
         shifts = Utils.split_day_shifts(int(self.generation_params["shifts"]))
         print("Shifts:", shifts)
-        if self.generation_params["reset_analysts_data"]:
+        append = self.generation_params["append_generation"] not in [None, "none", ""]
+        if append:
+            print("Appending to generation:", self.gen_id)
+        elif self.generation_params["reset_analysts_data"]:
             self.generation_params["analysts_skills"], updated_data = Utils.reset_analysts_data(self.generation_params, shifts, self.logger)
             Configurator.update_configuration_data("analysts_info", updated_data, self.domain, f'{self.output_path}/Init_cfg.yaml')
 
         ticket_generator = TicketGenerator(self.gen_id, self.generation_params, self.logger)
+        ticket_generator.aux_data.report = self.report
+        checkpoint = Checkpoint(self.output_path, self.gen_id, self.generation_params, self.treatment_params, self.generation_params["checkpoints"])
+        last_stage = checkpoint.get_last_stage()
+        if last_stage >= 0:
+            print(f'Resuming generation {self.gen_id} after stage {Checkpoint.STAGES[last_stage]}')
+        # The generation stages are shared by the runs with the same generation parameters and seed
+        stage_cache = StageCache(self.output_path, self.generation_params, self.countries, countries_path, self.generation_params["stage_cache_budget_mb"], self.generation_params["stage_cache"] and not append)
+        cached = last_stage < 2 and stage_cache.has_stage("actions")
+        if cached:
+            stage_cache.load_stage("actions", {"ticket_generator": ticket_generator})
+            checkpoint.save_stage("actions", {"ticket_generator": ticket_generator})
+            
+        self.report.start_profiler()
         initial_time = datetime.now()
-        if not self.canceled:
-            ticket_generator.get_families_probabilities(self.canceled, self.generation_params, 10, 6)
+        curr_time = initial_time
+        if not self.canceled and last_stage < 1 and not cached:
+            if last_stage == 0:
+                checkpoint.load_stage("families", {"ticket_generator": ticket_generator})
+            else:
+                with self.report.span("get_families_probabilities", True):
+                    if append:
+                        ticket_generator.load_previous_generation(Utils.find_data_file(f'{self.output_path}/Generation_data_{self.gen_id}'), Utils.find_data_file(f'{self.output_path}/Generation_state_{self.gen_id}'))
+                    else:
+                        ticket_generator.get_families_probabilities(self.canceled, self.generation_params, 10, 6)
+                checkpoint.save_stage("families", {"ticket_generator": ticket_generator})
             wait_time, curr_time = Utils.get_function_time_spent(initial_time)            
             Utils.debug_and_log_data(True, self.logger, f'Family generation Time spent: {wait_time} seconds\nFamilies probabilities memory: {psutil.Process().memory_info().rss / (1024 * 1024)} MB')
     
-        if not self.canceled:
-            ticket_generator.generate_tickets(self.canceled, 20, self.countries, countries_path)
+        if not self.canceled and last_stage < 2 and not cached:
+            if last_stage == 1:
+                checkpoint.load_stage("tickets", {"ticket_generator": ticket_generator})
+            else:
+                with self.report.span("generate_tickets", True):
+                    ticket_generator.generate_tickets(self.canceled, 20, self.countries, countries_path)
+                checkpoint.save_stage("tickets", {"ticket_generator": ticket_generator})
             wait_time, curr_time = Utils.get_function_time_spent(curr_time)
             Utils.debug_and_log_data(True, self.logger, f'Ticket generation Time spent: {wait_time} seconds\nTickets generation memory: {psutil.Process().memory_info().rss / (1024 * 1024)} MB')
 
-        if not self.canceled:
-            ticket_generator.generate_actions(self.canceled, 5, True)
+        if not self.canceled and last_stage < 3 and not cached:
+            if last_stage == 2:
+                checkpoint.load_stage("actions", {"ticket_generator": ticket_generator})
+            else:
+                with self.report.span("generate_actions", True):
+                    ticket_generator.generate_actions(self.canceled, 5, True)
+                checkpoint.save_stage("actions", {"ticket_generator": ticket_generator})
+                stage_cache.save_stage("actions", {"ticket_generator": ticket_generator})
             wait_time, curr_time = Utils.get_function_time_spent(curr_time)
             Utils.debug_and_log_data(True, self.logger, f'Family and subfamily Actions Generation Time spent: {wait_time} seconds')
  
         ticket_treatment = AnalystEmulation(self.gen_id, self.treatment_params, ticket_generator.analysts_info, ticket_generator.family_pool, ticket_generator.subfamily_pool, ticket_generator.family_steps_pool, ticket_generator.special_steps, shifts, ticket_generator.aux_data, self.generation_params["seed"])
+        if append:
+            # The analysts keep the speeds learned in the previous generation
+            ticket_treatment.subfamily_steps_speeds = ticket_generator.previous_steps_speeds
         if not self.canceled:
-            ticket_generator.tickets, family_subtechniques = ticket_treatment.process_tickets(self.canceled, 15, ticket_generator.tickets)
+            if last_stage == 3:
+                family_subtechniques = checkpoint.load_stage("treatment", {"ticket_generator": ticket_generator, "ticket_treatment": ticket_treatment})["family_subtechniques"]
+            else:
+                with self.report.span("process_tickets", True):
+                    ticket_generator.tickets, family_subtechniques = ticket_treatment.process_tickets(self.canceled, 15, ticket_generator.tickets)
+                checkpoint.save_stage("treatment", {"ticket_generator": ticket_generator, "ticket_treatment": ticket_treatment}, {"family_subtechniques": family_subtechniques})
             wait_time, curr_time = Utils.get_function_time_spent(curr_time)
             Utils.debug_and_log_data(True, self.logger, f'Analyst Assignment Time spent: {wait_time} seconds\nTickets assignment memory: {psutil.Process().memory_info().rss / (1024 * 1024)} MB')
 
         if not self.canceled:
-            ticket_generator.output_dataset(self.canceled, 5, self.generation_params["format_selected_idx"], self.output_params, ticket_treatment.actions_similarity, shifts, self.generation_params["family_mapping"], True, self.generation_params["real_family_probs"], self.generation_params["real_dataset"], family_subtechniques, "Wait time", "real")
+            with self.report.span("output_dataset", True):
+                ticket_generator.output_dataset(self.canceled, 5, self.generation_params["format_selected_idx"], self.output_params, ticket_treatment.actions_similarity, shifts, self.generation_params["family_mapping"], True, self.generation_params["real_family_probs"], self.generation_params["real_dataset"], family_subtechniques, "Wait time", "real", ticket_treatment.statistics, ticket_treatment.snapshot_cutoffs)
             wait_time, curr_time = Utils.get_function_time_spent(curr_time)
             Utils.debug_and_log_data(True, self.logger, f'Dataset Output Time spent: {wait_time} seconds\nDataset Output memory: {psutil.Process().memory_info().rss / (1024 * 1024)} MB')
 
         if not self.canceled:
-            generator_info_file = f'{self.output_path}/Generation_data_{self.gen_id}.json'
-            Utils.save_generator_data(generator_info_file, ticket_treatment.family_pool, ticket_treatment.family_steps_pool,
-                                             ticket_treatment.subfamily_pool, ticket_treatment.subfamily_steps_speeds, ticket_treatment.special_steps)
-            input_info_file = f'{self.output_path}/Input_data_{self.gen_id}.json'
+            data_format = self.generation_params["data_format"]
+            generator_data = [ticket_treatment.family_pool, ticket_treatment.family_steps_pool, ticket_treatment.subfamily_pool, ticket_treatment.subfamily_steps_speeds, ticket_treatment.special_steps]
+            generator_info_file = Utils.get_data_file(f'{self.output_path}/Generation_data_{self.gen_id}', data_format)
+            Utils.save_generator_data(generator_info_file, *generator_data)
+            state_info_file = Utils.get_data_file(f'{self.output_path}/Generation_state_{self.gen_id}', data_format)
+            last_raised_tsp = max((ticket["raised_tsp"] for ticket in ticket_generator.tickets.values()), default=0)
+            Utils.save_treatment_state(state_info_file, ticket_treatment.analysts_info, ticket_generator.clients_info, ticket_treatment.priority_queues,
+                                       ticket_generator.id_offset + len(ticket_generator.tickets), last_raised_tsp)
+            input_info_file = Utils.get_data_file(f'{self.output_path}/Input_data_{self.gen_id}', data_format)
             Utils.save_input_data(input_info_file, self.generation_params, self.treatment_params)
+            # Human-readable copy of the generator and input data
+            if self.generation_params["json_export"] and not generator_info_file.endswith(".json"):
+                Utils.save_generator_data(f'{self.output_path}/Generation_data_{self.gen_id}.json', *generator_data)
+                Utils.save_input_data(f'{self.output_path}/Input_data_{self.gen_id}.json', self.generation_params, self.treatment_params)
+            Utils.wait_excel_writers()
+            self.report.save(self.output_path, self.gen_id)
 
             wait_time, curr_time = Utils.get_function_time_spent(curr_time)
             Utils.debug_and_log_data(True, self.logger, f'Generator and Input storage time spent: {wait_time} seconds\nGenerator and Input storage memory: {psutil.Process().memory_info().rss / (1024 * 1024)} MB')
+        else:
+            # The XLSX files started before the cancellation are still written
+            Utils.wait_excel_writers()
 
         time_delta = datetime.now() - initial_time
         generation_time = time_delta.total_seconds()
@@ -5,18 +5,15 @@ Created on Mon Sep  7 15:38:12 2020
 @goal: Main class of the project where the tickets are created and handled by the operators
 """
 
-from Code.Utils import Utils, UtilsParams, BufferedRandomChoiceGenerator
+from Code.Utils import Utils, UtilsParams, BufferedRandomChoiceGenerator, IpSampler
+from Code.Evaluation import Evaluation, DistributionHistograms
 from Code.Configurator import Configurator
 
 import pandas as pd
 from collections import OrderedDict
 from datetime import datetime
-import matplotlib.pyplot as plt
 import numpy as np
 import string, random, sys, pytz, calendar, os
-from memory_profiler import profile
-from scipy.special import kl_div
-from scipy import stats
 
 class DistributionData:
     def __init__(self, ticket_seasonality_selector, ticket_seasonality, fam_seasonality_selector, fam_seasonality, day_time, week_time, day_ticket_spikes, distribution_mode, time_equal_probs, week_equal_probs):
@@ -83,7 +80,7 @@ class SuspiciousData:
         max_coordinated_attack_minutes : int
             Maximum detection time of cordinated attacks.
         suspicious_ips : dict
-            Comprises information about suspicious Ips.
+            Comprises the packed suspicious IPs and their categories.
 
         Returns
         -------
@@ -97,8 +94,12 @@ class SuspiciousData:
         self.min_coordinated_attack_minutes = min_coordinated_attack_minutes
         self.max_coordinated_attack_minutes = max_coordinated_attack_minutes
         self.suspicious_ips = suspicious_ips
+        self.suspicious_windows = Utils.compile_suspicious_windows(suspicious_countries)
 
 class TicketGenerator:
+    # Subtechniques are identified by a byte in hexadecimal
+    SUBTECHNIQUES = [hex(i)[2:] for i in range(256)]
+
     def __init__(self, gen_id, generation_params, logger):
         """
         Initiates essential dictionaries and other relevenat parameters for ticket generation
@@ -119,6 +120,8 @@ class TicketGenerator:
         """
         self._id = gen_id
         self.tickets, self.clients_info, self.family_steps_pool, self.subfamily_pool = {}, {}, {}, {}
+        # (team, family, subfamily action): (reference duration, transfer/other steps version)
+        self.subfamily_durations = {}
         
         self.n_tickets = generation_params["n_tickets"]
         self.ticket_growth_rate = generation_params["ticket_growth_rate"]
@@ -156,6 +159,46 @@ class TicketGenerator:
         self.suspicious_data = SuspiciousData(generation_params["suspicious_countries"], generation_params["suspicious_subfamily"], generation_params["min_coordinated_attack"], generation_params["max_coordinated_attack"], generation_params["min_coordinated_attack_minutes"], generation_params["max_coordinated_attack_minutes"], generation_params["suspicious_ips"])
         self.distribution_data = DistributionData(generation_params["ticket_seasonality_selector"], generation_params["ticket_seasonality"], generation_params["family_seasonality_selector"], generation_params["family_seasonality"], generation_params["family_time_4h"], generation_params["week_time"], generation_params["day_ticket_spikes"], generation_params["distribution_mode"], generation_params["time_equal_probabilities"], generation_params["week_equal_probabilities"])
         self.aux_data = UtilsParams(generation_params["outlier_rate"], generation_params["outlier_cost"], generation_params["action_operations"], generation_params["max_priority_levels"], generation_params["debug"], logger)
+        self.ip_sampler = IpSampler(self.ips_pool[self.ip_selected_idx], generation_params["suspicious_ips"])
+        # Used when extending a previous generation (append mode)
+        self.id_offset, self.append_output, self.previous_steps_speeds = 0, False, {}
+        
+    def load_previous_generation(self, generation_path, state_path):
+        """
+        Loads the families, subfamilies, steps and the final analysts state of a previous generation (replaces get_families_probabilities in append mode).
+
+        Parameters
+        ----------
+        generation_path : str
+            Path of the Generation_data file.
+        state_path : str
+            Path of the Generation_state file.
+
+        Raises
+        ------
+        ValueError
+            if the previous generation ended with pending tickets (they can not be carried into the new window).
+
+        Returns
+        -------
+        None.
+
+        """
+        state = Utils.load_treatment_state(state_path)
+        if any(tickets for team in state["priority_queues"] for tickets in state["priority_queues"][team].values()):
+            raise ValueError("The previous generation ended with pending tickets, so it can not be extended")
+        self.family_pool, self.family_steps_pool, self.subfamily_pool, self.previous_steps_speeds, self.special_steps = Utils.load_generator_data(generation_path)
+        self.analysts_info, self.clients_info = state["analysts_info"], state["clients_info"]
+        self.id_offset, self.append_output = state["tickets_number"], True
+        
+        start_tsp = datetime.strptime(self.start_date, '%d-%m-%Y %H:%M:%S').replace(tzinfo=pytz.utc).timestamp()
+        if start_tsp <= state["last_raised_tsp"]:
+            print(f'Warning: the new window starts before the last ticket of the previous generation ({datetime.fromtimestamp(state["last_raised_tsp"], tz=pytz.utc)})')
+
+        time_slots = (60/5) * 24
+        for family in self.family_pool:
+            Utils.assign_family_probabilities(family, self.family_pool, time_slots, self.distribution_data)
+        Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Previous generation loaded. Tickets already generated: {self.id_offset}')
         
     def get_families_probabilities(self, thread_canceled, generation_params, weight, max_features):
         """
@@ -328,24 +371,16 @@ class TicketGenerator:
             self.family_steps_pool[team][family][step] = {}
 
         if build_subtechniques:
-            sub_techniques = []
             if self.techniques_seasonality_selector:
                 Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Intermediary step dur: {intermediary_techniques_dur[step]}')
                 intermediary_subtechniques_dur = Utils.build_subtechniques_dur(intermediary_techniques_dur[step], sub_techniques_num)
             
-            for i in range(sub_techniques_num):
-                int_technique = random.randint(0, 255)
-                # This will break for negative values -> consider[3:]
-                hex_technique = hex(int_technique)[2:]
-                locked_techniques_pool = sub_techniques + locked
-
-                while str(hex_technique) in locked_techniques_pool:
-                    Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'The technique {hex_technique} already exists. Try another')
-                    int_technique = random.randint(0, 255)
-                    hex_technique = hex(int_technique)[2:]
-
-                sub_techniques.append(hex_technique)
+            # The subtechniques are drawn without replacement among the ones not locked
+            locked_set = set(locked)
+            available = [technique for technique in TicketGenerator.SUBTECHNIQUES if technique not in locked_set]
+            sub_techniques = random.sample(available, k=min(sub_techniques_num, len(available)))
 
+            for i, hex_technique in enumerate(sub_techniques):
                 if self.techniques_seasonality_selector:
                     step_cost = intermediary_subtechniques_dur[i]
                     self.family_steps_pool[team][family][step][hex_technique] = step_cost
@@ -515,19 +550,31 @@ class TicketGenerator:
         locked_techniques = Utils.get_locked_techniques(self.special_steps)
         Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Locked techniques: {locked_techniques}') 
 
+        # Tickets are grouped by (family, subfamily) in order of first appearance, so the actions are built in the same order as before
+        incidents = {}
         for i in dataset.keys():
-            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Ticket id: {i}') 
-            subfamily = dataset[i]["subfamily"]            
-            dataset[i]['team'] = self.subfamily_pool[subfamily]["assigned team"]
-            if dataset[i]['team'] == list(self.analysts_info.keys())[-1]:
-                if 'escalate' in dataset[i]:
-                    dataset[i]['escalate'] = False
-                    
+            incidents.setdefault((dataset[i]["family"], dataset[i]["subfamily"]), []).append(i)
+
+        last_team = list(self.analysts_info.keys())[-1]
+        sub_techniques_range = [self.min_subtechniques_number, self.max_subtechniques_number]
+        for (family, subfamily), tickets_ids in incidents.items():
+            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Family: {family}, Subfamily: {subfamily}, Tickets: {len(tickets_ids)}') 
+            team = self.subfamily_pool[subfamily]["assigned team"]
+            for i in tickets_ids:
+                dataset[i]['team'] = team
+            if team == last_team:
+                for i in tickets_ids:
+                    if 'escalate' in dataset[i]:
+                        dataset[i]['escalate'] = False
+
             if actions_already_built:
-                sub_techniques_range = []
-                sub_techniques_range.append(self.min_subtechniques_number)
-                sub_techniques_range.append(self.max_subtechniques_number)
-                self.build_family_subfamily_actions(dataset[i]["family"], subfamily, sub_techniques_range, locked_techniques)
+                self.build_family_subfamily_actions(family, subfamily, sub_techniques_range, locked_techniques)
+
+        if actions_already_built:
+            family_subtechniques = Utils.get_family_middle_subtechniques(self.family_steps_pool)
+            for family, subfamily in incidents:
+                if subfamily in self.subfamily_pool and self.subfamily_pool[subfamily]["teams_actions"]:
+                    self.get_subfamily_duration(self.subfamily_pool[subfamily]["assigned team"], family, subfamily, family_subtechniques)
 
         Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, "All actions generated for the families and subfamilies") 
 
@@ -564,6 +611,40 @@ class TicketGenerator:
                 Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Sub actions for teams on {subfamily} does not exist')
                 Utils.build_subfamily_action_teams(self.analysts_info, family, subfamily, self.family_pool, self.family_steps_pool, self.subfamily_pool, self.aux_data)
 
+    def get_subfamily_duration(self, team, family, subfamily, family_subtechniques):
+        """
+        Gets the reference duration (without operator speed) of the subfamily action of a team. The durations are memoized
+        per (team, family, subfamily action) and computed again when the transfer or other steps of the family change.
+
+        Parameters
+        ----------
+        team : str
+            Team analyzed.
+        family : str
+            Family analyzed.
+        subfamily : str
+            Subfamily analyzed.
+        family_subtechniques : dict
+            Information about all families analyzed by the teams during ticket treatment.
+
+        Returns
+        -------
+        float
+            Subfamily action duration (in minutes).
+
+        """
+        action = self.subfamily_pool[subfamily]["teams_actions"][team]
+        family_steps = self.family_steps_pool[team][family]
+        # The transfer and other steps are only added, so their size identifies the version
+        version = (len(family_steps["transfer_opt"]), len(family_steps["other_steps"]))
+        key = (team, family, action)
+        cached = self.subfamily_durations.get(key)
+        if cached is None or cached[1] != version:
+            duration, _ = Utils.get_action_duration(family, action, team, None, None, self.family_steps_pool, family_subtechniques, self.aux_data)
+            cached = (duration, version)
+            self.subfamily_durations[key] = cached
+        return cached[0]
+
     def get_timestamps(self, step_transitions, allocated_timestamp, outlier):
         """
         Gets the timestamps of each action step.  
@@ -594,7 +675,7 @@ class TicketGenerator:
 
         return transition_dates
 
-    def output_dataset(self, thread_canceled, weight, format_idx, dataset_params, actions_similarity, shifts_data, family_mapping, show_plots, real_family_probs, real_dataset, family_subtechniques, plot_title, gen_type):        
+    def output_dataset(self, thread_canceled, weight, format_idx, dataset_params, actions_similarity, shifts_data, family_mapping, show_plots, real_family_probs, real_dataset, family_subtechniques, plot_title, gen_type, treatment_statistics, snapshot_cutoffs):        
         """
         Outputs the dataset generated.
 
@@ -618,14 +699,18 @@ class TicketGenerator:
             Show or do not show plots about ticket and family distribution, among other features.
         real_family_probs: dict
             Comprises the probabilities of the real families.
-        real_dataset : dataframe
-            Real dataset.
+        real_dataset : dict
+            Histograms of the real dataset.
         family_subtechniques : dict
             Information about all families analyzed by the teams during ticket treatment
         plot_title : str
             Title of the generated dataset.
         gen_type : str
             Generation with or without real data.
+        treatment_statistics : TreatmentStatistics
+            Statistics accumulated while the tickets were treated (teams, shifts, analysts and incidents).
+        snapshot_cutoffs : list
+            Timestamps where the open and queued tickets were snapshotted (sorted).
 
         Returns
         -------
@@ -647,8 +732,12 @@ class TicketGenerator:
         
         ip_data_features = ["source_ip", "source_port", "destination_ip", "destination_port"]
 
-        wait_times, resolution_times, ticket_dates = [], [], []
-        tickets_summary, priorities_wait_time, dates_month_wait_time, dates_week_wait_time = {}, {}, {}, {}
+        # Only used by the plots, the treatment statistics are accumulated in AnalystEmulation
+        ticket_dates, priorities_wait_time = [], {}
+        with_subfamily_duration = "subfamily action duration" in dataset_params and dataset_params["subfamily action duration"]
+        # The treatment is over, so each (team, subfamily) is looked up once
+        subfamily_durations = {}
+        snapshot_raised, snapshot_allocated, snapshot_fixed, snapshot_priorities = [], [], [], []
 
         for i in self.tickets.keys():
             #print("Ticket id:", i)
@@ -662,13 +751,11 @@ class TicketGenerator:
             client= ticket['client']
             dur= ticket['duration']
             
-            subfamily_dur, transitions= Utils.get_action_duration(family, self.subfamily_pool[subfamily]["teams_actions"][team], team, None, None, self.family_steps_pool, family_subtechniques, self.aux_data)
-
             replicated= False
             if "replicated" in ticket.keys():
                 replicated= True
 
-            ticket_ids.append(i)
+            ticket_ids.append(i + self.id_offset)
             alert_family.append(family)
             family_actions.append(self.family_pool[family]["action"])
             alert_subfamily.append(subfamily)
@@ -686,24 +773,21 @@ class TicketGenerator:
             analyst_action_duration_outlier.append(ticket['duration_outlier'])
             
             wait_time = Utils.calculate_timestamp_diff(ticket['raised_tsp'], ticket['allocated_tsp'], "minutes")
-            if self.family_pool[family]["priority"] not in priorities_wait_time:
-                priorities_wait_time[self.family_pool[family]["priority"]] = {}
-            
-            priorities_wait_time[self.family_pool[family]["priority"]][ticket["raised"]] = wait_time
-            ticket_dates.append(ticket['raised'].date())
-            
-            if wait_time != 0:
-                if ticket['raised'].date() not in dates_month_wait_time:
-                    dates_month_wait_time[ticket['raised'].date()] = []
-                dates_month_wait_time[ticket['raised'].date()].append(wait_time)
-
-                hour_of_week = ticket['raised'].weekday() * 24 + ticket['raised'].hour
-                if hour_of_week not in dates_week_wait_time:
-                    dates_week_wait_time[hour_of_week] = []
-                dates_week_wait_time[hour_of_week].append(wait_time)
-
-            if "subfamily action duration" in dataset_params and dataset_params["subfamily action duration"]:
-                alert_subfamily_duration.append(subfamily_dur)
+            if snapshot_cutoffs:
+                snapshot_raised.append(ticket['raised_tsp'])
+                snapshot_allocated.append(ticket['allocated_tsp'])
+                snapshot_fixed.append(ticket['fixed_tsp'])
+                snapshot_priorities.append(ticket.get("queue_priorities", {}).get(team, {}))
+            if show_plots:
+                if self.family_pool[family]["priority"] not in priorities_wait_time:
+                    priorities_wait_time[self.family_pool[family]["priority"]] = {}
+                priorities_wait_time[self.family_pool[family]["priority"]][ticket["raised"]] = wait_time
+                ticket_dates.append(ticket['raised'].date())
+
+            if with_subfamily_duration:
+                if (team, subfamily) not in subfamily_durations:
+                    subfamily_durations[(team, subfamily)] = self.get_subfamily_duration(team, family, subfamily, family_subtechniques)
+                alert_subfamily_duration.append(subfamily_durations[(team, subfamily)])
             if "team analysts" in dataset_params and dataset_params["team analysts"]:
                 ticket_teams_users.append(list(self.analysts_info[team]["analysts"].keys()))
             #if "analysts actions" in dataset_params and dataset_params["analysts actions"]:
@@ -748,15 +832,16 @@ class TicketGenerator:
                         extra_feat[feature].append(False)
 
             if replicated:
-                similar= f'Replicated from ticket {ticket["replicated"]}'
+                similar= f'Replicated from ticket {ticket["replicated"] + self.id_offset}'
                 similar_tickets.append(similar)
                 ticket_inherited_elapsed_time.append("---")
                 if "coordinated" in dataset_params and dataset_params["coordinated"]:
                     coord_tickets.append("---")
             else:
-                if ticket["similar"]:
-                    similar_tickets.append(ticket["similar_ids"])
-                    ticket_inherited_elapsed_time.append(self.get_last_appearance_time(i, ticket["similar_ids"][-1]))
+                similar_ids = Utils.get_similar_tickets(ticket)
+                if similar_ids:
+                    similar_tickets.append([similar_id + self.id_offset for similar_id in similar_ids] if self.id_offset else similar_ids)
+                    ticket_inherited_elapsed_time.append(self.get_last_appearance_time(i, similar_ids[-1]))
                 else:
                     similar_tickets.append("---")
                     ticket_inherited_elapsed_time.append("--")
@@ -785,37 +870,6 @@ class TicketGenerator:
             else:
                 alert_outliers.append(False)
                 
-            if team not in tickets_summary:
-                tickets_summary[team] = {}
-                tickets_summary[team]["shifts"] = {}
-                tickets_summary[team]["scheduled"] = {}
-                tickets_summary[team]["scheduled"]["other_day"] = 0
-                tickets_summary[team]["scheduled"]["other_shift"] = 0
-                tickets_summary[team]["scheduled"]["others"] = 0
-                
-            resolution_times.append(ticket['duration_outlier'])
-                
-            allocated_shift = Utils.get_ticket_shift(ticket['allocated'].time(), shifts_data)    
-            if allocated_shift not in tickets_summary[team]["shifts"]:
-                tickets_summary[team]["shifts"][allocated_shift] = {}
-                
-            tickets_summary[team]["shifts"][allocated_shift][i] = {}
-            tickets_summary[team]["shifts"][allocated_shift][i]["time_spent"] = dur
-            tickets_summary[team]["shifts"][allocated_shift][i]["wait_time"] = wait_time
-
-            wait_times.append(wait_time)
-            tickets_summary[team]["shifts"][allocated_shift][i]["analyst"] = user
-            tickets_summary[team]["shifts"][allocated_shift][i]["family"] = family
-            tickets_summary[team]["shifts"][allocated_shift][i]["subfamily"] = subfamily
-            
-            if ticket['raised'] != ticket['allocated']:
-                if ticket['raised'].day != ticket['allocated'].day:
-                    tickets_summary[team]["scheduled"]["other_day"] += 1
-                elif Utils.get_ticket_shift(ticket['raised'].time(), shifts_data) != Utils.get_ticket_shift(ticket['allocated'].time(), shifts_data):
-                    tickets_summary[team]["scheduled"]["other_shift"] += 1
-                else:
-                    tickets_summary[team]["scheduled"]["others"] += 1
-                
         data = {'id': ticket_ids, 'country': locations, 'country time':locations_time,    
                 'raised': location_utc_date, 'raised_tsp': location_utc_timestamp,
                 'allocated': ticket_unfixed_time, 'allocated_tsp': ticket_unfixed_time_timestamp, 
@@ -831,6 +885,10 @@ class TicketGenerator:
                 'similar': similar_tickets, 'inheritance elapsed time': ticket_inherited_elapsed_time, 
                 'status': ticket_status, 'escalate': ticket_escalate, 'suspicious': ticket_suspicious,
                 'outlier': alert_outliers, 'shifted': alert_shifted}
+        
+        for feature in ["source_ip", "destination_ip"]:
+            if feature in extra_feat:
+                extra_feat[feature] = self.ip_sampler.format_ips(extra_feat[feature])
 
             
         if gen_type == "real":
@@ -840,8 +898,10 @@ class TicketGenerator:
         else:
             output_path = f'Dataset_uniform_{self._id}'
         
-        dataset = Utils.format_generation_datasets(data, output_path, format_idx, dataset_params, extra_feat, plot_title)
+        dataset = Utils.format_generation_datasets(data, output_path, format_idx, dataset_params, extra_feat, plot_title, self.append_output)
         Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, "Tickets outputted")
+        if snapshot_cutoffs:
+            self.output_snapshots(dataset, output_path, format_idx, plot_title, snapshot_cutoffs, snapshot_raised, snapshot_allocated, snapshot_fixed, snapshot_priorities, ticket_int_priority, ticket_priority)
         
         if show_plots:
             self.plot_ticket_distribution(dataset, "daily")
@@ -856,12 +916,65 @@ class TicketGenerator:
 
         if real_dataset is not None:
             self.evaluate_real_synthetic_datasets(dataset, real_dataset, real_family_probs, family_mapping, show_plots)
-        self.evaluate_team_performance(tickets_summary)
-        self.get_tickets_statistics(tickets_summary, len(self.tickets), wait_times, resolution_times)
+        self.evaluate_team_performance(treatment_statistics)
+        self.get_tickets_statistics(treatment_statistics, len(self.tickets))
           
+    def output_snapshots(self, dataset, output_path, format_idx, plot_title, snapshot_cutoffs, raised_tsp, allocated_tsp, fixed_tsp, queue_priorities, init_priorities, priorities):
+        """
+        Outputs, for each cutoff, the training dataset (tickets resolved before the cutoff) and the test dataset 
+        (tickets open at the cutoff, either queued or in treatment, with their queue priority and wait so far).
+
+        Parameters
+        ----------
+        dataset : dataframe
+            Dataset generated (one row per ticket).
+        output_path : str
+            Name of the generated dataset.
+        format_idx : int
+            0 - CSV and 1 - XLSX.
+        plot_title : str
+            Title of the generated dataset.
+        snapshot_cutoffs : list
+            Timestamps of the cutoffs (sorted).
+        raised_tsp : list
+            Raised timestamp of each ticket.
+        allocated_tsp : list
+            Allocated timestamp of each ticket.
+        fixed_tsp : list
+            Fixed timestamp of each ticket.
+        queue_priorities : list
+            Priority queue of each ticket in its team when the treatment reached each cutoff (cutoff index: priority).
+        init_priorities : list
+            Initial priority of each ticket.
+        priorities : list
+            Priority of each ticket when it was allocated.
+
+        Returns
+        -------
+        None.
+
+        """
+        raised_tsp, allocated_tsp, fixed_tsp = np.asarray(raised_tsp), np.asarray(allocated_tsp), np.asarray(fixed_tsp)
+        for idx, cutoff_tsp in enumerate(snapshot_cutoffs):
+            cutoff_name = Utils.get_tsp_datetime(cutoff_tsp).strftime('%Y%m%d_%H%M%S')
+            resolved = fixed_tsp <= cutoff_tsp
+            rows = np.flatnonzero((raised_tsp <= cutoff_tsp) & ~resolved)
+            queued = allocated_tsp[rows] > cutoff_tsp
+
+            snapshot = dataset.iloc[rows].copy()
+            snapshot["snapshot status"] = np.where(queued, "Queued", "In treatment")
+            # Tickets not found in the priority queues had not been queued yet by the treatment (initial priority)
+            snapshot["queue priority"] = [queue_priorities[row].get(idx, init_priorities[row]) if is_queued else priorities[row] for row, is_queued in zip(rows, queued)]
+            snapshot["wait so far"] = np.round((np.minimum(allocated_tsp[rows], cutoff_tsp) - raised_tsp[rows]) / 60)
+
+            Utils.save_dataset(dataset.iloc[np.flatnonzero(resolved)], f'{output_path}_train_{cutoff_name}', format_idx, plot_title)
+            Utils.save_dataset(snapshot, f'{output_path}_open_{cutoff_name}', format_idx, plot_title)
+            print(f'Snapshot {cutoff_name}: {int(resolved.sum())} resolved tickets, {len(rows)} open tickets ({int(queued.sum())} queued)')
+
     # Plots monthly ticket distribution
     def plot_monthly_distribution(self, dataset):
         
+        import matplotlib.pyplot as plt
         dataset['raised'] = pd.to_datetime(dataset['raised'])
         dataset['month'] = dataset['raised'].dt.month
         day_counts = dataset['month'].value_counts().sort_index()
@@ -893,6 +1006,7 @@ class TicketGenerator:
         None.
 
         """
+        import matplotlib.pyplot as plt
         dataset['raised'] = pd.to_datetime(dataset['raised'])
         
         plt.figure(figsize=(10, 6))
@@ -943,6 +1057,7 @@ class TicketGenerator:
         None.
 
         """
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(10, 6))
         family_counts = dataset['family'].value_counts()
         family_counts.plot(kind='bar', figsize=(10, 5))
@@ -1074,7 +1189,7 @@ class TicketGenerator:
                 utc_datetime, timestamp = Utils.build_date(stime, etime, selected_dates[i], selected_times[i])
                     
                 unsorted_tickets[i] = {}
-                Utils.update_data(unsorted_tickets[i], raised = utc_datetime, raised_tsp = timestamp, country = country, allocated = utc_datetime, allocated_tsp = timestamp, temp_allocated = utc_datetime, temp_allocated_tsp = timestamp, client = clients[i], team = "", analyst = None, action = None, duration = None, duration_outlier = None, replication_status = None, similarity_analysis = False, outlier = next(outlier_choices.generate()), similar = [], escalate = next(escalate_choices.generate()))
+                Utils.update_data(unsorted_tickets[i], raised = utc_datetime, raised_tsp = timestamp, country = country, allocated_tsp = timestamp, temp_allocated_tsp = timestamp, client = clients[i], team = "", analyst = None, action = None, duration = None, duration_outlier = None, replication_status = None, similarity_analysis = False, outlier = next(outlier_choices.generate()), similar_group = None, similar_offset = 0, escalate = next(escalate_choices.generate()))
     
                 # Different clients may share the network
                 if clients[i] not in self.clients_info.keys():
@@ -1136,7 +1251,13 @@ class TicketGenerator:
                 ordered_tickets[l]["subfamily"] = f'{family}_{random.randint(1, self.family_pool[family]["subtypes"])}' 
                 Utils.update_subfamily_pool(ordered_tickets[l]["subfamily"], self.subfamily_pool, self.suspicious_data)
             
-            self.assign_extra_features(ordered_tickets[l], countries_data, dst_port_type)
+            self.assign_extra_features(ordered_tickets[l])
+            
+        suspicious = Utils.check_tickets_suspicious(list(ordered_tickets.values()), self.subfamily_pool, self.suspicious_data.suspicious_windows)
+        for l in range(self.n_tickets):
+            ordered_tickets[l]['suspicious'] = bool(suspicious[l])
+            
+        Utils.assign_tickets_ips(ordered_tickets, self.family_pool, self.clients_info, countries_data, self.ip_sampler, dst_port_type, self.aux_data)
             
         for team in self.analysts_info.keys():
             self.tickets[team] = {}
@@ -1145,18 +1266,14 @@ class TicketGenerator:
         for k in range(len(ordered_tickets)):
             self.tickets[first_team][k] = ordered_tickets[k]
                 
-    def assign_extra_features(self, ticket, countries, dst_port_type):
+    def assign_extra_features(self, ticket):
         """
-        Assigns extra features to each ticket (priority, suspicious, and others)
+        Assigns extra features to each ticket (priority and others). Suspicious tickets are checked in batch afterwards.
 
         Parameters
         ----------
         ticket : dict
             Comprises information about the current ticket.
-        countries : dict
-            Comprises information about the countries collected from an external file.
-        dst_port_type : BufferedRandomChoiceGenerator
-            Can be either well-known or registered.
 
         Returns
         -------
@@ -1164,104 +1281,85 @@ class TicketGenerator:
 
         """
         family = ticket["family"]
-        subfamily = ticket["subfamily"]
 
-        ticket['suspicious'] = Utils.check_ticket_suspicious(ticket, self.subfamily_pool[subfamily]['suspicious'], self.suspicious_data.suspicious_countries)
         ticket['priority'] = self.family_pool[family]["priority"]
         ticket['extra_features'] = self.family_pool[family]["extra_features"]
-
-        Utils.assign_ticket_ip(self.family_pool[family]["ip"], ticket, self.clients_info, self.suspicious_data.suspicious_ips, self.ips_pool, self.ip_selected_idx, countries, self.aux_data, dst_port_type)
         #Utils.set_extra_features_values(ticket, self.family_pool[family]["extra_features"])
         
-    def get_tickets_statistics(self, team_analytics, tickets_number, wait_times, resolution_times):
+    def get_tickets_statistics(self, treatment_statistics, tickets_number):
         """
         Gets statistics about the treated tickets (wait time, tickets shifted for later date, among other features).
 
         Parameters
         ----------
-        teams_analytics : dict
-            Comprises information about the teams and their shifts
+        treatment_statistics : TreatmentStatistics
+            Statistics accumulated while the tickets were treated.
         tickets_number : int
             Number of tickets analyzed.
-        wait_times : list
-            Comprises information about the time each ticket had to wait to be treated.
-        resolution_times : list
-            Comprises information about the time taken by operators to fix each ticket.
             
         Returns
         -------
         None.
 
         """
-        tickets_shifted = 0
-        for team in team_analytics:
-            tickets_shifted += team_analytics[team]["scheduled"]["others"]
-            tickets_shifted += team_analytics[team]["scheduled"]["other_day"]
-            tickets_shifted += team_analytics[team]["scheduled"]["other_shift"]
-           
+        tickets_shifted = treatment_statistics.get_tickets_shifted()
         messages = [
             f'N tickets shifted: {tickets_shifted}',
             f'Percentage of tickets shifted: {round((tickets_shifted/tickets_number), 2)}',
-            f'Wait time average: {round((sum(wait_times) / len(wait_times)), 2)}',
-            f'Wait time standard deviation: {round(np.std(wait_times), 2)}',
-            f'Resolution time average: {round((sum(resolution_times) / len(resolution_times)), 2)}']
+            f'Wait time average: {round(treatment_statistics.wait_time.mean, 2)}',
+            f'Wait time standard deviation: {round(treatment_statistics.wait_time.get_std(), 2)}',
+            f'Resolution time average: {round(treatment_statistics.resolution_time.mean, 2)}']
         
         for msg in messages:
             Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, msg)
         
-    def evaluate_team_performance(self, teams_analytics):
+    def evaluate_team_performance(self, treatment_statistics):
         """
         Evaluates the teams performance over the different shifts
 
         Parameters
         ----------
-        teams_analytics : dict
-            Comprises information about the teams and their shifts
+        treatment_statistics : TreatmentStatistics
+            Statistics accumulated while the tickets were treated (teams and their shifts).
         Returns
         -------
         None.
 
         """
         Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, "---  Team Evaluation ---")
-        for team in teams_analytics:
+        for team, team_statistics in treatment_statistics.teams.items():
             Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Team {team} has {len(self.analysts_info[team]["analysts"])} analysts: {list(self.analysts_info[team]["analysts"].keys())}')
             
             shift_performance = {}
-            for shift in teams_analytics[team]["shifts"]:
-                shift_performance[shift] = {}
-                Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Shift {shift} treated {len(teams_analytics[team]["shifts"][shift].keys())} tickets. Ids: {list(teams_analytics[team]["shifts"][shift].keys())}')
-
-                total_wait_time, total_time_spent = 0,0
-                for ticket_id in teams_analytics[team]["shifts"][shift]:
-                    total_wait_time += teams_analytics[team]["shifts"][shift][ticket_id]["wait_time"]
-                    total_time_spent += teams_analytics[team]["shifts"][shift][ticket_id]["time_spent"]
-                
-                Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Total amount of time spent (minutes): {total_time_spent}. Average time spent (in minutes): {total_time_spent/len(teams_analytics[team]["shifts"][shift].keys())}')
-                shift_performance[shift]["n_tickets"] = len(teams_analytics[team]["shifts"][shift].keys())
-                shift_performance[shift]["time_spent"] = total_time_spent
-                shift_performance[shift]["wait_time"] = total_wait_time
+            for shift, shift_statistics in team_statistics["shifts"].items():
+                time_spent, wait_time = shift_statistics["time_spent"], shift_statistics["wait_time"]
+                Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Shift {shift} treated {time_spent.count} tickets')
+                Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Total amount of time spent (minutes): {time_spent.total}. Average time spent (in minutes): {time_spent.mean}')
+                shift_performance[shift] = {"n_tickets": time_spent.count, "time_spent": time_spent.total, "wait_time": wait_time.total}
             
-            Utils.analyse_shifts_performance(shift_performance, teams_analytics[team]["shifts"], self.analysts_info[team]["analysts"])
+            Utils.analyse_shifts_performance(shift_performance, team_statistics, self.analysts_info[team]["analysts"])
             
+            scheduled = team_statistics["scheduled"]
             messages = [
-                f'Number of Scheduled tickets: {teams_analytics[team]["scheduled"]["other_day"] + teams_analytics[team]["scheduled"]["other_shift"] + teams_analytics[team]["scheduled"]["others"]}',
-                f'Number of Scheduled tickets to other day: {teams_analytics[team]["scheduled"]["other_day"]}',
-                f'Number of Scheduled tickets to other shift: {teams_analytics[team]["scheduled"]["other_shift"]}',
-                f'Number of Scheduled tickets later in their shift: {teams_analytics[team]["scheduled"]["others"]}']
+                f'Number of Scheduled tickets: {scheduled["other_day"] + scheduled["other_shift"] + scheduled["others"]}',
+                f'Number of Scheduled tickets to other day: {scheduled["other_day"]}',
+                f'Number of Scheduled tickets to other shift: {scheduled["other_shift"]}',
+                f'Number of Scheduled tickets later in their shift: {scheduled["others"]}']
             
             for msg in messages:
                 Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, msg)
             
-    def evaluate_real_synthetic_datasets(self, dataset, real_dataset, real_family_probs, family_mapping, show_plots):
+    def evaluate_real_synthetic_datasets(self, dataset, real_histograms, real_family_probs, family_mapping, show_plots):
         """
-        Compares the real and synthetic dataset using similarity measures and visual analysis
+        Compares the real and synthetic dataset using divergence measures over the families, raise hours, weekdays, months and durations, and visual analysis.
+        The metrics are stored in the Output folder (Evaluation_{id}.json).
 
         Parameters
         ----------
         dataset : dataframe
             Dataset generated.
-        real_dataset : dataframe
-            Real Dataset.
+        real_histograms : dict
+            Histograms of the real dataset.
         real_family_probs: dict
             Comprises the probabilities of the real families.
         family_mapping : dict
@@ -1275,69 +1373,42 @@ class TicketGenerator:
 
         """
         Utils.debug_and_log_data(True, self.aux_data.logger, "--- Comparison between the Real and Synthetic Datasets ---")
-        synthetic_family_probs = dataset['family'].value_counts(normalize=True).sort_index()
-    
         print("Real probs:", real_family_probs)
-        print("Synthetic probs:", synthetic_family_probs)
-        kl_divergence = kl_div(real_family_probs, synthetic_family_probs).sum()
-        hellinger_distance = np.sqrt(np.sum((np.sqrt(real_family_probs) - np.sqrt(synthetic_family_probs)) ** 2)) / np.sqrt(2)
-        Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Kl_divergences: {kl_divergence}. Hellinger distance: {hellinger_distance}')
-        
-        synthetic_families = list(dataset['family'].unique())
-        filtered_df = real_dataset[real_dataset["Family"].isin(synthetic_families)]
-        ks_statistic, p_value = stats.ks_2samp(filtered_df["Family"], dataset["family"])
-        Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'KS Statistic: {ks_statistic}. P-value: {p_value}')
+        synthetic = DistributionHistograms()
+        synthetic.add(dataset['raised'].to_numpy(), dataset['family'].to_numpy(), dataset['duration'].to_numpy())
+        synthetic_histograms = synthetic.get_histograms()
         
-        #real_feature_stats = real_dataset["Family"].describe()
-        #synthetic_feature_stats = dataset["family"].describe()
-        #print("Real Data Stats:", real_feature_stats)
-        #print("Synthetic Data Stats:", synthetic_feature_stats)
+        metrics = Evaluation.compare_histograms(real_histograms, synthetic_histograms)
+        for distribution, distribution_metrics in metrics.items():
+            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'{distribution}: {distribution_metrics}')
+        Evaluation.save_metrics(f'./Output/Generation/Evaluation_{self._id}.json', {"metrics": metrics, "real_histograms": real_histograms, "synthetic_histograms": synthetic_histograms})
     
         if show_plots:
-            dataset['Year/month'] = dataset['raised'].apply(lambda x: datetime.strftime(x, '%m'))
-            a4_dims = (30, 12)
-            fig, ax = plt.subplots(figsize=a4_dims)
-            freq = dataset.pivot_table(index="Year/month", columns="family", aggfunc="size", fill_value=0)
-            families = sorted(freq.columns)
-            months = freq.index
-            cumulative = np.zeros(len(months))
-            freq = freq[families]
-        
-            for family in families:
-                plt.barh(months, freq[family], left=cumulative, label=family)
-                cumulative += freq[family]
-            plt.xlabel("Ticket Frequency")
-            plt.ylabel("Months")
-            plt.xlim(0, 830)
-            #plt.title("Stacked Horizontal Bar Chart of Family Frequency by Year/Month")
-            plt.legend(fontsize = 24, bbox_to_anchor=(1.01, 0.5) , loc='center left', ncol= 1, borderaxespad=0.,)
+            import matplotlib.pyplot as plt
+            freq = pd.crosstab(pd.to_datetime(dataset['raised']).dt.strftime('%m').rename("Year/month"), dataset['family'])
+            ax = freq[sorted(freq.columns)].plot.barh(stacked=True, figsize=(30, 12), xlim=(0, 830))
+            ax.set_xlabel("Ticket Frequency")
+            ax.set_ylabel("Months")
+            ax.legend(fontsize = 24, bbox_to_anchor=(1.01, 0.5) , loc='center left', ncol= 1, borderaxespad=0.,)
             plt.tight_layout()
             os.makedirs("Plots", exist_ok=True)
             plt.savefig('Plots\\generated_families_month.svg', format="svg")
             plt.show()
             
             Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Generated families: {self.family_pool.keys()}')
-            real_families, real_families_mean = [], []
-            families_mapping = {}
-
-            for gen_family in self.family_pool.keys():
-                real_fam = self.family_pool[gen_family]["real_family"]
-                real_families.append(real_fam)
-                real_families_mean.append(self.family_mean_duration[real_fam])    
+            generated_families = list(self.family_pool.keys())
+            real_families = [self.family_pool[family]["real_family"] for family in generated_families]
+            real_families_mean = [self.family_mean_duration[real_family] for real_family in real_families]
+            families_mapping = dict(zip(generated_families, real_families))
             Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Real families: {real_families}. Real families values: {real_families_mean}')
-
-            for family in self.family_pool.keys():
-                real_family = self.family_pool[family]["real_family"]
-                families_mapping[family] = real_family
             Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Families mapping: {families_mapping}')
 
-            zipped = list(zip(real_families, real_families_mean))
-            original_family_distribution = pd.DataFrame(zipped, columns=['family', 'mean'])
+            original_family_distribution = pd.DataFrame({'family': real_families, 'mean': real_families_mean})
             Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Original: {original_family_distribution}')
 
-            family_duration_distribution = dataset.groupby('family')['duration'].mean().reset_index(name="mean")
-            family_duration_distribution_mapped=family_duration_distribution.replace({"Family": families_mapping})
-            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Generated Mean Time spent mapped: {family_duration_distribution_mapped}')
+            # Aligned with the real families (family pool order)
+            family_duration_distribution = dataset.groupby('family')['duration'].mean().reindex(generated_families).reset_index(name="mean")
+            Utils.debug_and_log_data(self.aux_data.debug, self.aux_data.logger, f'Generated Mean Time spent mapped: {family_duration_distribution.replace({"family": families_mapping})}')
 
             x = np.arange(len(real_families))
             width = 0.2
@@ -1347,7 +1418,7 @@ class TicketGenerator:
             axs.bar(x + width/2, original_family_distribution['mean'], width = width, label = "Real", edgecolor = "black")
 
             axs.set_xticks(x)
-            axs.set_xticklabels(list(self.family_pool.keys()))
+            axs.set_xticklabels(generated_families)
             axs.set_title("Families Mean Resolution Duration")
             axs.set_xlabel("Families", fontsize=20)
             axs.set_ylabel("Time (minutes)", fontsize=20)
@@ -1390,7 +1390,7 @@ class SNOOKER(QMainWindow):
 
         """
         print("Received Connection Object")
-        self.generation_params["ticket_seasonality"], self.generation_params["family_seasonality"], self.generation_params["family_mean_duration"], self.generation_params["family_mapping"] = Configurator.get_ticket_seasonality(self.file, True, conn, False)
+        self.generation_params["ticket_seasonality"], self.generation_params["family_seasonality"], self.generation_params["family_mean_duration"], self.generation_params["family_mapping"], self.generation_params["real_family_probs"], self.generation_params["real_dataset"] = Configurator.get_ticket_seasonality(self.file, True, conn, False)
 
     def pick_distribution_method(self, d):
         """
@@ -2472,7 +2472,7 @@ class SNOOKER(QMainWindow):
         
         if self.file != "":            
             filename, file_extension = os.path.splitext(self.file)
-            if file_extension == '.csv' or file_extension == '.xlsx':
+            if file_extension == '.csv' or file_extension == '.xlsx' or file_extension == '.profile':
                 self.file = os.path.basename(self.file)
                 print("File:", self.file)
                 self.fileButton.setText(self.file)
@@ -2484,7 +2484,7 @@ class SNOOKER(QMainWindow):
                 self.ticket_season_toggle.setChecked(True)
                 print("Real Dataset loaded successfully!")
             else:
-                InterfaceUtils.pop_message("Real Dataset Load", "The file chosen must be an valid dataset (csv or xlsx)!")
+                InterfaceUtils.pop_message("Real Dataset Load", "The file chosen must be an valid dataset (csv, xlsx or profile)!")
                 print("The file loaded is invalid.")
         else:
             print("Operation Canceled")
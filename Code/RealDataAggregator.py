@@ -0,0 +1,293 @@
+"""
+Created on Mon Oct 19 14:03:05 2026
+
+@author: agent
+@goal: Aggregates the real dataset chunk by chunk (daily tickets, monthly families and family durations) without keeping the tickets in memory
+"""
+
+import numpy as np
+import pandas as pd
+from Code.Evaluation import DistributionHistograms
+
+class RealDataAggregator:
+    def __init__(self):
+        """
+        Initiates a RealDataAggregator. Tickets with missing data that depend on the whole dataset (random families and missing steps)
+        are kept aside and repaired in finalize.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.n_tickets, self.removed = 0, 0
+        self.start_date = None
+        # Tickets per month-day (month * 100 + day)
+        self.daily_counts = np.zeros(1232, dtype=np.int64)
+        self.month_family_counts = {}
+        # Family: [duration sum, ticket count, first raised]
+        self.family_durations = {}
+        # Family: subfamilies observed
+        self.families_info = {}
+        # Subfamily: [time spent, ticket count, min init date]
+        self.subfamilies_mean = {}
+        self.pending_families, self.pending_steps = [], []
+        self.histograms = DistributionHistograms()
+
+    def parse_steps_timestamps(steps):
+        """
+        Parses the step timestamps of every ticket at once. The timestamps are exploded into a flat int64 array
+        (the offsets mark the first step of each ticket) and reduced to the first and last step of each ticket.
+
+        Parameters
+        ----------
+        steps : series
+            Timestamps of the steps used in ticket treatment (e.g., "[1600000000, 1600000060]").
+
+        Returns
+        -------
+        first_step : array
+            Timestamp (seconds) of the first step of each ticket (-1 if the steps are null).
+        last_step : array
+            Timestamp (seconds) of the last step of each ticket (-1 if the steps are null).
+        removed : array
+            Tickets with a single step or with wrong timestamps.
+
+        """
+        n_tickets = len(steps)
+        first_step, last_step = np.full(n_tickets, -1, dtype=np.int64), np.full(n_tickets, -1, dtype=np.int64)
+        removed = np.zeros(n_tickets, dtype=bool)
+        not_null = steps.notna().to_numpy()
+        if not not_null.any():
+            return first_step, last_step, removed
+
+        parts = steps[not_null].astype(str).str.replace('[', '', regex=False).str.replace(']', '', regex=False).str.split(', ')
+        lengths = parts.str.len().to_numpy()
+        values = pd.to_numeric(parts.explode().str.strip(), errors="coerce").to_numpy(dtype=np.float64)
+        valid_values = np.isfinite(values)
+        timestamps = np.trunc(np.where(valid_values, values, 0)).astype(np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        invalid = np.add.reduceat(~valid_values, offsets) > 0
+        ticket_removed = invalid | (lengths == 1)
+        first_step[not_null] = np.minimum.reduceat(timestamps, offsets)
+        last_step[not_null] = np.maximum.reduceat(timestamps, offsets)
+        removed[not_null] = ticket_removed
+        return first_step, last_step, removed
+
+    def add_chunk(self, chunk):
+        """
+        Adds a chunk of the real dataset (Family, Subfamily and Steps columns).
+        Null families are extracted from the subfamily or, if both are null, picked in finalize.
+
+        Parameters
+        ----------
+        chunk : dataframe
+            Chunk of the real dataset.
+
+        Returns
+        -------
+        None.
+
+        """
+        chunk = chunk.dropna(subset=['Steps', 'Family', 'Subfamily'], how="all")
+        first_step, last_step, removed = RealDataAggregator.parse_steps_timestamps(chunk['Steps'])
+        keep = ~removed
+        self.removed += int(removed.sum())
+        families = chunk['Family'].astype(object).to_numpy()[keep]
+        subfamilies = chunk['Subfamily'].astype(object).to_numpy()[keep]
+        first_step, last_step = first_step[keep], last_step[keep]
+
+        null_family, null_subfamily = pd.isnull(families), pd.isnull(subfamilies)
+        from_subfamily = null_family & ~null_subfamily
+        if from_subfamily.any():
+            families[from_subfamily] = pd.Series(subfamilies[from_subfamily]).astype(str).str.split("-").str[0].to_numpy()
+        incidents = pd.DataFrame({'Family': families[~null_subfamily], 'Subfamily': subfamilies[~null_subfamily]}).dropna().drop_duplicates()
+        for family, subfamily in incidents.itertuples(index=False):
+            if subfamily not in self.families_info.setdefault(family, []):
+                self.families_info[family].append(subfamily)
+
+        random_incident = null_family & null_subfamily
+        if random_incident.any():
+            self.pending_families.append((first_step[random_incident], last_step[random_incident]))
+        self.add_tickets(families[~random_incident], subfamilies[~random_incident], first_step[~random_incident], last_step[~random_incident])
+
+    def add_tickets(self, families, subfamilies, first_step, last_step):
+        """
+        Adds tickets with known family. Their subfamily durations are accumulated and tickets without steps are kept aside.
+
+        Parameters
+        ----------
+        families : array
+            Family of each ticket.
+        subfamilies : array
+            Subfamily of each ticket.
+        first_step : array
+            Timestamp (seconds) of the first step of each ticket (-1 if the steps are null).
+        last_step : array
+            Timestamp (seconds) of the last step of each ticket (-1 if the steps are null).
+
+        Returns
+        -------
+        None.
+
+        """
+        with_steps = first_step != -1
+        durations = np.round((last_step[with_steps] - first_step[with_steps]) / 60).astype(np.int64)
+
+        subfamily_data = pd.DataFrame({'Subfamily': subfamilies[with_steps], 'first_step': first_step[with_steps], 'time_spent': durations}).dropna()
+        grouped = subfamily_data.groupby('Subfamily').agg(time_spent=('time_spent', 'sum'), count=('time_spent', 'size'), min_init=('first_step', 'min'))
+        for subfamily, time_spent, count, min_init in grouped.itertuples():
+            if subfamily not in self.subfamilies_mean:
+                self.subfamilies_mean[subfamily] = [0, 0, min_init]
+            self.subfamilies_mean[subfamily][0] += time_spent
+            self.subfamilies_mean[subfamily][1] += count
+            self.subfamilies_mean[subfamily][2] = min(self.subfamilies_mean[subfamily][2], min_init)
+
+        if not with_steps.all():
+            self.pending_steps.append((families[~with_steps], subfamilies[~with_steps]))
+        self.add_resolved(families[with_steps], first_step[with_steps], durations)
+
+    def add_resolved(self, families, raised, durations):
+        """
+        Adds tickets with family, raise timestamp and duration to the aggregates.
+
+        Parameters
+        ----------
+        families : array
+            Family of each ticket.
+        raised : array
+            Raise timestamp (seconds) of each ticket.
+        durations : array
+            Duration (minutes) of each ticket.
+
+        Returns
+        -------
+        None.
+
+        """
+        if len(raised) == 0:
+            return
+
+        dates = pd.to_datetime(raised, unit='s')
+        start_date = dates.min()
+        if self.start_date is None or start_date < self.start_date:
+            self.start_date = start_date
+        self.n_tickets += len(raised)
+        self.daily_counts += np.bincount((dates.month * 100 + dates.day).to_numpy(), minlength=len(self.daily_counts))
+
+        # The durations are scaled as the family mean durations used in the generation
+        self.histograms.add(raised, families, durations * 0.1)
+        tickets = pd.DataFrame({'month': dates.month, 'Family': families, 'duration': durations, 'raised': raised})
+        for (month, family), count in tickets.groupby(['month', 'Family']).size().items():
+            self.month_family_counts[(month, family)] = self.month_family_counts.get((month, family), 0) + count
+        for family, duration, count, first_raised in tickets.groupby('Family').agg(duration=('duration', 'sum'), count=('duration', 'size'), first_raised=('raised', 'min')).itertuples():
+            if family not in self.family_durations:
+                self.family_durations[family] = [0, 0, first_raised]
+            self.family_durations[family][0] += duration
+            self.family_durations[family][1] += count
+            self.family_durations[family][2] = min(self.family_durations[family][2], first_raised)
+
+    def finalize(self):
+        """
+        Repairs the tickets kept aside: random families/subfamilies are picked among the existing ones and tickets without steps
+        get a duration close to their subfamily mean, placed one after the other starting on the first ticket of the subfamily.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.pending_families:
+            first_step = np.concatenate([pending[0] for pending in self.pending_families])
+            last_step = np.concatenate([pending[1] for pending in self.pending_families])
+            # The subfamilies of all families are flattened (offsets point to the first subfamily of each family)
+            families = list(self.families_info.keys())
+            counts = np.array([len(self.families_info[family]) for family in families])
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            all_subfamilies = np.array([subfamily for family in families for subfamily in self.families_info[family]], dtype=object)
+            families_picked = np.random.randint(len(families), size=len(first_step))
+            subfamilies_picked = offsets[families_picked] + (np.random.random(len(first_step)) * counts[families_picked]).astype(int)
+            self.pending_families = []
+            self.add_tickets(np.array(families, dtype=object)[families_picked], all_subfamilies[subfamilies_picked], first_step, last_step)
+
+        if self.pending_steps:
+            families = pd.Series(np.concatenate([pending[0] for pending in self.pending_steps]))
+            subfamilies = pd.Series(np.concatenate([pending[1] for pending in self.pending_steps]))
+            subfamilies_mean = pd.DataFrame.from_dict(self.subfamilies_mean, orient="index", columns=["time_spent", "count", "min init date"])
+            means = (subfamilies_mean["time_spent"] / subfamilies_mean["count"]).astype(np.int64)
+            # Subfamilies without steps use the average of the subfamilies mean
+            sub_mean = subfamilies.map(means).fillna(int((subfamilies_mean["time_spent"] / subfamilies_mean["count"]).mean())).to_numpy(dtype=np.int64)
+            start = subfamilies.map(subfamilies_mean["min init date"]).fillna(subfamilies_mean["min init date"].min()).to_numpy(dtype=np.int64)
+            sub_mean += np.random.randint(-4, 5, size=len(sub_mean))
+            previous = pd.Series(sub_mean).groupby(subfamilies.fillna("").to_numpy()).cumsum().to_numpy() - sub_mean
+            self.pending_steps = []
+            print(f'Tickets without steps: {len(sub_mean)}')
+            self.add_resolved(families.to_numpy(), start + previous * 60, sub_mean)
+
+        if self.removed:
+            print(f'Entries removed: {self.removed}')
+
+    def get_families(self):
+        """
+        Gets the families ordered by their first ticket (ties are ordered by name, so the order does not depend on the chunks).
+
+        Returns
+        -------
+        list
+            Families.
+
+        """
+        return [family for family, _ in sorted(self.family_durations.items(), key=lambda x: (x[1][2], str(x[0])))]
+
+    def get_family_counts(self):
+        """
+        Gets the number of tickets of each family.
+
+        Returns
+        -------
+        dict
+            Tickets per family.
+
+        """
+        return {family: data[1] for family, data in self.family_durations.items()}
+
+    def get_family_duration_distribution(self):
+        """
+        Gets the mean duration of each family.
+
+        Returns
+        -------
+        dataframe
+            Dataset with two columns (Family and mean).
+
+        """
+        families = sorted(self.family_durations)
+        return pd.DataFrame({'Family': families, 'mean': [self.family_durations[family][0] / self.family_durations[family][1] for family in families]})
+
+    def get_family_distribution(self):
+        """
+        Gets the number of tickets of each family in each month (families without tickets in a month have count 0).
+
+        Returns
+        -------
+        dataframe
+            Dataset with three columns (Year/month, Family and Count).
+
+        """
+        months, families = sorted({month for month, _ in self.month_family_counts}), sorted(self.family_durations)
+        rows = [(f'{month:02d}', family, self.month_family_counts.get((month, family), 0)) for month in months for family in families]
+        return pd.DataFrame(rows, columns=['Year/month', 'Family', 'Count'])
+
+    def get_daily_tickets(self):
+        """
+        Gets the number of tickets in each month-day.
+
+        Returns
+        -------
+        dataframe
+            Dataset with two columns (Month_day and Ticket_count).
+
+        """
+        days = np.flatnonzero(self.daily_counts)
+        return pd.DataFrame({'Month_day': [f'{day // 100:02d}-{day % 100:02d}' for day in days], 'Ticket_count': self.daily_counts[days]})
@@ -0,0 +1,309 @@
+"""
+Created on Mon Oct 19 13:53:32 2026
+
+@author: agent
+@goal: Collects spans, counters, histograms and memory usage of a generation run and stores them in a report
+"""
+
+import time, math, json, os, sys
+import psutil
+
+class Span:
+    def __init__(self, report, name, track_memory):
+        """
+        Initiates a Span. Measures the time spent inside a with block.
+
+        Parameters
+        ----------
+        report : RunReport
+            Report that receives the measurement.
+        name : str
+            Name of the span (stage or function).
+        track_memory : bool
+            Records the memory used when the span ends.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.report = report
+        self.name = name
+        self.track_memory = track_memory
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.report.add_span(self.name, time.perf_counter() - self.start)
+        if self.track_memory:
+            self.report.sample_memory(self.name)
+        return False
+
+class NullSpan:
+    """
+    Span used when the report is disabled (does nothing).
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class RunReport:
+    def __init__(self, enabled, profiler=None):
+        """
+        Initiates a RunReport.
+
+        Parameters
+        ----------
+        enabled : bool
+            If the metrics should be collected.
+        profiler : str, optional
+            Profiler to run along the generation (cprofile or pyinstrument). The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.profiler_name = profiler if profiler not in [None, "none", ""] else None
+        self.enabled = enabled or self.profiler_name is not None
+        self.profiler = None
+        self.spans, self.counters, self.histograms, self.memory = {}, {}, {}, {}
+        self.start_time = time.perf_counter()
+
+    def span(self, name, track_memory=False):
+        """
+        Creates a span to be used in a with block.
+
+        Parameters
+        ----------
+        name : str
+            Name of the span.
+        track_memory : bool, optional
+            Records the memory used when the span ends. The default is False.
+
+        Returns
+        -------
+        Span
+            Span (or NullSpan if the report is disabled).
+
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, track_memory)
+
+    def add_span(self, name, elapsed):
+        """
+        Adds a time measurement to a span.
+
+        Parameters
+        ----------
+        name : str
+            Name of the span.
+        elapsed : float
+            Time spent (in seconds).
+
+        Returns
+        -------
+        None.
+
+        """
+        if name not in self.spans:
+            self.spans[name] = {"calls": 0, "total": 0, "max": 0}
+        self.spans[name]["calls"] += 1
+        self.spans[name]["total"] += elapsed
+        if elapsed > self.spans[name]["max"]:
+            self.spans[name]["max"] = elapsed
+
+    def count(self, name, value=1):
+        """
+        Increments a counter.
+
+        Parameters
+        ----------
+        name : str
+            Name of the counter.
+        value : int, optional
+            Increment. The default is 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """
+        Adds a value to an histogram (power of two buckets).
+
+        Parameters
+        ----------
+        name : str
+            Name of the histogram.
+        value : float
+            Value observed.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.enabled:
+            return
+        if name not in self.histograms:
+            self.histograms[name] = {"count": 0, "sum": 0, "min": value, "max": value, "buckets": {}}
+        histogram = self.histograms[name]
+        histogram["count"] += 1
+        histogram["sum"] += value
+        histogram["min"] = min(histogram["min"], value)
+        histogram["max"] = max(histogram["max"], value)
+
+        bucket = 0 if value <= 0 else 2 ** math.ceil(math.log2(value))
+        histogram["buckets"][bucket] = histogram["buckets"].get(bucket, 0) + 1
+
+    def sample_memory(self, label):
+        """
+        Records the current resident memory.
+
+        Parameters
+        ----------
+        label : str
+            Moment of the generation.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.enabled:
+            self.memory[label] = psutil.Process().memory_info().rss / (1024 * 1024)
+
+    def get_peak_memory(self):
+        """
+        Gets the peak resident memory of the process.
+
+        Returns
+        -------
+        float
+            Peak memory (MB).
+
+        """
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+        except ImportError:
+            memory = psutil.Process().memory_info()
+            return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)
+
+    def start_profiler(self):
+        """
+        Starts the profiler selected (if any).
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.profiler_name == "cprofile":
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profiler_name == "pyinstrument":
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+            self.profiler.start()
+        elif self.profiler_name is not None:
+            print(f'Profiler {self.profiler_name} is not supported (cprofile or pyinstrument)')
+
+    def stop_profiler(self, path):
+        """
+        Stops the profiler and stores its output.
+
+        Parameters
+        ----------
+        path : str
+            Output path without extension.
+
+        Returns
+        -------
+        output_file : str
+            Profiler output file.
+
+        """
+        if self.profiler is None:
+            return None
+
+        if self.profiler_name == "cprofile":
+            self.profiler.disable()
+            output_file = f'{path}.prof'
+            self.profiler.dump_stats(output_file)
+        else:
+            self.profiler.stop()
+            output_file = f'{path}.html'
+            with open(output_file, "w") as f:
+                f.write(self.profiler.output_html())
+        self.profiler = None
+        return output_file
+
+    def build_report(self, gen_id):
+        """
+        Builds the run report.
+
+        Parameters
+        ----------
+        gen_id : str
+            Unique generation identifier.
+
+        Returns
+        -------
+        report : dict
+            Spans, counters, rates, histograms and memory of the run.
+
+        """
+        spans = {}
+        for name, span in self.spans.items():
+            spans[name] = dict(span, mean = span["total"] / span["calls"])
+
+        rates = {}
+        if "tickets_processed" in self.counters and "process_tickets" in self.spans and self.spans["process_tickets"]["total"] > 0:
+            rates["tickets_per_second"] = self.counters["tickets_processed"] / self.spans["process_tickets"]["total"]
+
+        histograms = {}
+        for name, histogram in self.histograms.items():
+            histograms[name] = dict(histogram, mean = histogram["sum"] / histogram["count"], buckets = {str(k): v for k, v in sorted(histogram["buckets"].items())})
+
+        return {"gen_id": str(gen_id), "elapsed": time.perf_counter() - self.start_time, "spans": spans, "counters": self.counters, "rates": rates,
+                "histograms": histograms, "memory": self.memory, "peak_memory": self.get_peak_memory()}
+
+    def save(self, output_path, gen_id):
+        """
+        Stores the run report (and the profiler output) next to the generation data.
+
+        Parameters
+        ----------
+        output_path : str
+            Output folder.
+        gen_id : str
+            Unique generation identifier.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.enabled:
+            return
+
+        report = self.build_report(gen_id)
+        report["profile"] = self.stop_profiler(os.path.join(output_path, f'Generation_profile_{gen_id}'))
+        with open(os.path.join(output_path, f'Generation_report_{gen_id}.json'), "w") as f:
+            json.dump(report, f, indent=2)
+        print(f'Run report saved in {output_path}')
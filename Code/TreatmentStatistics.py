@@ -0,0 +1,169 @@
+"""
+Created on Mon Oct 19 14:07:23 2026
+
+@author: agent
+@goal: Accumulates the treatment statistics (teams, shifts, analysts and incidents) as the tickets are closed, without storing the tickets
+"""
+
+import math
+from Code.Utils import Utils, ShiftCalendar
+
+class RunningStats:
+    def __init__(self):
+        """
+        Initiates a RunningStats. Count, sum, mean, variance (Welford), minimum and maximum are updated with each value.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.count, self.total, self.mean, self.m2 = 0, 0, 0.0, 0.0
+        self.min, self.max = None, None
+
+    def add(self, value):
+        """
+        Adds a value.
+
+        Parameters
+        ----------
+        value : float
+            Value observed.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def get_std(self):
+        """
+        Gets the (population) standard deviation.
+
+        Returns
+        -------
+        float
+            Standard deviation.
+
+        """
+        return math.sqrt(self.m2 / self.count) if self.count else 0
+
+    def to_dict(self):
+        """
+        Gets the statistics as a dictionary.
+
+        Returns
+        -------
+        dict
+            Count, sum, mean, standard deviation, minimum and maximum.
+
+        """
+        return {"count": self.count, "sum": self.total, "mean": self.mean, "std": self.get_std(), "min": self.min, "max": self.max}
+
+class TreatmentStatistics:
+    def __init__(self, shifts):
+        """
+        Initiates a TreatmentStatistics.
+
+        Parameters
+        ----------
+        shifts : dict
+            Comprises information about the work shifts.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.shifts = shifts
+        self.tickets_number = 0
+        self.wait_time, self.resolution_time = RunningStats(), RunningStats()
+        self.teams = {}
+
+    def get_team_statistics(self, team):
+        """
+        Gets (or creates) the statistics of a team.
+
+        Parameters
+        ----------
+        team : str
+            Team name.
+
+        Returns
+        -------
+        dict
+            Statistics of the shifts, analysts (resolution time), incidents and scheduled tickets of the team.
+
+        """
+        if team not in self.teams:
+            self.teams[team] = {"shifts": {}, "analysts": {}, "incidents": {}, "scheduled": {"other_day": 0, "other_shift": 0, "others": 0}}
+        return self.teams[team]
+
+    def add_ticket(self, ticket):
+        """
+        Adds a closed ticket to the statistics.
+
+        Parameters
+        ----------
+        ticket : dict
+            Ticket closed.
+
+        Returns
+        -------
+        None.
+
+        """
+        team_statistics = self.get_team_statistics(ticket["team"])
+        wait_time = Utils.calculate_timestamp_diff(ticket['raised_tsp'], ticket['allocated_tsp'], "minutes")
+        time_spent = ticket["duration"]
+        self.tickets_number += 1
+        self.wait_time.add(wait_time)
+        self.resolution_time.add(ticket["duration_outlier"])
+
+        allocated_shift = Utils.get_ticket_shift(ticket['allocated_tsp'], self.shifts)
+        if allocated_shift not in team_statistics["shifts"]:
+            team_statistics["shifts"][allocated_shift] = {"time_spent": RunningStats(), "wait_time": RunningStats(), "analysts": {}}
+        shift_statistics = team_statistics["shifts"][allocated_shift]
+        shift_statistics["time_spent"].add(time_spent)
+        shift_statistics["wait_time"].add(wait_time)
+        if ticket["analyst"] not in shift_statistics["analysts"]:
+            shift_statistics["analysts"][ticket["analyst"]] = RunningStats()
+        shift_statistics["analysts"][ticket["analyst"]].add(time_spent)
+
+        if ticket["analyst"] not in team_statistics["analysts"]:
+            team_statistics["analysts"][ticket["analyst"]] = RunningStats()
+        team_statistics["analysts"][ticket["analyst"]].add(ticket["duration_outlier"])
+
+        incidents = team_statistics["incidents"].setdefault(ticket["family"], {})
+        if ticket["subfamily"] not in incidents:
+            incidents[ticket["subfamily"]] = RunningStats()
+        incidents[ticket["subfamily"]].add(time_spent)
+
+        if ticket['raised_tsp'] != ticket['allocated_tsp']:
+            if ShiftCalendar.get_day(ticket['raised_tsp']) != ShiftCalendar.get_day(ticket['allocated_tsp']):
+                team_statistics["scheduled"]["other_day"] += 1
+            elif Utils.get_ticket_shift(ticket['raised_tsp'], self.shifts) != allocated_shift:
+                team_statistics["scheduled"]["other_shift"] += 1
+            else:
+                team_statistics["scheduled"]["others"] += 1
+
+    def get_tickets_shifted(self):
+        """
+        Gets the number of tickets treated after being raised (later in the shift, other shift or other day).
+
+        Returns
+        -------
+        int
+            Number of tickets shifted.
+
+        """
+        return sum(sum(self.teams[team]["scheduled"].values()) for team in self.teams)
@@ -5,19 +5,15 @@ Created on Tue Dec 15 12:42:45 2020
 @goal: Has several useful functions applied through out SNOOKER and other systems
 """
 
-import psutil, subprocess, datetime, random, re, ast, string, math, sys, os, shutil, itertools, calendar, ipaddress, logging, json, csv, colorsys
+import psutil, subprocess, datetime, random, re, ast, string, math, sys, os, shutil, itertools, calendar, ipaddress, logging, json, csv, colorsys, threading
 from operator import itemgetter
-from datetime import timedelta, datetime, time, timezone
+from datetime import datetime, time, timezone
 from numpy.linalg import norm
-from sklearn.preprocessing import LabelEncoder
 from statistics import NormalDist
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import pytz
-from scipy.optimize import nnls
 from collections import Counter
+from Code.RunReport import RunReport
 
 class BufferedRandomChoiceGenerator:
     def __init__(self, options, probabilities, buffer_size):
@@ -73,8 +69,148 @@ class BufferedRandomChoiceGenerator:
             self.index += 1
             yield choice
 
+class IpSampler:
+    def __init__(self, ip_version, suspicious_ips):
+        """
+        Initiates an IpSampler. Networks are kept as (base, size) integer arrays so that addresses can be drawn in batches.
+
+        Parameters
+        ----------
+        ip_version : str
+            IP version selected (IPv4Address or IPv6Address).
+        suspicious_ips : dict
+            Comprises the packed suspicious IPs and their categories.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.ipv6 = ip_version == "IPv6Address"
+        self.suspicious_ips = suspicious_ips["ips"]
+        self.parsed_networks = {}
+
+    def parse_network(self, network):
+        """
+        Gets the base address and the number of addresses of a network. Each network is parsed only once.
+
+        Parameters
+        ----------
+        network : str
+            Network in CIDR notation.
+
+        Returns
+        -------
+        tuple
+            Base address and size of the network.
+
+        """
+        if network not in self.parsed_networks:
+            net = ipaddress.IPv4Network(network, strict=False)
+            self.parsed_networks[network] = (int(net.network_address), net.num_addresses)
+        return self.parsed_networks[network]
+
+    def build_network_groups(self, groups):
+        """
+        Flattens groups of networks (e.g., the networks of a country) into contiguous arrays.
+
+        Parameters
+        ----------
+        groups : list
+            List of lists of networks.
+
+        Returns
+        -------
+        bases : ndarray
+            Base address of each network.
+        sizes : ndarray
+            Number of addresses of each network.
+        offsets : ndarray
+            Position of the first network of each group.
+        counts : ndarray
+            Number of networks of each group.
+
+        """
+        counts = np.array([len(group) for group in groups], dtype=np.int64)
+        offsets = np.zeros(len(groups), dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)[:-1]
+        parsed = [self.parse_network(network) for group in groups for network in group]
+        bases = np.array([net[0] for net in parsed], dtype=np.int64)
+        sizes = np.array([net[1] for net in parsed], dtype=np.int64)
+        return bases, sizes, offsets, counts
+
+    def sample_addresses(self, groups_idx, bases, sizes, offsets, counts):
+        """
+        Draws one address per entry of groups_idx, picking a random network of the group and a random address of that network.
+
+        Parameters
+        ----------
+        groups_idx : ndarray
+            Group of each address to draw.
+        bases : ndarray
+            Base address of each network.
+        sizes : ndarray
+            Number of addresses of each network.
+        offsets : ndarray
+            Position of the first network of each group.
+        counts : ndarray
+            Number of networks of each group.
+
+        Returns
+        -------
+        ndarray
+            Addresses drawn (as integers).
+
+        """
+        n = len(groups_idx)
+        networks_idx = offsets[groups_idx] + (np.random.random(n) * counts[groups_idx]).astype(np.int64)
+        return bases[networks_idx] + (np.random.random(n) * sizes[networks_idx]).astype(np.int64)
+
+    def sample_suspicious(self, n):
+        """
+        Draws n suspicious addresses.
+
+        Parameters
+        ----------
+        n : int
+            Number of addresses to draw.
+
+        Returns
+        -------
+        ndarray
+            Addresses drawn (as integers).
+
+        """
+        return self.suspicious_ips[np.random.randint(0, len(self.suspicious_ips), size=n)].astype(np.int64)
+
+    def format_ips(self, ips):
+        """
+        Converts integer addresses into strings (dotted IPv4 or IPv6 with the IPv4 in the last 32 bits of 2002::). Entries that are not integers are kept.
+
+        Parameters
+        ----------
+        ips : list
+            Addresses to format.
+
+        Returns
+        -------
+        formatted : list
+            Addresses formatted.
+
+        """
+        formatted = []
+        for ip in ips:
+            if isinstance(ip, (int, np.integer)):
+                if self.ipv6:
+                    formatted.append(ipaddress.IPv6Address((0x2002 << 112) | int(ip)).compressed)
+                else:
+                    formatted.append(f'{ip >> 24 & 255}.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}')
+            else:
+                formatted.append(ip)
+        return formatted
+
 class UtilsParams:
-    def __init__(self, outlier_rate, outlier_cost, action_operations, priority_levels, debug, logger):
+    def __init__(self, outlier_rate, outlier_cost, action_operations, priority_levels, debug, logger, report=None):
         """
         Initiates UtilsParams class. Useful for storing various attributes relevant for ticket treatment.
 
@@ -89,8 +225,226 @@ class UtilsParams:
         self.priority_levels = priority_levels
         self.debug = debug        
         self.logger = logger  
+        self.report = report if report is not None else RunReport(False)
         
+class ShiftCalendar(dict):
+    SECONDS_PER_DAY = 86400
+
+    def __init__(self, shifts):
+        """
+        Initiates a ShiftCalendar. It behaves as the shifts dictionary (start and end times of each shift) and maps each second of the day
+        to its shift (86,400-entry lookup), so shifts also work when they are not evenly split.
+
+        Parameters
+        ----------
+        shifts : dict
+            Comprises information about the shifts (start and end times).
+
+        Returns
+        -------
+        None.
+
+        """
+        super().__init__(shifts)
+        self.order = list(shifts.keys())
+        self.lookup = [None] * ShiftCalendar.SECONDS_PER_DAY
+        self.start_seconds, self.end_seconds = {}, {}
+        for shift, times in shifts.items():
+            self.start_seconds[shift] = ShiftCalendar.get_day_seconds(times["start"]) + times["start"].microsecond / 1_000_000
+            self.end_seconds[shift] = ShiftCalendar.get_day_seconds(times["end"]) + times["end"].microsecond / 1_000_000
+            start, end = int(self.start_seconds[shift]), int(self.end_seconds[shift])
+            seconds = range(start, end + 1) if start <= end else itertools.chain(range(start, ShiftCalendar.SECONDS_PER_DAY), range(0, end + 1))
+            for second in seconds:
+                self.lookup[second] = shift
+
+    def get_day_seconds(curr_time):
+        """
+        Gets the seconds elapsed since midnight.
+
+        Parameters
+        ----------
+        curr_time : time
+            Time being analyzed.
+
+        Returns
+        -------
+        int
+            Seconds of the day.
+
+        """
+        return curr_time.hour * 3600 + curr_time.minute * 60 + curr_time.second
+
+    def get_shift(self, tsp):
+        """
+        Gets the shift of a UTC timestamp.
+
+        Parameters
+        ----------
+        tsp : float
+            Timestamp (seconds) being analyzed.
+
+        Returns
+        -------
+        int
+            Shift where the timestamp belongs to.
+
+        """
+        return self.lookup[int(tsp) % ShiftCalendar.SECONDS_PER_DAY]
+
+    def get_shift_bounds(self, tsp):
+        """
+        Gets the shift of a UTC timestamp and the start and end timestamps of that shift.
+
+        Parameters
+        ----------
+        tsp : float
+            Timestamp (seconds) being analyzed.
+
+        Returns
+        -------
+        shift : int
+            Shift where the timestamp belongs to.
+        start_tsp : float
+            Start timestamp of the shift.
+        end_tsp : float
+            End timestamp of the shift.
+
+        """
+        shift = self.get_shift(tsp)
+        start_tsp = ShiftCalendar.get_day_start(tsp) + self.start_seconds[shift]
+        if start_tsp > tsp:
+            # Shift started in the previous day (crosses midnight)
+            start_tsp -= ShiftCalendar.SECONDS_PER_DAY
+        end_tsp = start_tsp + (self.end_seconds[shift] - self.start_seconds[shift]) % ShiftCalendar.SECONDS_PER_DAY
+        return shift, start_tsp, end_tsp
+
+    def get_shift_end(self, tsp, shift):
+        """
+        Gets the end timestamp of a shift in the day of a UTC timestamp (next day when the shift crosses midnight and the timestamp is before midnight).
+
+        Parameters
+        ----------
+        tsp : float
+            Timestamp (seconds) being analyzed.
+        shift : int
+            Shift being analyzed.
+
+        Returns
+        -------
+        float
+            End timestamp of the shift.
+
+        """
+        end_tsp = ShiftCalendar.get_day_start(tsp) + self.end_seconds[shift]
+        if self.crosses_midnight(shift) and tsp % ShiftCalendar.SECONDS_PER_DAY >= self.start_seconds[shift]:
+            end_tsp += ShiftCalendar.SECONDS_PER_DAY
+        return end_tsp
+
+    def crosses_midnight(self, shift):
+        """
+        Checks if a shift starts in a day and ends in the next one.
+
+        Parameters
+        ----------
+        shift : int
+            Shift being analyzed.
+
+        Returns
+        -------
+        bool
+            True if the shift crosses midnight.
+
+        """
+        return self.end_seconds[shift] < self.start_seconds[shift]
+
+    def get_next_shift(self, curr_shift):
+        """
+        Gets the next shift.
+
+        Parameters
+        ----------
+        curr_shift : int
+            Current work shift.
+
+        Returns
+        -------
+        int
+            Next shift index available.
+
+        """
+        return self.order[(self.order.index(curr_shift) + 1) % len(self.order)]
+
+    def get_next_shift_start(self, tsp, curr_shift):
+        """
+        Gets the next shift and its start timestamp (minute precision), moving to the next day when the next shift starts earlier in the day
+        (unless the timestamp is already past the midnight of a shift crossing it).
+
+        Parameters
+        ----------
+        tsp : float
+            Timestamp (seconds) being analyzed.
+        curr_shift : int
+            Shift currently being analyzed.
+
+        Returns
+        -------
+        float
+            Start timestamp of the next shift.
+        next_shift : int
+            Next shift.
+
+        """
+        next_shift = self.get_next_shift(curr_shift)
+        start_tsp = ShiftCalendar.get_day_start(tsp) + self.start_seconds[next_shift] // 60 * 60
+        after_midnight = self.crosses_midnight(curr_shift) and tsp % ShiftCalendar.SECONDS_PER_DAY < self.start_seconds[curr_shift]
+        if self.start_seconds[next_shift] <= self.start_seconds[curr_shift] and not after_midnight:
+            start_tsp += ShiftCalendar.SECONDS_PER_DAY
+        return start_tsp, next_shift
+
+    def get_day_start(tsp):
+        """
+        Gets the timestamp of the midnight (UTC) of a timestamp.
+
+        Parameters
+        ----------
+        tsp : float
+            Timestamp (seconds) being analyzed.
+
+        Returns
+        -------
+        float
+            Midnight timestamp.
+
+        """
+        return tsp - tsp % ShiftCalendar.SECONDS_PER_DAY
+
+    def get_day(tsp):
+        """
+        Gets the day (days since epoch) of a UTC timestamp.
+
+        Parameters
+        ----------
+        tsp : float
+            Timestamp (seconds) being analyzed.
+
+        Returns
+        -------
+        int
+            Day of the timestamp.
+
+        """
+        return int(tsp // ShiftCalendar.SECONDS_PER_DAY)
+
 class Utils:
+    # Rows of an Excel sheet (including the header)
+    EXCEL_MAX_ROWS = 1048576
+    EXCEL_CHUNK_ROWS = 100000
+    # XLSX files being written in background (and the exceptions raised by them)
+    EXCEL_WRITERS = []
+    EXCEL_ERRORS = []
+    # Boolean fields of the generator data (families and subfamilies)
+    GENERATOR_BOOLEAN_FIELDS = ("ip", "suspicious")
+
     def instantiate_priority_queues(priority_levels, team_priority_queues):
         """
         Creates the priority queues that will store the pending tickets.
@@ -166,9 +520,8 @@ class Utils:
                         shifts_picked[shift_index] += 1
                         
                     growth = round(random.uniform(1, 2), 2)
-                    start_date = datetime.utcfromtimestamp(0).replace(tzinfo=pytz.utc)
                     analysts_info[team]["analysts"][member], save_info[team]["analysts"][member] = {}, {}
-                    Utils.update_data(analysts_info[team]["analysts"][member], shift = shift_index, growth = growth, assigned_ticket = None, fixed = start_date, fixed_tsp = 0, summary = {}, active = True)
+                    Utils.update_data(analysts_info[team]["analysts"][member], shift = shift_index, growth = growth, assigned_ticket = None, fixed_tsp = 0, summary = {}, active = True)
                     Utils.update_data(save_info[team]["analysts"][member], shift = shift_index, growth = growth, active = True)
                     Utils.debug_and_log_data(generation_params["debug"], logger, f'Shifts used: {shifts_picked}')
                 else:
@@ -694,45 +1047,46 @@ class Utils:
         extra_feat = dict(sorted(extra_feat.items()))
         return extra_feat
     
-    def assign_ticket_ip(with_ip, ticket, clients_info, suspicious_ips, ips_pool, ip_selected_idx, countries, aux_data, dst_port_type):
+    def assign_tickets_ips(tickets, family_pool, clients_info, countries, ip_sampler, dst_port_type, aux_data):
         """
-        Assigns the destination and source IPs and ports to a ticket.  
+        Assigns the destination and source IPs and ports to all tickets in a single batch.  
 
         Parameters
         ----------
-        with_ip : bool
-            Has or does not have ip data.
-        ticket : dict
-            Ticket being analyzed.
+        tickets : dict
+            Tickets generated.
+        family_pool : dict
+            Comprises data about the families.
         clients_info : dict
             Comprises information about the clients.
-        suspicious_ips : list
-            List of suspicious IPs.
-        ips_pool : dict
-            Comprises information about IPs.
-        ip_selected_idx : str
-            Index of IP selected (IPv4 or IPv6).
         countries : dict
             Comprises information about the selected countries.
-        aux_data : UtilsParams
-            Comprises auxiliar data, including outlier, priority levels, and other features.
+        ip_sampler : IpSampler
+            Samples the IPs from the networks available.
         dst_port_type : BufferedRandomChoiceGenerator
             Can be either well-known or registered.
+        aux_data : UtilsParams
+            Comprises auxiliar data, including outlier, priority levels, and other features.
 
         Returns
         -------
         None.
 
         """
-        if with_ip:
-            source_country = random.choice(list(countries.keys()))
-            src_ip, src_port = Utils.get_source_ip_port(source_country, ticket['suspicious'], countries, suspicious_ips, ips_pool, ip_selected_idx)
-            dst_ip, dst_port = Utils.get_destination_ip_port(clients_info[ticket["client"]][ticket["country"]]["networks"], aux_data, ips_pool, ip_selected_idx, dst_port_type)
-            ticket['source_ip']= src_ip
-            ticket['source_port']= src_port
-            ticket['destination_ip']= dst_ip
-            ticket['destination_port']= dst_port            
-    
+        ip_tickets = [ticket for ticket in tickets.values() if family_pool[ticket["family"]]["ip"]]
+        if not ip_tickets:
+            return
+        
+        src_ips, src_ports = Utils.get_source_ip_port(ip_tickets, countries, ip_sampler)
+        dst_ips, dst_ports = Utils.get_destination_ip_port(ip_tickets, clients_info, ip_sampler, dst_port_type)
+        Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'IPs assigned to {len(ip_tickets)} tickets')
+
+        for i, ticket in enumerate(ip_tickets):
+            ticket['source_ip'] = src_ips[i]
+            ticket['source_port'] = src_ports[i]
+            ticket['destination_ip'] = dst_ips[i]
+            ticket['destination_port'] = dst_ports[i]
+
     def set_extra_features_values(ticket, family_features):
         """
         Sets temporaries features to families (e.g. "Feature_1) to 1 (existent)
@@ -1043,6 +1397,7 @@ class Utils:
         None.
 
         """
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots(figsize=(80, 20))
         plt.ylim(0, max(tickets_duration))
         ax.plot(dates, tickets_duration, marker='o', linestyle='-')
@@ -1068,6 +1423,7 @@ class Utils:
         None.
 
         """
+        import matplotlib.pyplot as plt
         for priority in priorities_wait_time:
             fig, ax = plt.subplots()
             ax.plot(list(priorities_wait_time[priority].keys()), list(priorities_wait_time[priority].values()), marker='o', linestyle='-', color='b')
@@ -1091,6 +1447,7 @@ class Utils:
         None.
 
         """
+        import matplotlib.pyplot as plt
         date_counts = Counter(ticket_dates)
         fig, ax = plt.subplots(figsize=(100, 20))
         ax.plot(list(date_counts.keys()), list(date_counts.values()), marker='o', linestyle='-', color='b')
@@ -1126,15 +1483,15 @@ class Utils:
         else: # crosses midnight
             return check_time >= begin_time or check_time <= end_time   
         
-    def get_ticket_shift(curr_time, shifts):
+    def get_ticket_shift(curr_tsp, shifts):
         """
         Gets the shift where the ticket date is located.
 
         Parameters
         ----------
-        curr_time : time
-            Time currently being analyzed.
-        shifts : dict
+        curr_tsp : float
+            Timestamp (UTC seconds) currently being analyzed.
+        shifts : ShiftCalendar
             Comprises information about the shifts (start and end times).
 
         Returns
@@ -1143,10 +1500,7 @@ class Utils:
             Shift where the time belongs to.
 
         """
-        for shift_name, times in shifts.items():
-            if  times["start"] <= curr_time <= times["end"]:
-                return shift_name
-        return None  
+        return shifts.get_shift(curr_tsp)
            
     def split_day_shifts(n_shitfs):
         """
@@ -1159,7 +1513,7 @@ class Utils:
 
         Returns
         -------
-        shifts : dict
+        ShiftCalendar
             Comprises information about the shifts generated.
 
         """
@@ -1188,7 +1542,7 @@ class Utils:
             shifts[shift]["end"] = time(end_h, end_m, end_s, end_micro)
             shift+=1
     
-        return shifts
+        return ShiftCalendar(shifts)
     
     def update_step_outlier(transitions_dur, outlier_cost):
         """
@@ -1215,35 +1569,62 @@ class Utils:
             
         return transitions_dur_updated
         
-    def check_ticket_suspicious(ticket, suspicious, countries):
+    def compile_suspicious_windows(countries):
         """
-        Checks if a ticket is suspicious.
+        Converts the suspicious time window of each country into seconds of the day. Done once per generation.
 
         Parameters
         ----------
-        ticket : dict
-            Ticket being analyzed.
-        suspicious : bool
-            If the subfamily is signaled as suspicious.
         countries : dict
-            Comprises information about the selected countries.
+            Comprises information about the suspicious countries (interface widgets or configuration values).
 
         Returns
         -------
-        bool
-            If the ticket is suspicious or not.
+        windows : dict
+            Start and end second of the suspicious window of each country.
 
         """
-        if suspicious:
-            country = ticket['country']
-            if country in countries:
-                start_ticket_time = datetime.strptime(countries[country]["widget start date"].text(), "%H:%M:%S.%f").time()
-                end_ticket_time = datetime.strptime(countries[country]["widget end date"].text(), "%H:%M:%S.%f").time()
-                if Utils.check_date_between(start_ticket_time, end_ticket_time, ticket['raised'].time()):
-                    #print("Ticket id suspicious", ticket)
-                    return True
+        windows = {}
+        for country, data in countries.items():
+            if "widget start date" in data:
+                start, end = data["widget start date"].text(), data["widget end date"].text()
+            else:
+                start, end = data["start"], data["end"]
+            start_hours, start_minutes, start_seconds = str(start).split(":")
+            end_hours, end_minutes, end_seconds = str(end).split(":")
+            # The fractional seconds are kept (rounding could turn a sub-second window into one crossing midnight)
+            windows[country] = (int(start_hours) * 3600 + int(start_minutes) * 60 + float(start_seconds), 
+                                int(end_hours) * 3600 + int(end_minutes) * 60 + float(end_seconds))
+        return windows
 
-        return False
+    def check_tickets_suspicious(tickets, subfamily_pool, windows):
+        """
+        Checks which tickets are suspicious (suspicious subfamily raised within the suspicious window of its country).
+
+        Parameters
+        ----------
+        tickets : list
+            Tickets being analyzed.
+        subfamily_pool : dict
+            Comprises data about the subfamilies.
+        windows : dict
+            Start and end second of the suspicious window of each country.
+
+        Returns
+        -------
+        ndarray
+            If each ticket is suspicious or not.
+
+        """
+        n = len(tickets)
+        suspicious = np.fromiter((subfamily_pool[ticket["subfamily"]]["suspicious"] for ticket in tickets), dtype=bool, count=n)
+        seconds = np.fromiter((ticket["raised_tsp"] % 86400 for ticket in tickets), dtype=np.float64, count=n)
+        bounds = np.array([windows.get(ticket["country"], (-1, -1)) for ticket in tickets], dtype=np.float64).reshape(n, 2)
+        starts, ends = bounds[:, 0], bounds[:, 1]
+        
+        # Same rule as check_date_between (the window may cross midnight)
+        within = np.where(starts < ends, (seconds >= starts) & (seconds <= ends), (seconds >= starts) | (seconds <= ends))
+        return suspicious & (starts >= 0) & within
     
     def get_action_duration(family, action, team, user, steps_data, family_steps_pool, family_subtechniques, aux_data):
         """
@@ -1415,7 +1796,7 @@ class Utils:
             
         return False
     
-    def get_next_ticket(ticket, close_shift, curr_shift, analysts_in_shift, original_dict_idx, tickets, original_keys, analysts_info, priority_queues, families_resolution, shifts_data, aux_data):
+    def get_next_ticket(ticket, close_shift, curr_shift, analysts_in_shift, original_dict_idx, tickets, original_keys, availability, priority_queues, families_resolution, shifts_data, aux_data):
         """
         Gets the data of the next ticket to be analyzed (can be from the pending tickets or the pool of unprocessed tickets).    
 
@@ -1435,13 +1816,13 @@ class Utils:
             Comprises information about all tickets.
         original_keys : list
             Keys from the tickets (without replicated tickets).
-        analysts_info : dict
-            Comprises all data about teams and their operators.
+        availability : AnalystAvailability
+            Analysts of each team and shift indexed by the time they become free.
         priority_queues : dict
             Comprises all the pending tickets, organized according to their priority.
         families_resolution : dict
             Comprises the mean duration spent to treat each family.
-        shifts_data : dict
+        shifts_data : ShiftCalendar
             Comprises information about the work shifts.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
@@ -1459,7 +1840,7 @@ class Utils:
 
         """
         if Utils.check_tickets_in_team_queue(priority_queues, ticket["team"]):
-            next_ticket_id, temp_date, temp_tsp, highest_priority_ticket_id = Utils.get_next_pending_ticket(ticket, analysts_info, analysts_in_shift, priority_queues[ticket["team"]], tickets, close_shift, families_resolution, shifts_data[curr_shift], aux_data)
+            next_ticket_id, temp_tsp, highest_priority_ticket_id = Utils.get_next_pending_ticket(ticket, availability, priority_queues[ticket["team"]], tickets, close_shift, families_resolution, shifts_data, curr_shift, aux_data)
 
             update_ticket = True
             if "analyzed_in_shift" in tickets[next_ticket_id]:
@@ -1469,57 +1850,54 @@ class Utils:
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Update_ticket: {update_ticket}')
 
             if original_dict_idx + 1 >= len(original_keys):
-                Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Original data already read! Next_id {next_ticket_id} - {tickets[next_ticket_id]["allocated"]}')
+                Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Original data already read! Next_id {next_ticket_id} - {tickets[next_ticket_id]["allocated_tsp"]}')
                 
                 if update_ticket:
-                    tickets[next_ticket_id]["allocated"] = temp_date
                     tickets[next_ticket_id]["allocated_tsp"] = temp_tsp
-                    Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Test ticket {next_ticket_id} in {temp_date}')
+                    Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Test ticket {next_ticket_id} in {temp_tsp}')
                     return next_ticket_id, original_dict_idx, curr_shift, analysts_in_shift
                 else:
-                    pending_shift = Utils.get_ticket_shift(temp_date.time(), shifts_data)
-                    next_ticket_date, next_shift = Utils.get_next_shift_data(temp_date, pending_shift, shifts_data)   
-                    Utils.update_allocated_times(tickets, priority_queues, ticket["team"], next_ticket_date, next_ticket_date.timestamp(), aux_data) 
-                    analysts_in_next_shift = Utils.get_operators_in_shift(analysts_info[ticket["team"]], next_shift)
-                    Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Pending tickets are going to be analyzed in {next_ticket_date} on shift {next_shift} with operators {analysts_in_next_shift}')
+                    pending_shift = Utils.get_ticket_shift(temp_tsp, shifts_data)
+                    next_ticket_tsp, next_shift = Utils.get_next_shift_data(temp_tsp, pending_shift, shifts_data)   
+                    Utils.update_allocated_times(tickets, priority_queues, ticket["team"], next_ticket_tsp, aux_data) 
+                    analysts_in_next_shift = availability.get_analysts(ticket["team"], next_shift)
+                    Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Pending tickets are going to be analyzed in {next_ticket_tsp} on shift {next_shift} with operators {analysts_in_next_shift}')
                     return next_ticket_id, original_dict_idx, next_shift, analysts_in_next_shift
             else:
                 next_original_key = original_keys[original_dict_idx + 1]
-                next_original_ticket_date = tickets[next_original_key]["raised"] 
-                Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Pending date: {temp_date}. Next original ticket: {tickets[next_original_key]["raised"]}')
+                next_original_ticket_tsp = tickets[next_original_key]["raised_tsp"]
+                Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Pending date: {temp_tsp}. Next original ticket: {next_original_ticket_tsp}')
                 
-                if temp_date <= next_original_ticket_date:
-                    pending_shift = Utils.get_ticket_shift(temp_date.time(), shifts_data)
-                    next_original_shift = Utils.get_ticket_shift(next_original_ticket_date.time(), shifts_data)
-                    if pending_shift != next_original_shift or (pending_shift == next_original_shift and next_original_ticket_date.day != temp_date.day):
+                if temp_tsp <= next_original_ticket_tsp:
+                    pending_shift = Utils.get_ticket_shift(temp_tsp, shifts_data)
+                    next_original_shift = Utils.get_ticket_shift(next_original_ticket_tsp, shifts_data)
+                    if pending_shift != next_original_shift or (pending_shift == next_original_shift and ShiftCalendar.get_day(next_original_ticket_tsp) != ShiftCalendar.get_day(temp_tsp)):
                         if next_ticket_id == highest_priority_ticket_id and not update_ticket:
-                            next_ticket_date, next_shift = Utils.get_next_shift_data(temp_date, curr_shift, shifts_data)   
-                            Utils.update_allocated_times(tickets, priority_queues, ticket["team"], next_ticket_date, next_ticket_date.timestamp(), aux_data) 
-                            analysts_in_next_shift = Utils.get_operators_in_shift(analysts_info[ticket["team"]], next_shift)
-                            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Pending tickets are going to be analyzed in {next_ticket_date} on shift {next_shift} with operators {analysts_in_next_shift}')
+                            next_ticket_tsp, next_shift = Utils.get_next_shift_data(temp_tsp, curr_shift, shifts_data)   
+                            Utils.update_allocated_times(tickets, priority_queues, ticket["team"], next_ticket_tsp, aux_data) 
+                            analysts_in_next_shift = availability.get_analysts(ticket["team"], next_shift)
+                            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Pending tickets are going to be analyzed in {next_ticket_tsp} on shift {next_shift} with operators {analysts_in_next_shift}')
                             return next_ticket_id, original_dict_idx, next_shift, analysts_in_next_shift
 
-                        tickets[next_ticket_id]["allocated"] = temp_date
                         tickets[next_ticket_id]["allocated_tsp"] = temp_tsp
-                        Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Test ticket {next_ticket_id} in {temp_date}')
+                        Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Test ticket {next_ticket_id} in {temp_tsp}')
                                 
-                        if Utils.get_ticket_shift(tickets[next_ticket_id]["allocated"].time(), shifts_data) != curr_shift:
-                            next_shift = Utils.get_next_shift(Utils.get_ticket_shift(tickets[next_ticket_id]["allocated"].time(), shifts_data), shifts_data)
+                        if Utils.get_ticket_shift(tickets[next_ticket_id]["allocated_tsp"], shifts_data) != curr_shift:
+                            next_shift = Utils.get_next_shift(Utils.get_ticket_shift(tickets[next_ticket_id]["allocated_tsp"], shifts_data), shifts_data)
                             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'next_shift {next_shift}')
-                            analysts_in_next_shift = Utils.get_operators_in_shift(analysts_info[ticket["team"]], next_shift)
+                            analysts_in_next_shift = availability.get_analysts(ticket["team"], next_shift)
                             return next_ticket_id, original_dict_idx, next_shift, analysts_in_next_shift
                         else:
                             return next_ticket_id, original_dict_idx, curr_shift, analysts_in_shift
                     else:
                         if update_ticket:
-                            tickets[next_ticket_id]["allocated"] = temp_date
                             tickets[next_ticket_id]["allocated_tsp"] = temp_tsp
-                            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Test ticket {next_ticket_id} in {temp_date}')
+                            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Test ticket {next_ticket_id} in {temp_tsp}')
                             
-                            if Utils.get_ticket_shift(tickets[next_ticket_id]["allocated"].time(), shifts_data) != curr_shift:
-                                next_shift = Utils.get_next_shift(Utils.get_ticket_shift(tickets[next_ticket_id]["allocated"].time(), shifts_data), shifts_data)
+                            if Utils.get_ticket_shift(tickets[next_ticket_id]["allocated_tsp"], shifts_data) != curr_shift:
+                                next_shift = Utils.get_next_shift(Utils.get_ticket_shift(tickets[next_ticket_id]["allocated_tsp"], shifts_data), shifts_data)
                                 Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'next_shift {next_shift}')
-                                analysts_in_next_shift = Utils.get_operators_in_shift(analysts_info[ticket["team"]], next_shift)
+                                analysts_in_next_shift = availability.get_analysts(ticket["team"], next_shift)
                                 return next_ticket_id, original_dict_idx, next_shift, analysts_in_next_shift
                             else:
                                 return next_ticket_id, original_dict_idx, curr_shift, analysts_in_shift
@@ -1528,10 +1906,10 @@ class Utils:
             original_dict_idx += 1
             next_id = original_keys[original_dict_idx]
 
-            if Utils.get_ticket_shift(tickets[next_id]["allocated"].time(), shifts_data) != curr_shift:
-                next_shift = Utils.get_ticket_shift(tickets[next_id]["allocated"].time(), shifts_data)
+            if Utils.get_ticket_shift(tickets[next_id]["allocated_tsp"], shifts_data) != curr_shift:
+                next_shift = Utils.get_ticket_shift(tickets[next_id]["allocated_tsp"], shifts_data)
                 Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'next_shift {next_shift}')
-                analysts_in_next_shift = Utils.get_operators_in_shift(analysts_info[ticket["team"]], next_shift)
+                analysts_in_next_shift = availability.get_analysts(ticket["team"], next_shift)
                 return next_id, original_dict_idx, next_shift, analysts_in_next_shift
                 
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Ticket id {next_id} is read from original_dict')
@@ -1540,7 +1918,7 @@ class Utils:
 
         return next_id, original_dict_idx, curr_shift, analysts_in_shift
     
-    def get_next_pending_ticket(ticket, analysts_info, analysts_in_shift, team_priority_queue, tickets, close_shift, families_resolution, shift_data, aux_data):
+    def get_next_pending_ticket(ticket, availability, team_priority_queue, tickets, close_shift, families_resolution, shifts_data, curr_shift, aux_data):
         """
         Gets the next pending ticket from replicated and pending tickets.
 
@@ -1548,10 +1926,8 @@ class Utils:
         ----------
         ticket : dict
             Ticket being analyzed.
-        analysts_info : dict
-            Comprises all data about teams and their operators.
-        analysts_in_shift : list
-            Operators working in the current shift.
+        availability : AnalystAvailability
+            Analysts of each team and shift indexed by the time they become free.
         team_priority_queue : dict
             Comprises information about the pending tickets within each priority.
         tickets : dict
@@ -1560,8 +1936,10 @@ class Utils:
             Read from pending tickets (priority queues) or from the unprocessed tickets.
         families_resolution : dict
             Comprises the mean duration spent to treat each family.
-        shift_data : dict
-           Comprises information about the current work shift.
+        shifts_data : ShiftCalendar
+            Comprises information about the work shifts.
+        curr_shift : int
+            Shift currently being analyzed.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
 
@@ -1569,22 +1947,18 @@ class Utils:
         -------
         highest_priority_ticket_id : int
             Next ticket id with the highest priority.
-        datetime
-            Next ticket allocated datetime.
-        int
+        float
             Next ticket allocated timestamp.
         highest_priority_ticket_id : int
             Same as before (for later verification).
 
         """
-        min_time, min_tsp = None, None
-        
         max_priority = Utils.get_highest_priority_with_tickets(team_priority_queue)
-        min_time, min_tsp = Utils.find_min_analyst_endtime(analysts_info[ticket["team"]]["analysts"], analysts_in_shift, aux_data)
+        min_tsp = Utils.find_min_analyst_endtime(availability, ticket["team"], curr_shift, aux_data)
         highest_priority_ticket_id = team_priority_queue[max_priority]["tickets"][0]
         
         if close_shift:
-            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Priority queue {team_priority_queue}. \nTicket date: {ticket["allocated"]}. Min time: {min_time}. Close shift')
+            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Priority queue {team_priority_queue}. \nTicket date: {ticket["allocated_tsp"]}. Min time: {min_tsp}. Close shift')
 
             if ticket["id"] == highest_priority_ticket_id:
                 Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "Is the highest priority ticket")
@@ -1595,17 +1969,15 @@ class Utils:
                     Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "Curr ticket id was fixed")
                     
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "Test with other tickets with lower priority")
-            end_datetime = datetime.combine(min_time.date(), shift_data["end"])
-            end_datetime_utc = end_datetime.replace(tzinfo=pytz.UTC)
-            end_datetime_tsp = end_datetime_utc.timestamp()
+            end_tsp = shifts_data.get_shift_end(min_tsp, curr_shift)
             
-            remaining_time = Utils.calculate_timestamp_diff(end_datetime_tsp, min_tsp, "minutes")
-            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Remaining time until shift ending: {remaining_time}. End datetime: {end_datetime}, Min Time: {min_time}')    
+            remaining_time = Utils.calculate_timestamp_diff(end_tsp, min_tsp, "minutes")
+            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Remaining time until shift ending: {remaining_time}. End timestamp: {end_tsp}, Min Time: {min_tsp}')    
             
             ticket_id_index = 0
             next_ticket_id = Utils.get_next_ticket_id_pending(ticket_id_index, team_priority_queue, max_priority, tickets, families_resolution, remaining_time, aux_data)
             if next_ticket_id != None:
-                return next_ticket_id, min_time, min_tsp, highest_priority_ticket_id
+                return next_ticket_id, min_tsp, highest_priority_ticket_id
             
             next_priority = max_priority - 1
             if next_priority >= min(team_priority_queue): 
@@ -1616,19 +1988,19 @@ class Utils:
                         #Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Number of tickets in the next priority {next_priority} is {len(team_priority_queue[next_priority]["tickets"])}')
                         next_ticket_id = Utils.get_next_ticket_id_pending(ticket_id_index, team_priority_queue, next_priority, tickets, families_resolution, remaining_time, aux_data)
                         if next_ticket_id != None:
-                            return next_ticket_id, min_time, min_tsp, highest_priority_ticket_id
+                            return next_ticket_id, min_tsp, highest_priority_ticket_id
                         
                     next_priority = next_priority - 1
                     ticket_id_index = 0
             
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "All pending tickets were verified")
 
-        if min_time > tickets[highest_priority_ticket_id]["allocated"]:
-            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Send the ticket with highest priority {highest_priority_ticket_id}. Use min analyst date: {min_time}')
-            return highest_priority_ticket_id, min_time, min_tsp, highest_priority_ticket_id
+        if min_tsp > tickets[highest_priority_ticket_id]["allocated_tsp"]:
+            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Send the ticket with highest priority {highest_priority_ticket_id}. Use min analyst date: {min_tsp}')
+            return highest_priority_ticket_id, min_tsp, highest_priority_ticket_id
         else:
-            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Send the ticket with highest priority {highest_priority_ticket_id} with its date: {tickets[highest_priority_ticket_id]["allocated"]}')
-            return highest_priority_ticket_id, tickets[highest_priority_ticket_id]["allocated"], tickets[highest_priority_ticket_id]["allocated_tsp"], highest_priority_ticket_id
+            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Send the ticket with highest priority {highest_priority_ticket_id} with its date: {tickets[highest_priority_ticket_id]["allocated_tsp"]}')
+            return highest_priority_ticket_id, tickets[highest_priority_ticket_id]["allocated_tsp"], highest_priority_ticket_id
 
     def get_next_ticket_id_pending(ticket_id_index, team_priority_queue, priority, tickets, families_resolution, remaining_time, aux_data):
         """
@@ -1891,17 +2263,17 @@ class Utils:
         Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Analyst action after transformations: {subtechniques_cleaned}') 
         return subtechniques_cleaned
 
-    def check_shift_ending(ticket_time_complete, action_dur, shifts_data, aux_data):
+    def check_shift_ending(ticket_tsp, action_dur, shifts_data, aux_data):
         """
         Checks if the time that it takes to fix a ticket surpasses the operator shift.
 
         Parameters
         ----------
-        ticket_time_complete : datetime
-            Fixed ticket datetime.
+        ticket_tsp : float
+            Allocated ticket timestamp.
         action_dur : float
             Treatment action duration.
-        shifts_data : dict
+        shifts_data : ShiftCalendar
             Comprises information about the work shifts.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
@@ -1912,9 +2284,8 @@ class Utils:
             If there is a change in the shift or not.
 
         """
-        next_time = ticket_time_complete + timedelta(minutes = action_dur)
-        current_shift = Utils.get_ticket_shift(ticket_time_complete.time(), shifts_data)
-        next_shift = Utils.get_ticket_shift(next_time.time(), shifts_data)
+        current_shift = shifts_data.get_shift(ticket_tsp)
+        next_shift = shifts_data.get_shift(ticket_tsp + action_dur * 60)
 
         if current_shift != next_shift:
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "Action will surpass the analyst's shift")
@@ -2076,41 +2447,56 @@ class Utils:
         ticket_id = ticket["id"]
         client= ticket["client"]
         subfamily= ticket["subfamily"]
-        datetime_raised= ticket["raised"]
+        raised_tsp= ticket["raised_tsp"]
         ticket["similarity_analysis"] = True
         
-        ticket["similar"], ticket["coordinated"] = [], []
+        # Each window keeps its members once (append-only), the tickets keep the group and the number of members raised before them
+        ticket["similar_group"], ticket["similar_offset"], ticket["coordinated"] = None, 0, []
     
         if client not in tickets_inheritance:
             tickets_inheritance[client] = {}
             
-        if subfamily not in tickets_inheritance[client]:
-            tickets_inheritance[client][subfamily] = {}
-            end_date = datetime_raised + timedelta(minutes = subfamily_pool[subfamily]["timerange"])
-            Utils.update_data(tickets_inheritance[client][subfamily], start = datetime_raised, end = end_date, curr_counter = 1)
-            tickets_inheritance[client][subfamily]["similar"], tickets_inheritance[client][subfamily]["similar_ids"] = [], []
-            tickets_inheritance[client][subfamily]["similar"].append(ticket_id)
-            tickets_inheritance[client][subfamily]["similar_ids"].append(ticket_id)
+        window = tickets_inheritance[client].get(subfamily)
+        if window is None:
+            window = {"start": raised_tsp, "end": raised_tsp + subfamily_pool[subfamily]["timerange"] * 60, "curr_counter": 1, "members": [ticket_id]}
+            tickets_inheritance[client][subfamily] = window
         else:
-            if tickets_inheritance[client][subfamily]["start"] <= datetime_raised <= tickets_inheritance[client][subfamily]["end"]:    
-                ticket["similar"] = list(tickets_inheritance[client][subfamily]["similar"])
-                ticket["similar_ids"] = list(tickets_inheritance[client][subfamily]["similar_ids"])
-                tickets_inheritance[client][subfamily]["curr_counter"] += 1
+            if window["start"] <= raised_tsp <= window["end"]:    
+                ticket["similar_group"], ticket["similar_offset"] = window["members"], len(window["members"])
+                window["curr_counter"] += 1
             else:
-                end_date = datetime_raised + timedelta(minutes = subfamily_pool[subfamily]["timerange"])
-                Utils.update_data(tickets_inheritance[client][subfamily], start = datetime_raised, end = end_date, curr_counter =  1)
-                tickets_inheritance[client][subfamily]["similar"], tickets_inheritance[client][subfamily]["similar_ids"] = [], [] 
+                # The previous group is kept by its tickets
+                window = {"start": raised_tsp, "end": raised_tsp + subfamily_pool[subfamily]["timerange"] * 60, "curr_counter": 1, "members": []}
+                tickets_inheritance[client][subfamily] = window
             
-            tickets_inheritance[client][subfamily]["similar"].append(ticket_id)
-            tickets_inheritance[client][subfamily]["similar_ids"].append(ticket_id)
+            window["members"].append(ticket_id)
  
-            if tickets_inheritance[client][subfamily]["curr_counter"] == subfamily_pool[subfamily]["max_counter"]:
+            if window["curr_counter"] == subfamily_pool[subfamily]["max_counter"]:
                 del tickets_inheritance[client][subfamily]
                 Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "Ticket should be replicated due to Max similarity!")
                 ticket["replication_status"] = "Max similarity"
                 ticket["status"] = "Transfer"
                 #print(f'ticket {ticket_id} of {subfamily} will be replicated due to {ticket["replication_status"]}')
 
+    def get_similar_tickets(ticket):
+        """
+        Gets the similar tickets raised before a ticket (rendered from its similarity group).
+
+        Parameters
+        ----------
+        ticket : dict
+            Ticket being analyzed.
+
+        Returns
+        -------
+        list
+            Identifiers of the similar tickets.
+
+        """
+        if ticket.get("similar_group") is None:
+            return []
+        return ticket["similar_group"][:ticket["similar_offset"]]
+
     def get_country_network(networks, networks_used, aux_data):
         """
         Generates a random location (country).    
@@ -2134,100 +2520,81 @@ class Utils:
         Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "Country of each ticket assigned")
         return random_network
 
-    def get_source_ip_port(country, suspicious, countries, suspicious_ips, ips_pool, ip_selected_idx):
+    def get_source_ip_port(tickets, countries, ip_sampler):
         """
-        Generates the IP and Port of a country serving as source.        
+        Generates the IPs and Ports of the countries serving as source.        
 
         Parameters
         ----------
-        country : str
-            Country being analyzed.
-        suspicious : bool
-            If the subfamily is signaled as suspicious.
+        tickets : list
+            Tickets that require IP data.
         countries : dict
             Comprises information about the selected countries.
-        suspicious_ips : list
-            List of suspicious IPs.
-        ips_pool : dict
-            Comprises information about IPs.
-        ip_selected_idx : str
-            Index of IP selected (IPv4 or IPv6).
+        ip_sampler : IpSampler
+            Samples the IPs from the networks available.
 
         Returns
         -------
-        random_ip : str
-            Source IP.
-        src_port : int
-            Source port.
+        src_ips : list
+            Source IPs (as integers, formatted at export).
+        src_ports : list
+            Source ports.
 
         """
         # Port 0-1023 – Well known ports (server services by the Internet)
         # Ports 1024-49151 - Registered Port (semi-served ports)
         # Ports 49152-65535 - free to use by client programs (ephemeral ports)
         # Source in the last
-        # Generates the Ports  
-    
-        if not suspicious:
-            ips_network_available = countries[country]["ips"]
-            random_network = random.choice(ips_network_available)
-            net = ipaddress.IPv4Network(random_network)
-            random_ip_index = random.randint(0, net.num_addresses -1)
-            random_ip = net[random_ip_index]
-        else:
-            random_ip = random.choice(list(suspicious_ips))
-
-        src_port = random.randint(49152, 65535)    
-
-        if ips_pool[ip_selected_idx] == "IPv6Address":
-            random_ip = ipaddress.IPv6Address(f'2002::{random_ip}').compressed
-            print("IP converted to IPv6")
+        n = len(tickets)
+        countries_names = list(countries.keys())
+        bases, sizes, offsets, counts = ip_sampler.build_network_groups([countries[country]["ips"] for country in countries_names])
+        
+        src_ips = ip_sampler.sample_addresses(np.random.randint(0, len(countries_names), size=n), bases, sizes, offsets, counts)
+        suspicious = np.fromiter((ticket['suspicious'] for ticket in tickets), dtype=bool, count=n)
+        if suspicious.any() and len(ip_sampler.suspicious_ips) > 0:
+            src_ips[suspicious] = ip_sampler.sample_suspicious(int(suspicious.sum()))
             
-        return random_ip, src_port
+        src_ports = np.random.randint(49152, 65536, size=n)
+        return src_ips.tolist(), src_ports.tolist()
 
-    # Generates the IP and Port of Destination Country
-    def get_destination_ip_port(client_network, aux_data, ips_pool, ip_selected_idx, dst_port_type):
+    # Generates the IPs and Ports of Destination Countries
+    def get_destination_ip_port(tickets, clients_info, ip_sampler, dst_port_type):
         """
-        Generates the IP and Port of a country serving as destination.          
+        Generates the IPs and Ports of the countries serving as destination.          
 
         Parameters
         ----------
-        client_network : list
-            List of networks available.
-        aux_data : UtilsParams
-            Comprises auxiliar data, including outlier, priority levels, and other features.
-        ips_pool : dict
-            Comprises information about IPs.
-        ip_selected_idx : str
-            Index of IP selected (IPv4 or IPv6).
+        tickets : list
+            Tickets that require IP data.
+        clients_info : dict
+            Comprises information about the clients.
+        ip_sampler : IpSampler
+            Samples the IPs from the networks available.
         dst_port_type : BufferedRandomChoiceGenerator
             Can be either well-known or registered.
 
         Returns
         -------
-        random_ip : str
-            Destination IP.
-        dst_port : int
-            Destination Port.
-
-        """
-        random_network = random.choice(client_network)
-        net = ipaddress.IPv4Network(random_network)
-
-        random_ip_index = random.randint(0, net.num_addresses -1)
-        random_ip = net[random_ip_index]
-        Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Network {net} has an range of {net.num_addresses}, Ip index: {random_ip_index}')
-        
-        if ips_pool[ip_selected_idx] == "IPv6Address":
-            random_ip = ipaddress.IPv6Address(f'2002::{random_ip}').compressed
-            print("IP converted to IPv6")
+        dst_ips : list
+            Destination IPs (as integers, formatted at export).
+        dst_ports : list
+            Destination Ports.
+
+        """
+        n = len(tickets)
+        groups, groups_idx = {}, np.empty(n, dtype=np.int64)
+        for i, ticket in enumerate(tickets):
+            key = (ticket["client"], ticket["country"])
+            if key not in groups:
+                groups[key] = len(groups)
+            groups_idx[i] = groups[key]
             
-        dst_port_type = next(dst_port_type.generate())
-
-        if dst_port_type == "well-known":
-            dst_port = random.randint(0, 1023)
-        else:
-            dst_port = random.randint(1024, 49151)
-        return random_ip, dst_port
+        bases, sizes, offsets, counts = ip_sampler.build_network_groups([clients_info[client][country]["networks"] for client, country in groups])
+        dst_ips = ip_sampler.sample_addresses(groups_idx, bases, sizes, offsets, counts)
+        
+        well_known = np.random.choice(dst_port_type.options, p = dst_port_type.probabilities, size=n) == "well-known"
+        dst_ports = np.where(well_known, np.random.randint(0, 1024, size=n), np.random.randint(1024, 49152, size=n))
+        return dst_ips.tolist(), dst_ports.tolist()
 
     def get_subtechniques(family, steps_pool, step, locked):
         """
@@ -2305,7 +2672,7 @@ class Utils:
 
     def is_dict_sorted(my_dict):
         """
-        Checks if a dictionary is sorted by datetime.
+        Checks if a dictionary of tickets is sorted by raised timestamp.
 
         Parameters
         ----------
@@ -2320,13 +2687,11 @@ class Utils:
         """        
         values = list(my_dict.values())
         for i in range(len(values) - 1):
-            current_datetime = values[i]['raised']
-            next_datetime = values[i + 1]['raised']
-            if current_datetime > next_datetime:
+            if values[i]['raised_tsp'] > values[i + 1]['raised_tsp']:
                 return False
         return True
     
-    def format_generation_datasets(data, name, format_idx, dataset_params, extra_feat, plot_title):
+    def format_generation_datasets(data, name, format_idx, dataset_params, extra_feat, plot_title, append=False):
         """
         Applies special format to the output file.    
 
@@ -2344,6 +2709,8 @@ class Utils:
             Extra features to be included in the dataframe.
         plot_title : str
             Title of the generated dataset.
+        append : bool, optional
+            Appends the tickets to an existing output file (XLSX extensions are written into a new part file). The default is False.
 
         Returns
         -------
@@ -2381,54 +2748,163 @@ class Utils:
             for col in categorical_columns:
                 dataset[col] = dataset[col].astype('category')
     
-        if format_idx == 0:
-            filename = f'./Output/Generation/{name}.csv'
-            dataset.to_csv(filename, encoding='utf-8', index=False, sep=';')
-        else:
-            if not Utils.check_excel_limit_rows(dataset, name): 
-                filename = f'./Output/Generation/{name}_{plot_title}.xlsx'
-                writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-                dataset.to_excel(writer, sheet_name='Tickets Info', index = False)  
-                workbook  = writer.book
-                #worksheet = writer.sheets['Tickets Info']   
-                format1 = workbook.add_format()
-                format1.set_align('center')
-    
-                #worksheet.set_column(dataset.columns.get_loc("ID"), dataset.columns.get_loc("Time Difference"), 7, format1)
-                #worksheet.set_column(dataset.columns.get_loc("Location"), dataset.columns.get_loc("Time Difference"), 18, format1, {'level': 1, 'hidden': True})
-                #worksheet.set_column(dataset.columns.get_loc("Ticket Raised (UTC)"), dataset.columns.get_loc("Users Off Days"), 20, format1)
-                #worksheet.set_column(dataset.columns.get_loc("Team Users"), dataset.columns.get_loc("Users Next Shift"), 20, format1, {'level': 1, 'hidden': True})
-                #worksheet.set_column(dataset.columns.get_loc("Users Available"), dataset.columns.get_loc("Destination PORT"), 20, format1)
-                
-                writer.save()        
+        Utils.save_dataset(dataset, name, format_idx, plot_title, append)
         return dataset
-                    
-    def check_excel_limit_rows(dataset, name):
+    
+    def save_dataset(dataset, name, format_idx, plot_title, append=False):
         """
-        Checks if dataset reach the max rows of Excel.
+        Writes a dataset into the generation folder (CSV or XLSX).
 
         Parameters
         ----------
         dataset : dataframe
-            Dataframe being analyzed.
+            Dataset to be written.
         name : str
-            Name of the file to be outputed.
+            Name of the output file.
+        format_idx : int
+            0 - CSV and 1 - XLSX.
+        plot_title : str
+            Title of the generated dataset.
+        append : bool, optional
+            Appends the tickets to an existing output file (CSV) or writes them into the next XLSX part file. The default is False.
 
         Returns
         -------
-        bool
-            Does surpass or not Excel limit rows.
+        None.
 
         """
-        # Excel limit row is 1,048,576 
-        if dataset.shape[0] > 104876:
-            print("Saved on csv file due to excel limit rows!")
+        if format_idx == 0:
             filename = f'./Output/Generation/{name}.csv'
-            dataset.to_csv(filename, encoding='utf-8', index=False, sep=';')
-            return True
+            if append and os.path.exists(filename):
+                dataset.to_csv(filename, encoding='utf-8', index=False, sep=';', mode='a', header=False)
+            else:
+                dataset.to_csv(filename, encoding='utf-8', index=False, sep=';')
         else:
-            return False
+            filename = f'./Output/Generation/{name}_{plot_title}.xlsx'
+            if append:
+                # xlsx files can not be appended, each extension is written into its own file (e.g., name_title_2.xlsx)
+                part = 1
+                while os.path.exists(filename):
+                    part += 1
+                    filename = f'./Output/Generation/{name}_{plot_title}_{part}.xlsx'
+            # The columns are fixed by the shallow copy, so the pipeline can keep using the dataset while the file is written
+            writer = threading.Thread(target=Utils.run_excel_writer, args=(dataset.copy(deep=False), filename, 'Tickets Info'))
+            writer.start()
+            Utils.EXCEL_WRITERS.append(writer)
+
+    def run_excel_writer(dataset, filename, sheet_name):
+        """
+        Background worker of write_xlsx. The exception raised (if any) is kept and re-raised by wait_excel_writers.
+
+        Parameters
+        ----------
+        dataset : dataframe
+            Dataset to be written.
+        filename : str
+            XLSX file.
+        sheet_name : str
+            Name of the first sheet.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            Utils.write_xlsx(dataset, filename, sheet_name)
+        except Exception as error:
+            Utils.EXCEL_ERRORS.append(error)
+
+    def write_xlsx(dataset, filename, sheet_name):
+        """
+        Streams a dataset into an XLSX file (xlsxwriter constant memory mode), chunk by chunk. 
+        Datasets above the Excel limit are split into several sheets (e.g., Tickets Info, Tickets Info 2).
+
+        Parameters
+        ----------
+        dataset : dataframe
+            Dataset to be written.
+        filename : str
+            XLSX file.
+        sheet_name : str
+            Name of the first sheet.
+
+        Returns
+        -------
+        None.
+
+        """
+        import xlsxwriter
+        rows_per_sheet = Utils.EXCEL_MAX_ROWS - 1
+        n_rows = len(dataset)
+        n_sheets = max(1, math.ceil(n_rows / rows_per_sheet))
+        workbook = xlsxwriter.Workbook(filename, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+        header = [str(column) for column in dataset.columns]
         
+        for sheet_idx in range(n_sheets):
+            worksheet = workbook.add_worksheet(sheet_name if sheet_idx == 0 else f'{sheet_name} {sheet_idx + 1}')
+            worksheet.write_row(0, 0, header)
+            sheet_end = min((sheet_idx + 1) * rows_per_sheet, n_rows)
+            row = 1
+            for start in range(sheet_idx * rows_per_sheet, sheet_end, Utils.EXCEL_CHUNK_ROWS):
+                chunk = dataset.iloc[start:min(start + Utils.EXCEL_CHUNK_ROWS, sheet_end)]
+                # constant_memory requires the rows to be written in order
+                for values in zip(*[Utils.get_excel_values(chunk.iloc[:, col]) for col in range(chunk.shape[1])]):
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+        workbook.close()
+        print(f'{filename} saved ({n_rows} tickets, {n_sheets} sheets)')
+
+    def get_excel_values(column):
+        """
+        Converts a column into values supported by xlsxwriter (missing values are left empty, lists are written as text and datetimes in UTC without timezone).
+
+        Parameters
+        ----------
+        column : series
+            Column being converted.
+
+        Returns
+        -------
+        list
+            Values of the column.
+
+        """
+        if pd.api.types.is_datetime64_any_dtype(column):
+            if column.dt.tz is not None:
+                column = column.dt.tz_convert(None)
+            return [None if pd.isna(value) else value.to_pydatetime() for value in column]
+
+        values = column.astype(object).where(column.notna(), None).tolist()
+        if column.dtype == object or isinstance(column.dtype, pd.CategoricalDtype):
+            for idx, value in enumerate(values):
+                if isinstance(value, (list, tuple, dict, set)):
+                    values[idx] = str(value)
+                elif isinstance(value, datetime) and value.tzinfo is not None:
+                    values[idx] = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return values
+
+    def wait_excel_writers():
+        """
+        Waits for the XLSX files being written in background.
+
+        Raises
+        ------
+        Exception
+            First exception raised while writing the files.
+
+        Returns
+        -------
+        None.
+
+        """
+        while Utils.EXCEL_WRITERS:
+            Utils.EXCEL_WRITERS.pop().join()
+        if Utils.EXCEL_ERRORS:
+            error = Utils.EXCEL_ERRORS[0]
+            Utils.EXCEL_ERRORS.clear()
+            raise error
+                    
     def get_family_middle_subtechniques(family_steps_pool):
         """
         Gets all families subtechniques (excluding locked subtechniques).
@@ -2793,8 +3269,7 @@ class Utils:
         team = ticket["team"]
         analyst = ticket["analyst"]
         
-        Utils.update_data(teams_data[team]["analysts"][analyst], assigned_ticket = ticket["id"], fixed = ticket['fixed'], fixed_tsp = round(ticket["fixed_tsp"], 1))
-        teams_data[team]["analysts"][analyst]["summary"][train_id] = ticket["duration_outlier"]
+        Utils.update_data(teams_data[team]["analysts"][analyst], assigned_ticket = ticket["id"], fixed_tsp = round(ticket["fixed_tsp"], 1))
 
     def replicate_ticket(teams_data, original_ticket, tickets, priority_queues, n_replicated, aux_data):
         """
@@ -2836,7 +3311,7 @@ class Utils:
             rep_ticket = tickets[next_team][next_id]
             rep_ticket["id"] = next_id
 
-            Utils.update_data(rep_ticket, raised = original_ticket["fixed"], raised_tsp = original_ticket["fixed_tsp"], allocated = original_ticket["fixed"], allocated_tsp = original_ticket["fixed_tsp"], team = next_team, analyst = "---")
+            Utils.update_data(rep_ticket, raised_tsp = original_ticket["fixed_tsp"], allocated_tsp = original_ticket["fixed_tsp"], team = next_team, analyst = "---")
             Utils.update_data(rep_ticket, country = original_ticket["country"], client =  original_ticket["client"], family = original_ticket["family"], subfamily = original_ticket["subfamily"], priority = original_ticket["priority"], outlier = original_ticket["outlier"], replicated = ticket_id, escalate = False, replication_status = None)
 
             substr = ['feature', 'source', 'destination']
@@ -2912,7 +3387,7 @@ class Utils:
         ----------
         curr_shift : int
             Current work shift.
-        shifts_data : dict
+        shifts_data : ShiftCalendar
             Comprises information about the work shifts.
 
         Returns
@@ -2921,49 +3396,24 @@ class Utils:
             Next shift index available.
 
         """
-        shifts = list(shifts_data.keys())
-        idx = shifts.index(curr_shift)
-        next_idx = (idx + 1) % len(shifts)  
-        return shifts[next_idx]
+        return shifts_data.get_next_shift(curr_shift)
     
-    def update_date(date, next_shift, shifts_data):
-        """
-        Updates a datetime.
-
-        Parameters
-        ----------
-        date : datetime
-            Date being updated.
-        next_shift : int
-            Next shift index availble.
-        shifts_data : dict
-            Comprises information about the work shifts.
-
-        Returns
-        -------
-        datetime
-            Updated datetime.
-
-        """
-        start_time = shifts_data[next_shift]['start']
-        return date.replace(hour=start_time.hour, minute=start_time.minute, second=0, microsecond=0)
-
-    def get_free_analysts_tsp(analysts_info, analysts, ticket_tsp, aux_data, show):
+    def get_free_analysts_tsp(availability, team, shift, ticket_tsp, aux_data):
         """
         Gets the analysts available at a particular timestamp.
 
         Parameters
         ----------
-        analysts_info : dict
-            Comprises all data about teams and their operators.
-        analysts : list
-            All operators working at a particular shift.
+        availability : AnalystAvailability
+            Analysts of each team and shift indexed by the time they become free.
+        team : str
+            Team being analyzed.
+        shift : int
+            Work shift being analyzed.
         ticket_tsp : int
             Ticket timestamp being analyzed.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
-        show : bool
-            Show or not debugging.
 
         Returns
         -------
@@ -2971,14 +3421,7 @@ class Utils:
             Operators available for treatment.
 
         """
-        free_analysts = []
-        for analyst in analysts:
-            if analysts_info[analyst]["fixed_tsp"] <= ticket_tsp: 
-                free_analysts.append(analyst)
-            else:
-                if show:
-                    Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'{analyst} occupied until {analysts_info[analyst]["fixed"]}')
-                
+        free_analysts = availability.get_free_analysts(team, shift, ticket_tsp)
         if not free_analysts:
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, "No analysts available at the moment!")
         else:
@@ -3011,36 +3454,32 @@ class Utils:
 
         return analysts
 
-    def get_next_shift_data(temp_date, curr_shift, shifts_data):
+    def get_next_shift_data(temp_tsp, curr_shift, shifts_data):
         """
         Gets information about the next shift.
 
         Parameters
         ----------
-        temp_date : datetime
-            Current datetime being analyzed.
+        temp_tsp : float
+            Current timestamp being analyzed.
         curr_shift : int
             Shift currently being analyzed.
-        shifts_data : dict
+        shifts_data : ShiftCalendar
             Comprises information about the work shifts.
 
         Returns
         -------
-        temp_date : datetime
-            Updated date.
+        temp_tsp : float
+            Start timestamp of the next shift.
         next_shift : int
             Updated work shift.
 
         """
-        next_shift = Utils.get_next_shift(curr_shift, shifts_data)
+        temp_tsp, next_shift = shifts_data.get_next_shift_start(temp_tsp, curr_shift)
         if next_shift == 0:
             print("Shift is on next day!")
-            temp_date = Utils.update_date(temp_date, next_shift, shifts_data)
-            temp_date = temp_date + timedelta(1)
-        else:
-            temp_date = Utils.update_date(temp_date, next_shift, shifts_data)
 
-        return temp_date, next_shift
+        return temp_tsp, next_shift
     
     def build_subfamily_action_teams(teams_data, family, subfamily, family_actions, family_steps_pool, subfamily_pool, aux_data):
         """
@@ -3172,16 +3611,16 @@ class Utils:
         families_resolution[team][family]["total_time"] += duration
         families_resolution[team][family]["avg_time"] = families_resolution[team][family]["total_time"] / families_resolution[team][family]["number"]
     
-    def check_pending_tickets_priorities(analysts_info, analysts_in_shift, curr_team, ticket_tsp, tickets_info, priority_queues, aux_data):
+    def check_pending_tickets_priorities(availability, curr_shift, curr_team, ticket_tsp, tickets_info, priority_queues, aux_data):
         """
         Frees an operator when ticket is fixed.
 
         Parameters
         ----------
-        analysts_info : dict
-            Comprises all data about teams and their operators.
-        analysts_in_shift : list
-            Operators working in the current shift.
+        availability : AnalystAvailability
+            Analysts of each team and shift indexed by the time they become free.
+        curr_shift : int
+            Shift currently being analyzed.
         curr_team : str
             Current team being analyzed.
         ticket_tsp : int
@@ -3199,10 +3638,11 @@ class Utils:
 
         """
         if Utils.check_tickets_in_team_queue(priority_queues, curr_team):
-            min_time, min_tsp = Utils.find_min_analyst_endtime(analysts_info[curr_team]["analysts"], analysts_in_shift, aux_data)
-            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Min endtime: {min_time}') 
+            min_tsp = Utils.find_min_analyst_endtime(availability, curr_team, curr_shift, aux_data)
+            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Min endtime: {min_tsp}') 
             Utils.update_tickets_wait_time(curr_team, min_tsp, tickets_info, priority_queues, aux_data)
-            Utils.update_tickets_priorities(curr_team, tickets_info, priority_queues, min_time, min_tsp, aux_data)
+            with aux_data.report.span("update_tickets_priorities"):
+                Utils.update_tickets_priorities(curr_team, tickets_info, priority_queues, min_tsp, aux_data)
 
     def update_tickets_wait_time(team, min_curr_tsp, tickets_info, priority_queues, aux_data):
         """
@@ -3236,7 +3676,7 @@ class Utils:
                         tickets_info[ticket_id]['in_queue'] = time_in_queue
                         Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Ticket {ticket_id} wait time in queue {priority}: {time_in_queue}')
               
-    def update_tickets_priorities(team, tickets_info, priority_queues, min_time, min_time_tsp, aux_data):
+    def update_tickets_priorities(team, tickets_info, priority_queues, min_time_tsp, aux_data):
         """
         Updates the priorities of the tickets.
 
@@ -3248,9 +3688,7 @@ class Utils:
             Comprises information about all tickets.
         priority_queues : dict
             Comprises all the pending tickets, organized according to their priority.
-        min_time : datetime
-            Minimum datetime analyzed.
-        min_time_tsp : int
+        min_time_tsp : float
             Minimum timestamp analyzed.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
@@ -3291,9 +3729,9 @@ class Utils:
                                 next_priority = Utils.get_next_priority(priority, aux_data.priority_levels)
                                 Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Ticket {ticket_id} will be moved to priority {next_priority}')
                                 new_priority_team[next_priority]["tickets"].append(ticket_id)
+                                aux_data.report.count("promotions")
                                         
                                 tickets_info[ticket_id]['priority'] = next_priority
-                                tickets_info[ticket_id]['added_queue_time'] = min_time
                                 tickets_info[ticket_id]['added_queue_tsp'] = min_time_tsp
                                 
                                 if next_priority not in priorities_changed:
@@ -3315,7 +3753,7 @@ class Utils:
                     priority_queues[team][priority]["tickets"] = sorted_id_list
                     Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'After {team} {priority}: {priority_queues[team][priority]["tickets"]}')
                             
-    def update_allocated_times(tickets_info, priority_queues, team, min_curr_time, min_curr_tsp, aux_data):
+    def update_allocated_times(tickets_info, priority_queues, team, min_curr_tsp, aux_data):
         """
         Updates allocation times of the pending tickets.
 
@@ -3327,9 +3765,7 @@ class Utils:
             Comprises all the pending tickets, organized according to their priority.
         team : str
             Team being analyzed.
-        min_time : datetime
-            Minimum datetime analyzed.
-        min_time_tsp : int
+        min_curr_tsp : float
             Minimum timestamp analyzed.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
@@ -3344,8 +3780,8 @@ class Utils:
             if priority_queues[team][priority]["tickets"]:
                 for ticket_id in priority_queues[team][priority]["tickets"]:
                     if min_curr_tsp > tickets_info[ticket_id]['allocated_tsp']:
-                        Utils.update_data(tickets_info[ticket_id], allocated = min_curr_time, allocated_tsp = min_curr_tsp, temp_allocated = min_curr_time, temp_allocated_tsp = min_curr_tsp)
-                        Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'ticket {ticket_id} allocated updated: {tickets_info[ticket_id]["allocated"]}')
+                        Utils.update_data(tickets_info[ticket_id], allocated_tsp = min_curr_tsp, temp_allocated_tsp = min_curr_tsp)
+                        Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'ticket {ticket_id} allocated updated: {tickets_info[ticket_id]["allocated_tsp"]}')
                         if "analyzed_in_shift" in tickets_info[ticket_id]:
                             del tickets_info[ticket_id]['analyzed_in_shift']
       
@@ -3425,11 +3861,10 @@ class Utils:
         ticket_id = ticket["id"]
         if ticket_id not in priority_queues[ticket["team"]][ticket["priority"]]["tickets"]:
             priority_queues[ticket["team"]][ticket["priority"]]["tickets"].append(ticket_id)  
-            ticket['added_queue_time'] = ticket['raised']
             ticket['added_queue_tsp'] = ticket['raised_tsp']
         else:
-            Utils.update_data(ticket, allocated = ticket["temp_allocated"], allocated_tsp = ticket["temp_allocated_tsp"])
-            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Ticket {ticket_id} already in priority_queue. Reset date to {ticket["temp_allocated"]}')
+            Utils.update_data(ticket, allocated_tsp = ticket["temp_allocated_tsp"])
+            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Ticket {ticket_id} already in priority_queue. Reset date to {ticket["temp_allocated_tsp"]}')
             
     def get_last_n_tickets_in_priority_queue(priority_queue, tickets_info, n_tickets, multiplier, aux_data):
         """
@@ -3467,38 +3902,32 @@ class Utils:
             
         return avg
     
-    def find_min_analyst_endtime(analysts_data, analysts_in_shift, aux_data):
+    def find_min_analyst_endtime(availability, team, shift, aux_data):
         """
-        Gets the earliest ending datetime of all analysts.
+        Gets the earliest ending timestamp of the analysts of a shift.
 
         Parameters
         ----------
-        analysts_data : dict
-            Comprises all data the operators in a certain team
-        analysts_in_shift : list
-            Operators working in the current shift.
+        availability : AnalystAvailability
+            Analysts of each team and shift indexed by the time they become free.
+        team : str
+            Team being analyzed.
+        shift : int
+            Work shift being analyzed.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
 
         Returns
         -------
-        min_time : datetime
-            Minimum datetime.
-        min_curr_tsp : int
+        min_curr_tsp : float
             Minimum timestamp.
 
         """    
-        min_time = None
-        min_curr_tsp = float('inf')
-        for analyst in analysts_in_shift:
-            Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'{analyst} - {analysts_data[analyst]["fixed"]}')
-            if min_curr_tsp >= analysts_data[analyst]["fixed_tsp"]:
-                min_time = analysts_data[analyst]["fixed"]
-                min_curr_tsp = analysts_data[analyst]["fixed_tsp"]
-                
-        return min_time, min_curr_tsp
+        min_curr_tsp = availability.get_min_endtime(team, shift)
+        Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'Shift {shift} min endtime - {min_curr_tsp}')
+        return min_curr_tsp
     
-    def update_analysts_in_next_shift(analysts_data, team, start_date, prev_shift, curr_shift, gen_analysts_info, tt_analysts_info, shifts_data, aux_data):
+    def update_analysts_in_next_shift(analysts_data, team, start_tsp, prev_shift, curr_shift, gen_analysts_info, tt_analysts_info, shifts_data, aux_data):
         """
         Prepares the analysts of the next shift and cleans data from analysts of the shift closed.
 
@@ -3508,8 +3937,8 @@ class Utils:
             Comprises all data the operators in a certain team
         team : str
             Team being analyzed.
-        start_date : datetime
-            Start datetime of the next shift.
+        start_tsp : float
+            Start timestamp of the next shift.
         prev_shift : int
             Previous work shift.
         curr_shift : int
@@ -3518,7 +3947,7 @@ class Utils:
             Comprises all data about teams and their operators (in the generator that serves as emulator).
         tt_analysts_info : dict
             Comprises all data about teams and their operators (in the recommender system).
-        shifts_data : dict
+        shifts_data : ShiftCalendar
             Comprises information about the work shifts.
         aux_data : UtilsParams
             Comprises auxiliar data, including outlier, priority levels, and other features.
@@ -3539,42 +3968,36 @@ class Utils:
                         Utils.update_data(tt_analysts_info[team]["analysts"][analyst], assigned_ticket = None)
                     
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'All operators from shift {prev_shift} are now free')
-            start_date_utc, start_date_tsp = Utils.set_date_start_shift(start_date, shifts_data)
+            start_date_tsp = Utils.set_date_start_shift(start_tsp, shifts_data)
         
             for analyst in analysts_data:
                 if analysts_data[analyst]["shift"] == curr_shift:
                     if gen_analysts_info != None:
-                        Utils.update_data(gen_analysts_info[team]["analysts"][analyst], fixed = start_date_utc, fixed_tsp = start_date_tsp, assigned_ticket = None)
+                        Utils.update_data(gen_analysts_info[team]["analysts"][analyst], fixed_tsp = start_date_tsp, assigned_ticket = None)
                     if tt_analysts_info != None:
-                        Utils.update_data(tt_analysts_info[team]["analysts"][analyst], fixed = start_date_utc, fixed_tsp = start_date_tsp, assigned_ticket = None)
+                        Utils.update_data(tt_analysts_info[team]["analysts"][analyst], fixed_tsp = start_date_tsp, assigned_ticket = None)
         
             Utils.debug_and_log_data(aux_data.debug, aux_data.logger, f'All operators from shift {curr_shift} are now available to treat tickets') 
 
-    def set_date_start_shift(start_date, shifts_data):
+    def set_date_start_shift(start_tsp, shifts_data):
         """
         Sets the starting date of the operators of the current shift.
 
         Parameters
         ----------
-        start_date : datetime
-            Start datetime of the next shift.
-        shifts_data : dict
+        start_tsp : float
+            Timestamp within the next shift.
+        shifts_data : ShiftCalendar
             Comprises information about the work shifts.
 
         Returns
         -------
-        start_date_combined_utc : datetime
-            Start datetime of the next shift (with updated time)
-        int
-            Start timestamp of the next shift (with updated time).
+        float
+            Start timestamp of the next shift.
 
         """        
-        start_date_date = start_date.date()
-        start_date_shift = Utils.get_ticket_shift(start_date.time(), shifts_data)
-        start_date_combined = datetime.combine(start_date_date, shifts_data[start_date_shift]["start"])
-        start_date_combined_utc = pytz.UTC.localize(start_date_combined)
-        
-        return start_date_combined_utc, start_date_combined_utc.timestamp()
+        _, shift_start_tsp, _ = shifts_data.get_shift_bounds(start_tsp)
+        return shift_start_tsp
         
     def check_next_existing_teams(tickets, team):
         """
@@ -3604,6 +4027,45 @@ class Utils:
                     sorted_items = sorted(tickets[next_teams[0]].items(), key=lambda x: x[1]['raised_tsp'])
                     tickets[next_teams[0]] = {i: value for i, (key, value) in enumerate(sorted_items)}    
     
+    def get_tsp_datetime(tsp):
+        """
+        Converts a UTC timestamp into a datetime (only used when the tickets are exported, the treatment works on timestamps).
+
+        Parameters
+        ----------
+        tsp : float
+            Timestamp (seconds).
+
+        Returns
+        -------
+        datetime
+            UTC datetime.
+
+        """
+        return datetime.fromtimestamp(tsp, tz=timezone.utc)
+
+    def set_tickets_dates(tickets):
+        """
+        Builds the datetimes of the treated tickets from their timestamps (allocated, fixed and raised of the replicated tickets).
+
+        Parameters
+        ----------
+        tickets : dict
+            Comprises information about all tickets (per team).
+
+        Returns
+        -------
+        None.
+
+        """
+        for team in tickets:
+            for ticket in tickets[team].values():
+                ticket["allocated"] = Utils.get_tsp_datetime(ticket["allocated_tsp"])
+                if "fixed_tsp" in ticket:
+                    ticket["fixed"] = Utils.get_tsp_datetime(ticket["fixed_tsp"])
+                if "replicated" in ticket:
+                    ticket["raised"] = Utils.get_tsp_datetime(ticket["raised_tsp"])
+
     def process_tickets_solved(tickets, teams, subfamily_pool, logger):
         """
         Creates a dataframe from all tickets treated by the different teams.
@@ -3917,12 +4379,12 @@ class Utils:
                 
     def save_generator_data(output_path, family_info, family_steps, subfamily_info, analysts_steps_info, special_steps):
         """
-        Stores the generator data into a JSON file.
+        Stores the generator data into a msgpack or JSON file (according to the extension).
 
         Parameters
         ----------
         output_path : str
-            Output path to save the JSON file.
+            Output path to save the file.
         family_info : dict
             Comprises information about the families.
         family_steps : dict
@@ -3939,18 +4401,220 @@ class Utils:
         None.
 
         """
-        with open(output_path, 'w') as fd:
-            fd.write(json.dumps([family_info, family_steps, subfamily_info, analysts_steps_info, special_steps], indent=2, default=str)) 
+        Utils.dump_data_file(output_path, [family_info, family_steps, subfamily_info, analysts_steps_info, special_steps])
         print("Generator's info saved")
         
+    def get_data_file(path, data_format):
+        """
+        Gets the file used to store generation data according to the format selected.
+
+        Parameters
+        ----------
+        path : str
+            File path without extension.
+        data_format : str
+            Format selected (msgpack or json). msgpack falls back to JSON if the library is not installed.
+
+        Returns
+        -------
+        str
+            File path with extension.
+
+        """
+        if data_format == "msgpack":
+            try:
+                import msgpack
+                return f'{path}.msgpack'
+            except ImportError:
+                print("msgpack is not installed, data stored as JSON")
+        return f'{path}.json'
+    
+    def find_data_file(path):
+        """
+        Finds a file stored by get_data_file (msgpack has precedence over JSON).
+
+        Parameters
+        ----------
+        path : str
+            File path without extension.
+
+        Returns
+        -------
+        str
+            File path with extension.
+
+        """
+        if os.path.exists(f'{path}.msgpack'):
+            return f'{path}.msgpack'
+        return f'{path}.json'
+    
+    def dump_data_file(output_path, data):
+        """
+        Writes a list of objects into a msgpack or JSON file. Both are written while encoding, the dictionaries 
+        of the msgpack file are packed entry by entry so the whole file is never held in memory.
+
+        Parameters
+        ----------
+        output_path : str
+            Output path (.msgpack or .json).
+        data : list
+            Objects to store.
+
+        Returns
+        -------
+        None.
+
+        """
+        if output_path.endswith(".msgpack"):
+            import msgpack
+            packer = msgpack.Packer(default=Utils.json_default, use_bin_type=True)
+            with open(output_path, 'wb') as fd:
+                fd.write(packer.pack_array_header(len(data)))
+                for item in data:
+                    if isinstance(item, dict):
+                        fd.write(packer.pack_map_header(len(item)))
+                        for key, value in item.items():
+                            fd.write(packer.pack(key))
+                            fd.write(packer.pack(value))
+                    else:
+                        fd.write(packer.pack(item))
+        else:
+            with open(output_path, 'w') as fd:
+                json.dump(data, fd, indent=2, default=Utils.json_default)
+                
+    def load_data_file(input_path, object_hook=None):
+        """
+        Reads a file written by dump_data_file.
+
+        Parameters
+        ----------
+        input_path : str
+            Path of the file (.msgpack or .json).
+        object_hook : function, optional
+            Function applied to each dictionary decoded. The default is None.
+
+        Returns
+        -------
+        list
+            Objects stored.
+
+        """
+        if input_path.endswith(".msgpack"):
+            import msgpack
+            with open(input_path, 'rb') as fd:
+                unpacker = msgpack.Unpacker(fd, raw=False, strict_map_key=False, max_buffer_size=0, **({"object_hook": object_hook} if object_hook else {}))
+                return unpacker.unpack()
+        with open(input_path) as fd:
+            return json.load(fd, object_hook=object_hook)
+        
+    def json_default(value):
+        """
+        Converts values that are not JSON serializable (numpy scalars are kept as numbers/booleans).
+
+        Parameters
+        ----------
+        value : object
+            Value to convert.
+
+        Returns
+        -------
+        object
+            Value converted.
+
+        """
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        return str(value)
+    
+    def load_generator_data(input_path):
+        """
+        Loads the generator data stored by save_generator_data.
+
+        Parameters
+        ----------
+        input_path : str
+            Path of the msgpack or JSON file.
+
+        Returns
+        -------
+        list
+            Families, families steps, subfamilies, analysts steps speeds and special steps.
+
+        """
+        def restore_booleans(data):
+            # Older files stored numpy booleans as strings
+            return {k: (v == "True" if k in Utils.GENERATOR_BOOLEAN_FIELDS and v in ["True", "False"] else v) for k, v in data.items()}
+        
+        return Utils.load_data_file(input_path, restore_booleans)
+    
+    def save_treatment_state(output_path, analysts_info, clients_info, priority_queues, tickets_number, last_raised_tsp):
+        """
+        Stores the final state of the treatment (analysts, clients and queues), allowing the generation to be extended later.
+
+        Parameters
+        ----------
+        output_path : str
+            Output path to save the file.
+        analysts_info : dict
+            Comprises all data about teams and their operators.
+        clients_info : dict
+            Comprises information about the clients.
+        priority_queues : dict
+            Comprises all the pending tickets, organized according to their priority.
+        tickets_number : int
+            Number of tickets generated so far.
+        last_raised_tsp : int
+            Timestamp of the last ticket raised.
+
+        Returns
+        -------
+        None.
+
+        """
+        analysts_state = {}
+        for team in analysts_info:
+            analysts_state[team] = {"analysts": {}}
+            for analyst, data in analysts_info[team]["analysts"].items():
+                analysts_state[team]["analysts"][analyst] = {k: v for k, v in data.items() if k != "summary"}
+                
+        queues_state = {team: {priority: list(priority_queues[team][priority]["tickets"]) for priority in priority_queues[team]} for team in priority_queues}
+        Utils.dump_data_file(output_path, [{"analysts_info": analysts_state, "clients_info": clients_info, "priority_queues": queues_state,
+                                            "tickets_number": tickets_number, "last_raised_tsp": last_raised_tsp}])
+        print("Treatment state saved")
+        
+    def load_treatment_state(input_path):
+        """
+        Loads the treatment state stored by save_treatment_state.
+
+        Parameters
+        ----------
+        input_path : str
+            Path of the msgpack or JSON file.
+
+        Returns
+        -------
+        state : dict
+            Analysts, clients, queues, number of tickets and last raised timestamp.
+
+        """
+        state = Utils.load_data_file(input_path)[0]
+        
+        for team in state["analysts_info"]:
+            for analyst, data in state["analysts_info"][team]["analysts"].items():
+                data["summary"], data["assigned_ticket"] = {}, None
+            state["priority_queues"][team] = {int(priority): tickets for priority, tickets in state["priority_queues"][team].items()}
+        return state
+        
     def save_input_data(output_path, generation_params, other_params):
         """
-        Stores the user input into a JSON file.
+        Stores the user input into a msgpack or JSON file (according to the extension).
 
         Parameters
         ----------
         output_path : str
-            Output path to save the JSON file.
+            Output path to save the file.
         generation_params : dict
             Comprises all data about parameters related to ticket and team generation.
         other_params : dict
@@ -3961,10 +4625,31 @@ class Utils:
         None.
 
         """
-        with open(output_path, 'w') as fd:
-            fd.write(json.dumps([generation_params, other_params], indent=2, default=str)) 
+        generation_params = dict(generation_params)
+        if isinstance(generation_params.get("suspicious_ips"), dict):
+            # The packed suspicious IPs are stored by reference (source file and size)
+            suspicious_ips = generation_params["suspicious_ips"]
+            generation_params["suspicious_ips"] = {"source": suspicious_ips.get("source"), "count": len(suspicious_ips["ips"])}
+        Utils.dump_data_file(output_path, [generation_params, other_params])
         print("Input's info saved")
         
+    def load_input_data(input_path):
+        """
+        Loads the user input stored by save_input_data.
+
+        Parameters
+        ----------
+        input_path : str
+            Path of the msgpack or JSON file.
+
+        Returns
+        -------
+        list
+            Generation and treatment parameters.
+
+        """
+        return Utils.load_data_file(input_path)
+        
     def set_seed(seed):
         """
         Sets the seed for random tasks.
@@ -4036,40 +4721,7 @@ class Utils:
         else:
             return data['wait_time'] / data['n_tickets']
         
-    def get_incidents_treated_in_shift(family, subfamily, time_spent, incidents_performance):
-        """
-        Gets the incidents treated in a particular shift.
-
-        Parameters
-        ----------
-        family : str
-            Family being analyzed.
-        subfamily : str
-            Subfamily being analyzed.
-        time_spent : float
-            Time spent in treating the subfamily.
-        incidents_performance : dict
-            Comprises information about the ticket treatment performance.
-
-        Returns
-        -------
-        incidents_performance : TYPE
-            DESCRIPTION.
-
-        """
-        if family not in incidents_performance:
-            incidents_performance[family] = {}
-                
-        if subfamily not in incidents_performance[family]:
-            incidents_performance[family][subfamily] = {}
-            incidents_performance[family][subfamily]["n_tickets"] = 0
-            incidents_performance[family][subfamily]["time_spent"] = 0
-        incidents_performance[family][subfamily]["n_tickets"] += 1
-        incidents_performance[family][subfamily]["time_spent"] += time_spent
-        
-        return incidents_performance
-    
-    def analyse_shifts_performance(shifts_data, teams_summary, team_analysts):
+    def analyse_shifts_performance(shifts_data, team_statistics, team_analysts):
         """
         Assesses the performance of the teams and their analysts in the different shifts.
 
@@ -4077,8 +4729,8 @@ class Utils:
         ----------
         shifts_data : dict
             Comprises information about the work shifts.
-        teams_summary : dict
-            Comprises statistics about the treatment performed by different teams.
+        team_statistics : dict
+            Comprises the running statistics (TreatmentStatistics) of the shifts, analysts and incidents of the team.
         team_analysts : list
             List of operators in the teams.
 
@@ -4123,23 +4775,8 @@ class Utils:
         best_average_wait_time = Utils.calculate_average_time(shifts_data[best_average_wait_time_shift], "wait_time")
         print(f'The shift with the best average wait time is shift {best_average_wait_time_shift} with {best_average_wait_time} minutes')
         
-        incidents_performance = {}
-        for shift in teams_summary.keys():
-            analysts_performance = {}
-
-            for ticket_id in teams_summary[shift].keys():
-                curr_analyst = teams_summary[shift][ticket_id]["analyst"]
-                if curr_analyst not in analysts_performance:
-                    analysts_performance[curr_analyst] = {}
-                    analysts_performance[curr_analyst]["n_tickets"] = 0
-                    analysts_performance[curr_analyst]["time_spent"] = 0
-                analysts_performance[curr_analyst][ticket_id] = teams_summary[shift][ticket_id]["time_spent"]
-                analysts_performance[curr_analyst]["n_tickets"] += 1
-                analysts_performance[curr_analyst]["time_spent"] += teams_summary[shift][ticket_id]["time_spent"]
-                
-                curr_family = teams_summary[shift][ticket_id]["family"]
-                curr_subfamily = teams_summary[shift][ticket_id]["subfamily"]
-                Utils.get_incidents_treated_in_shift(curr_family, curr_subfamily, teams_summary[shift][ticket_id]["time_spent"], incidents_performance)
+        for shift in team_statistics["shifts"]:
+            analysts_performance = {analyst: {"n_tickets": stats.count, "time_spent": stats.total} for analyst, stats in team_statistics["shifts"][shift]["analysts"].items()}
 
             # Analyst with more tickets fixed
             analyst_with_more_tickets_solved, max_tickets_solved = Utils.get_max_min_in_dict(analysts_performance, False, "n_tickets")
@@ -4158,11 +4795,11 @@ class Utils:
             print(f'The analyst with the best average time spent in shift {shift} is {best_average_time_spent_analyst} with {best_average_time_spent} minutes')
         
         family_average_time, subfamily_average_time = {}, {}
-        for family, subfamilies in incidents_performance.items():
+        for family, subfamilies in team_statistics["incidents"].items():
             family_total_time, family_total_tickets = 0, 0
-            for subfamily, data in subfamilies.items():
-                time_spent = data["time_spent"]
-                n_tickets = data["n_tickets"]
+            for subfamily, stats in subfamilies.items():
+                time_spent = stats.total
+                n_tickets = stats.count
                 family_total_time += time_spent
                 family_total_tickets += n_tickets
                 subfamily_average_time[subfamily] = time_spent / n_tickets if n_tickets > 0 else 0
@@ -0,0 +1,76 @@
+"""
+Created on Mon Oct 19 13:54:15 2026
+
+@author: agent
+@goal: Measures the import time of the generation modules (python -X importtime) and checks that optional libraries are not loaded
+"""
+
+import os, sys, json, argparse, subprocess
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MODULES = ["Code.Utils", "Code.Configurator", "Code.AnalystEmulation", "Code.Generator.TicketGenerator", "Code.Generator.DatasetGenerator"]
+OPTIONAL_LIBRARIES = ["PyQt5", "sklearn", "scipy", "matplotlib", "pendulum", "memory_profiler"]
+
+def measure_import(module):
+    """
+    Imports a module in a new interpreter with -X importtime.
+
+    Parameters
+    ----------
+    module : str
+        Module to import.
+
+    Returns
+    -------
+    dict
+        Total import time (ms), slowest imports and optional libraries loaded.
+
+    """
+    code = f'import sys, json, {module}; print(json.dumps(sorted({{m.split(".")[0] for m in sys.modules}} & set({OPTIONAL_LIBRARIES!r}))))'
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_PATH, capture_output=True, text=True)
+    if process.returncode != 0:
+        return {"error": process.stderr[-2000:]}
+
+    imports = []
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            imports.append((name.strip(), int(cumulative)))
+
+    # Top level imports are the ones without indentation in the package column
+    top_level = [line for line in process.stderr.splitlines() if line.startswith("import time:") and "|" in line and line.split("|")[2][1:2] != " " and "self [us]" not in line]
+    total = sum(int(line.split("|")[1]) for line in top_level)
+    slowest = sorted(imports, key=lambda x: x[1], reverse=True)[:10]
+    return {"total_ms": total / 1000, "slowest": [{"module": name, "cumulative_ms": cumulative / 1000} for name, cumulative in slowest],
+            "optional_loaded": json.loads(process.stdout.strip().splitlines()[-1])}
+
+def main():
+    """
+    Import benchmark handler.
+
+    Returns
+    -------
+    None.
+
+    """
+    parser = argparse.ArgumentParser(description="SNOOKER import time benchmark")
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--output", help="JSON file to store the results")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        results[module] = measure_import(module)
+        if "error" in results[module]:
+            print(f'{module}: failed\n{results[module]["error"]}')
+        else:
+            print(f'{module}: {results[module]["total_ms"]:.1f} ms, optional libraries loaded: {results[module]["optional_loaded"] or "none"}')
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
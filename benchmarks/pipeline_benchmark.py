@@ -0,0 +1,251 @@
+"""
+Created on Mon Oct 19 13:52:26 2026
+
+@author: agent
+@goal: Times each stage of the generation pipeline under fixed-seed scenarios and stores the results (JSON) for regression tracking
+"""
+
+import os, sys, json, argparse, itertools, subprocess, platform, copy, time
+from datetime import datetime
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_PATH)
+
+TICKETS_SCENARIOS = [10000, 100000, 1000000]
+TEAMS_SCENARIOS = [1, 3, 5]
+STAGES = ["get_families_probabilities", "generate_tickets", "generate_actions", "process_tickets", "output_dataset"]
+COUNTRIES_PATH = "Resources/Countries/Countries_updated.json"
+
+# Same output features as the interface (the subfamily action durations are included so that their computation is timed)
+OUTPUT_PARAMS = {'country': True, 'country time': False, 'raised_tsp': True, 'allocated_tsp': True, 'stages': True, 'client': True, 
+                 'team analysts': False, 'wait time': True, 'shifted': False, 'subfamily action duration': True, 
+                 'analysts available': False, 'analysts actions':False, 'analysts actions status': False, 
+                 'analyst shift': False, 'prioritized': False, 'escalate': True, 'coordinated': False, 'suspicious': False,
+                 'source ip': True, 'source port': True, 'destination ip': True, 'destination port': True, 'feature': True}
+
+def get_scenarios(tickets, teams, escalation, similarity):
+    """
+    Builds the scenarios grid.
+
+    Parameters
+    ----------
+    tickets : list
+        Number of tickets of each scenario.
+    teams : list
+        Number of teams of each scenario.
+    escalation : list
+        Escalation selector of each scenario.
+    similarity : list
+        Similarity selector of each scenario.
+
+    Returns
+    -------
+    scenarios : list
+        Scenarios to benchmark.
+
+    """
+    scenarios = []
+    for n_tickets, n_teams, escalate, similar in itertools.product(tickets, teams, escalation, similarity):
+        name = f'tickets_{n_tickets}-teams_{n_teams}-escalation_{"on" if escalate else "off"}-similarity_{"on" if similar else "off"}'
+        scenarios.append({"name": name, "n_tickets": n_tickets, "teams": n_teams, "escalation": escalate, "similarity": similar})
+    return scenarios
+
+def build_teams(analysts_info, n_teams):
+    """
+    Picks the first n teams of the configuration. Missing teams are cloned from the last team (with new analysts).
+
+    Parameters
+    ----------
+    analysts_info : dict
+        Teams and analysts of the configuration file.
+    n_teams : int
+        Number of teams required.
+
+    Returns
+    -------
+    teams : dict
+        Teams used in the scenario.
+
+    """
+    teams, names = {}, list(analysts_info.keys())
+    for idx in range(n_teams):
+        if idx < len(names):
+            teams[names[idx]] = copy.deepcopy(analysts_info[names[idx]])
+        else:
+            template = analysts_info[names[-1]]["analysts"]
+            teams[f'Team_{idx + 1}'] = {"analysts": {f'{analyst}_T{idx + 1}': copy.deepcopy(template[analyst]) for analyst in template}}
+    return teams
+
+def run_scenario(scenario, seed, countries_path):
+    """
+    Runs the generation pipeline of a scenario and times each stage.
+
+    Parameters
+    ----------
+    scenario : dict
+        Scenario to run.
+    seed : int
+        Seed value.
+    countries_path : str
+        Path leading to the file containing information about the countries.
+
+    Returns
+    -------
+    result : dict
+        Time spent by each stage and peak memory.
+
+    """
+    from Code.Configurator import Configurator
+    from Code.Generator.TicketGenerator import TicketGenerator
+    from Code.AnalystEmulation import AnalystEmulation
+    from Code.Utils import Utils
+
+    # The special steps are drawn at random, so the seed is set before they are instantiated
+    Utils.set_seed(seed)
+    _, generation_params, treatment_params, suspicious_countries = Configurator.load_configurations("Cybersecurity")
+    generation_params["seed"], generation_params["n_tickets"] = seed, scenario["n_tickets"]
+    generation_params["ticket_escalation_selector"] = scenario["escalation"]
+    treatment_params["ticket_similarity_selector"] = scenario["similarity"]
+    generation_params["suspicious_countries"] = suspicious_countries
+    generation_params["suspicious_ips"] = Configurator.get_suspicious_ips()
+    generation_params["special_steps"] = Configurator.instantiate_special_steps(generation_params['max_transfer_steps'])
+    generation_params["ticket_seasonality"], generation_params["family_seasonality"], generation_params["family_mean_duration"], generation_params["family_mapping"], generation_params["real_family_probs"], generation_params["real_dataset"] = None, None, None, None, None, None
+    generation_params["ticket_seasonality_selector"], generation_params["family_seasonality_selector"], generation_params["techniques_seasonality_selector"] = False, False, False
+    generation_params["analysts_skills"] = build_teams(generation_params["analysts_skills"], scenario["teams"])
+    countries = Configurator.get_countries_names(countries_path)
+    output_params = dict(OUTPUT_PARAMS)
+    os.makedirs("Output/Generation", exist_ok=True)
+
+    logger = Utils.create_log("Configurations/Cybersecurity", f'Benchmark_Log_{scenario["name"]}', False)
+    Utils.set_seed(seed)
+    shifts = Utils.split_day_shifts(int(generation_params["shifts"]))
+    generation_params["analysts_skills"], _ = Utils.reset_analysts_data(generation_params, shifts, logger)
+
+    stages = {}
+    ticket_generator = TicketGenerator(f'benchmark_{scenario["name"]}', generation_params, logger)
+
+    start = time.perf_counter()
+    ticket_generator.get_families_probabilities(False, generation_params, 10, 6)
+    stages["get_families_probabilities"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ticket_generator.generate_tickets(False, 20, countries, countries_path)
+    stages["generate_tickets"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ticket_generator.generate_actions(False, 5, True)
+    stages["generate_actions"] = time.perf_counter() - start
+
+    ticket_treatment = AnalystEmulation(ticket_generator._id, treatment_params, ticket_generator.analysts_info, ticket_generator.family_pool, ticket_generator.subfamily_pool, ticket_generator.family_steps_pool, ticket_generator.special_steps, shifts, ticket_generator.aux_data, seed)
+    start = time.perf_counter()
+    ticket_generator.tickets, family_subtechniques = ticket_treatment.process_tickets(False, 15, ticket_generator.tickets)
+    stages["process_tickets"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ticket_generator.output_dataset(False, 5, generation_params["format_selected_idx"], output_params, ticket_treatment.actions_similarity, shifts, None, False, None, None, family_subtechniques, "Benchmark", "real", ticket_treatment.statistics, ticket_treatment.snapshot_cutoffs)
+    stages["output_dataset"] = time.perf_counter() - start
+
+    total = sum(stages.values())
+    return {"scenario": scenario, "stages": stages, "total": total, "tickets_per_second": scenario["n_tickets"] / total if total else None, "peak_rss_mb": ticket_generator.aux_data.report.get_peak_memory()}
+
+def get_git_revision():
+    """
+    Gets the current git revision (if available).
+
+    Returns
+    -------
+    str
+        Commit hash.
+
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_PATH, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_results(baseline_file, current_file):
+    """
+    Compares the stage times of two benchmark reports (scenarios matched by name).
+
+    Parameters
+    ----------
+    baseline_file : str
+        Report used as reference.
+    current_file : str
+        Report being compared.
+
+    Returns
+    -------
+    None.
+
+    """
+    with open(baseline_file) as f:
+        baseline = {result["scenario"]["name"]: result for result in json.load(f)["results"] if "stages" in result}
+    with open(current_file) as f:
+        current = {result["scenario"]["name"]: result for result in json.load(f)["results"] if "stages" in result}
+
+    for name in current:
+        if name in baseline:
+            ratios = [f'{stage}: x{current[name]["stages"][stage] / baseline[name]["stages"][stage]:.2f}' for stage in STAGES if baseline[name]["stages"][stage] > 0]
+            print(f'{name}\n  ' + ", ".join(ratios) + f', peak RSS: {baseline[name]["peak_rss_mb"]:.1f} -> {current[name]["peak_rss_mb"]:.1f} MB')
+
+def main():
+    """
+    Benchmark handler. Each scenario runs in its own process so that the peak memory is not shared among scenarios.
+
+    Returns
+    -------
+    None.
+
+    """
+    parser = argparse.ArgumentParser(description="SNOOKER generation pipeline benchmark")
+    parser.add_argument("--tickets", type=int, nargs="+", default=TICKETS_SCENARIOS)
+    parser.add_argument("--teams", type=int, nargs="+", default=TEAMS_SCENARIOS)
+    parser.add_argument("--escalation", choices=["on", "off"], nargs="+", default=["on", "off"])
+    parser.add_argument("--similarity", choices=["on", "off"], nargs="+", default=["on", "off"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--countries", default=COUNTRIES_PATH, help="Countries file (not shipped with the repository)")
+    parser.add_argument("--output", default=os.path.join(ROOT_PATH, "benchmarks", "results"))
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compares two benchmark reports")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.compare:
+        compare_results(*args.compare)
+        return
+    
+    os.chdir(ROOT_PATH)
+    if not os.path.exists(args.countries):
+        parser.error(f'countries file {args.countries} not found (use --countries)')
+
+    if args.scenario:
+        # Child process: runs a single scenario and sends the result through stdout
+        result = run_scenario(json.loads(args.scenario), args.seed, args.countries)
+        print("BENCHMARK_RESULT " + json.dumps(result))
+        return
+
+    # The analysts order depends on the string hashes, so it is fixed in the scenario processes
+    scenarios = get_scenarios(args.tickets, args.teams, [e == "on" for e in args.escalation], [s == "on" for s in args.similarity])
+    results = []
+    for scenario in scenarios:
+        print(f'Running {scenario["name"]}')
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), "--scenario", json.dumps(scenario), "--seed", str(args.seed), "--countries", args.countries],
+                                 cwd=ROOT_PATH, capture_output=True, text=True, env=dict(os.environ, PYTHONHASHSEED=str(args.seed)))
+        lines = [line for line in process.stdout.splitlines() if line.startswith("BENCHMARK_RESULT ")]
+        if process.returncode != 0 or not lines:
+            print(f'Scenario {scenario["name"]} failed:\n{process.stderr[-2000:]}')
+            results.append({"scenario": scenario, "error": process.stderr[-2000:]})
+            continue
+        result = json.loads(lines[-1][len("BENCHMARK_RESULT "):])
+        print("  " + ", ".join(f'{stage}: {result["stages"][stage]:.2f}s' for stage in STAGES) + f', peak RSS: {result["peak_rss_mb"]:.1f} MB')
+        results.append(result)
+
+    os.makedirs(args.output, exist_ok=True)
+    report = {"created": datetime.now().isoformat(), "revision": get_git_revision(), "python": platform.python_version(), "platform": platform.platform(), "seed": args.seed, "results": results}
+    output_file = os.path.join(args.output, f'benchmark_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    with open(output_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f'Results saved in {output_file}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+Created on Mon Oct 19 13:50:35 2026
+
+@author: agent
+@goal: Shared fixtures of the smoke tests (the generator uses paths relative to the repository root)
+"""
+
+import os, sys
+import pytest
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+COUNTRIES_PATH = os.path.join(ROOT_PATH, "tests", "data", "Countries.json")
+sys.path.insert(0, ROOT_PATH)
+
+@pytest.fixture(autouse=True)
+def root_path(monkeypatch):
+    monkeypatch.chdir(ROOT_PATH)
+    return ROOT_PATH
@@ -0,0 +1,39 @@
+"""
+Created on Mon Oct 19 14:13:18 2026
+
+@author: agent
+@goal: Smoke tests of the analysts availability index
+"""
+
+from Code.AnalystAvailability import AnalystAvailability
+
+def get_analysts_info():
+    analysts = {"Analyst_1": {"shift": 0, "active": True, "fixed_tsp": 100.0}, "Analyst_2": {"shift": 0, "active": True, "fixed_tsp": 50.0},
+                "Analyst_3": {"shift": 0, "active": False, "fixed_tsp": 0.0}, "Analyst_4": {"shift": 1, "active": True, "fixed_tsp": 10.0}}
+    return {"L1": {"analysts": analysts}}
+
+def test_free_analysts_in_team_order():
+    analysts_info = get_analysts_info()
+    availability = AnalystAvailability(analysts_info)
+    assert availability.get_analysts("L1", 0) == ["Analyst_1", "Analyst_2"]
+    assert availability.get_analysts("L1", 2) == []
+
+    assert availability.get_free_analysts("L1", 0, 60.0) == ["Analyst_2"]
+    assert availability.get_free_analysts("L1", 0, 100.0) == ["Analyst_1", "Analyst_2"]
+    assert availability.get_min_endtime("L1", 0) == 50.0
+
+def test_update_analyst():
+    analysts_info = get_analysts_info()
+    availability = AnalystAvailability(analysts_info)
+    assert availability.get_free_analysts("L1", 0, 100.0) == ["Analyst_1", "Analyst_2"]
+
+    analysts_info["L1"]["analysts"]["Analyst_2"]["fixed_tsp"] = 200.0
+    availability.update_analyst("L1", "Analyst_2")
+    assert availability.get_free_analysts("L1", 0, 150.0) == ["Analyst_1"]
+    assert availability.get_min_endtime("L1", 0) == 100.0
+    # Timestamps may go back (pending tickets)
+    assert availability.get_free_analysts("L1", 0, 75.0) == []
+
+    analysts_info["L1"]["analysts"]["Analyst_1"]["fixed_tsp"] = 300.0
+    availability.reset_shift("L1", 0)
+    assert availability.get_free_analysts("L1", 0, 250.0) == ["Analyst_2"]
@@ -0,0 +1,22 @@
+"""
+Created on Mon Oct 19 14:18:08 2026
+
+@author: agent
+@goal: Smoke tests of the ticket treatment helpers
+"""
+
+import logging
+from types import SimpleNamespace
+from Code.AnalystEmulation import AnalystEmulation
+
+def test_snapshot_priority_queues_by_team():
+    emulation = SimpleNamespace(snapshot_cutoffs=[100.0], aux_data=SimpleNamespace(debug=False, logger=logging.getLogger("snapshot")),
+                                priority_queues={"L1": {1: {"tickets": [0, 1]}}, "L2": {3: {"tickets": [0]}}})
+    tickets_l1 = {0: {"raised_tsp": 50.0}, 1: {"raised_tsp": 150.0}}
+    # Both teams share the ticket dictionary to check that their snapshots do not overwrite each other
+    tickets_l2 = {0: tickets_l1[0]}
+
+    AnalystEmulation.snapshot_priority_queues(emulation, "L1", tickets_l1, 0)
+    AnalystEmulation.snapshot_priority_queues(emulation, "L2", tickets_l2, 0)
+    assert tickets_l1[0]["queue_priorities"] == {"L1": {0: 1}, "L2": {0: 3}}
+    assert "queue_priorities" not in tickets_l1[1]
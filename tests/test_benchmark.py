@@ -0,0 +1,16 @@
+"""
+Created on Mon Oct 19 13:52:26 2026
+
+@author: agent
+@goal: Smoke test of the generation pipeline (several teams with escalation) through the benchmark scenario runner
+"""
+
+from benchmarks.pipeline_benchmark import STAGES, run_scenario
+from conftest import COUNTRIES_PATH
+
+def test_run_scenario():
+    scenario = {"name": "smoke", "n_tickets": 300, "teams": 3, "escalation": True, "similarity": True}
+    result = run_scenario(scenario, 1, COUNTRIES_PATH)
+
+    assert set(result["stages"]) == set(STAGES)
+    assert result["total"] > 0 and result["peak_rss_mb"] > 0
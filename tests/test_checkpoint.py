@@ -0,0 +1,51 @@
+"""
+Created on Mon Oct 19 13:55:22 2026
+
+@author: agent
+@goal: Smoke tests of the stage checkpoints and of the shared stage cache
+"""
+
+import random
+from Code.Configurator import Configurator
+from Code.Checkpoint import Checkpoint, StageCache
+from conftest import COUNTRIES_PATH
+
+class Stage:
+    def __init__(self, _id, tickets):
+        self._id, self.tickets = _id, tickets
+
+def get_generation_params():
+    _, generation_params, _, suspicious_countries = Configurator.load_configurations("Cybersecurity")
+    generation_params["suspicious_countries"] = suspicious_countries
+    return generation_params
+
+def test_checkpoint_round_trip(tmp_path):
+    generation_params = get_generation_params()
+    checkpoint = Checkpoint(str(tmp_path), "gen", generation_params, {}, True)
+    random.seed(3)
+    checkpoint.save_stage("tickets", {"ticket_generator": Stage("gen", {0: "ticket"})}, {"n": 1})
+    expected = random.random()
+
+    restored = Stage("gen", {})
+    assert checkpoint.get_last_stage() == 1
+    assert checkpoint.load_stage("tickets", {"ticket_generator": restored}) == {"n": 1}
+    assert restored.tickets == {0: "ticket"} and random.random() == expected
+
+def test_stage_cache_keeps_run_id(tmp_path):
+    generation_params = get_generation_params()
+    countries = Configurator.get_countries_names(COUNTRIES_PATH)
+    cache = StageCache(str(tmp_path), generation_params, countries, COUNTRIES_PATH, 10, True)
+    cache.save_stage("actions", {"ticket_generator": Stage("first", {0: "ticket"})})
+
+    restored = Stage("second", {})
+    assert cache.has_stage("actions")
+    cache.load_stage("actions", {"ticket_generator": restored})
+    assert restored._id == "second" and restored.tickets == {0: "ticket"}
+
+def test_stage_cache_key_depends_on_countries(tmp_path):
+    generation_params = get_generation_params()
+    countries = Configurator.get_countries_names(COUNTRIES_PATH)
+    cache = StageCache(str(tmp_path), generation_params, countries, COUNTRIES_PATH, 10, True)
+
+    assert cache.key != StageCache(str(tmp_path), generation_params, countries[:1], COUNTRIES_PATH, 10, True).key
+    assert cache.key != StageCache(str(tmp_path), generation_params, countries, "Resources/Countries/Countries_updated.json", 10, True).key
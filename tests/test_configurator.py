@@ -0,0 +1,35 @@
+"""
+Created on Mon Oct 19 13:50:54 2026
+
+@author: agent
+@goal: Smoke tests of the configuration loading (suspicious IPs and input data storage)
+"""
+
+import ipaddress, json
+import numpy as np
+from Code.Configurator import Configurator
+from Code.Utils import Utils
+
+def test_get_suspicious_ips():
+    suspicious_ips = Configurator.get_suspicious_ips()
+    assert suspicious_ips["ips"].dtype == np.uint32
+    assert len(suspicious_ips["ips"]) == len(suspicious_ips["categories"])
+
+    with open(suspicious_ips["source"]) as f:
+        ip, category = f.readline().split("\t")[:2]
+    assert str(ipaddress.IPv4Address(int(suspicious_ips["ips"][0]))) == ip
+    assert suspicious_ips["labels"][suspicious_ips["categories"][0]] == category.strip()
+
+    # The second load comes from the cache
+    cached = Configurator.get_suspicious_ips()
+    assert np.array_equal(cached["ips"], suspicious_ips["ips"])
+
+def test_save_input_data_stores_suspicious_ips_by_reference(tmp_path):
+    generation_params = {"seed": 1, "suspicious_ips": Configurator.get_suspicious_ips()}
+    output_path = str(tmp_path / "Input_data.json")
+    Utils.save_input_data(output_path, generation_params, {})
+
+    with open(output_path) as f:
+        stored = json.load(f)
+    assert stored[0]["suspicious_ips"] == {"source": "Resources/Ips/bad_ips.txt", "count": len(generation_params["suspicious_ips"]["ips"])}
+    assert isinstance(generation_params["suspicious_ips"]["ips"], np.ndarray)
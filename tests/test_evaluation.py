@@ -0,0 +1,32 @@
+"""
+Created on Mon Oct 19 14:04:58 2026
+
+@author: agent
+@goal: Smoke tests of the real vs synthetic evaluation
+"""
+
+import math
+import pandas as pd
+from Code.Evaluation import DistributionHistograms, Evaluation
+
+def test_compare_distributions():
+    metrics = Evaluation.compare_distributions([1, 0], [0, 1], True)
+    assert metrics["total_variation"] == 1 and math.isclose(metrics["hellinger"], 1) and metrics["ks_statistic"] == 1
+    assert math.isclose(metrics["jensen_shannon"], math.log(2), rel_tol=1e-6)
+
+    metrics = Evaluation.compare_distributions([2, 6], [1, 3], True)
+    assert all(abs(value) < 1e-9 for value in metrics.values())
+    assert Evaluation.compare_distributions([0, 0], [1, 3], False) is None
+
+def test_evaluate_output_file(tmp_path):
+    dataset = pd.DataFrame({"raised": ["2020-04-01 05:51:35+00:00", "2020-04-02 17:55:34+00:00", "2020-05-12 05:48:42+00:00"],
+                            "family": ["A", "B", "A"], "duration": [5.5, 30.0, 12.0]})
+    filename = str(tmp_path / "Dataset.csv")
+    dataset.to_csv(filename, sep=";", index=False)
+    real = DistributionHistograms()
+    real.add(dataset["raised"].to_numpy(), dataset["family"].to_numpy(), dataset["duration"].to_numpy())
+
+    evaluation = Evaluation.evaluate_output_file(filename, real.get_histograms(), chunk_size=2)
+    assert evaluation["synthetic_histograms"] == real.get_histograms()
+    assert evaluation["synthetic_histograms"]["family"] == {"A": 2, "B": 1}
+    assert all(metrics["total_variation"] == 0 for metrics in evaluation["metrics"].values())
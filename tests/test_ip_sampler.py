@@ -0,0 +1,29 @@
+"""
+Created on Mon Oct 19 13:50:35 2026
+
+@author: agent
+@goal: Smoke tests of the batched IP sampling
+"""
+
+import ipaddress
+import numpy as np
+from Code.Utils import IpSampler
+
+def test_sample_addresses_in_networks():
+    sampler = IpSampler("IPv4Address", {"ips": np.array([1, 2], dtype=np.uint32)})
+    groups = [["10.0.0.0/30", "192.168.1.0/24"], ["172.16.5.4/32"]]
+    bases, sizes, offsets, counts = sampler.build_network_groups(groups)
+    assert offsets.tolist() == [0, 2] and counts.tolist() == [2, 1] and sizes.tolist() == [4, 256, 1]
+
+    np.random.seed(1)
+    groups_idx = np.array([0] * 500 + [1] * 10)
+    ips = sampler.format_ips(sampler.sample_addresses(groups_idx, bases, sizes, offsets, counts).tolist())
+    for ip, group in zip(ips, groups_idx):
+        assert any(ipaddress.IPv4Address(ip) in ipaddress.IPv4Network(network) for network in groups[group])
+    # Both networks of the first group are drawn
+    assert {ip.split(".")[0] for ip in ips[:500]} == {"10", "192"}
+
+def test_format_ips():
+    sampler = IpSampler("IPv4Address", {"ips": np.array([int(ipaddress.IPv4Address("141.98.10.179"))], dtype=np.uint32)})
+    assert sampler.format_ips(sampler.sample_suspicious(2).tolist() + ["---"]) == ["141.98.10.179", "141.98.10.179", "---"]
+    assert IpSampler("IPv6Address", {"ips": np.array([], dtype=np.uint32)}).format_ips([int(ipaddress.IPv4Address("10.0.0.1"))]) == ["2002::a00:1"]
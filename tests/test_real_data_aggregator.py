@@ -0,0 +1,36 @@
+"""
+Created on Mon Oct 19 14:03:05 2026
+
+@author: agent
+@goal: Smoke tests of the real data aggregation (the aggregates do not depend on the chunk size)
+"""
+
+import pandas as pd
+from Code.RealDataAggregator import RealDataAggregator
+
+def get_real_data():
+    steps = ["[1600000000, 1600000600]", "[1600003600, 1600003660, 1600004800]", "[1602600000, 1602601200]", "[1602700000]", "[1602800000, 1602800300]"]
+    return pd.DataFrame({"Family": ["A", "A", "B", "B", None], "Subfamily": ["A-1", "A-2", "B-1", "B-1", "A-1"], "Steps": steps})
+
+def aggregate(dataset, chunk_size):
+    aggregator = RealDataAggregator()
+    for start in range(0, len(dataset), chunk_size):
+        aggregator.add_chunk(dataset.iloc[start:start + chunk_size])
+    aggregator.finalize()
+    return aggregator
+
+def test_aggregates():
+    aggregator = aggregate(get_real_data(), 2)
+    # The ticket with a single step is removed and the null family is extracted from the subfamily
+    assert aggregator.removed == 1 and aggregator.n_tickets == 4
+    assert aggregator.get_families() == ["A", "B"]
+    assert aggregator.get_family_counts() == {"A": 3, "B": 1}
+    assert aggregator.families_info == {"A": ["A-1", "A-2"], "B": ["B-1"]}
+    assert aggregator.get_daily_tickets()["Ticket_count"].sum() == 4
+
+def test_aggregates_do_not_depend_on_chunks():
+    dataset = get_real_data()
+    single, chunked = aggregate(dataset, len(dataset)), aggregate(dataset, 1)
+    pd.testing.assert_frame_equal(single.get_family_distribution(), chunked.get_family_distribution())
+    pd.testing.assert_frame_equal(single.get_family_duration_distribution(), chunked.get_family_duration_distribution())
+    pd.testing.assert_frame_equal(single.get_daily_tickets(), chunked.get_daily_tickets())
@@ -0,0 +1,40 @@
+"""
+Created on Mon Oct 19 13:53:32 2026
+
+@author: agent
+@goal: Smoke tests of the run report (metrics collected along a generation with escalation)
+"""
+
+import json
+import Code.Utils
+from Code.RunReport import RunReport
+from benchmarks.pipeline_benchmark import run_scenario
+from conftest import COUNTRIES_PATH
+
+def test_report_metrics(tmp_path):
+    report = RunReport(True)
+    with report.span("stage", True):
+        report.count("tickets_processed", 2)
+    for value in [0, 3, 5]:
+        report.observe("ticket_duration", value)
+    report.save(str(tmp_path), "gen")
+
+    with open(tmp_path / "Generation_report_gen.json") as f:
+        saved = json.load(f)
+    assert saved["spans"]["stage"]["calls"] == 1 and "stage" in saved["memory"]
+    assert saved["counters"] == {"tickets_processed": 2}
+    assert saved["histograms"]["ticket_duration"]["buckets"] == {"0": 1, "4": 1, "8": 1}
+
+def test_report_enabled_generation(monkeypatch):
+    reports = []
+    def create_report(enabled, profiler=None):
+        reports.append(RunReport(True))
+        return reports[-1]
+    # The generation builds its own (disabled) report
+    monkeypatch.setattr(Code.Utils, "RunReport", create_report)
+
+    scenario = {"name": "report", "n_tickets": 300, "teams": 3, "escalation": True, "similarity": True}
+    run_scenario(scenario, 1, COUNTRIES_PATH)
+    built = reports[-1].build_report("report")
+    assert built["counters"]["tickets_processed"] == built["histograms"]["ticket_duration"]["count"]
+    assert built["counters"].get("replications", 0) > 0
@@ -0,0 +1,38 @@
+"""
+Created on Mon Oct 19 14:08:25 2026
+
+@author: agent
+@goal: Smoke tests of the shift lookups (uneven shifts and shifts crossing midnight)
+"""
+
+from datetime import datetime, time, timezone
+from Code.Utils import Utils, ShiftCalendar
+
+def get_tsp(day, hour, minute=0, second=0):
+    return datetime(2024, 3, day, hour, minute, second, tzinfo=timezone.utc).timestamp()
+
+def test_uneven_shifts():
+    # 5 shifts of 4h48m
+    shifts = Utils.split_day_shifts(5)
+    assert shifts.get_shift(get_tsp(10, 4, 47, 59)) == 0
+    assert shifts.get_shift(get_tsp(10, 4, 48)) == 1
+    assert shifts.get_shift(get_tsp(10, 23, 59, 59)) == 4
+
+    shift, start_tsp, end_tsp = shifts.get_shift_bounds(get_tsp(10, 10))
+    assert shift == 2 and start_tsp == get_tsp(10, 9, 36) and int(end_tsp) == get_tsp(10, 14, 23, 59)
+    assert shifts.get_next_shift_start(get_tsp(10, 10), 2) == (get_tsp(10, 14, 24), 3)
+    assert shifts.get_next_shift_start(get_tsp(10, 22), 4) == (get_tsp(11, 0), 0)
+
+def test_shifts_crossing_midnight():
+    shifts = ShiftCalendar({0: {"start": time(6), "end": time(13, 59, 59)}, 1: {"start": time(14), "end": time(21, 59, 59)}, 2: {"start": time(22), "end": time(5, 59, 59)}})
+    assert shifts.get_shift(get_tsp(10, 23)) == 2 and shifts.get_shift(get_tsp(11, 2)) == 2
+
+    # Before and after midnight, the night shift started in the 10th and ends in the 11th
+    for tsp in [get_tsp(10, 23), get_tsp(11, 2)]:
+        shift, start_tsp, end_tsp = shifts.get_shift_bounds(tsp)
+        assert (shift, start_tsp, end_tsp) == (2, get_tsp(10, 22), get_tsp(11, 5, 59, 59))
+        assert shifts.get_shift_end(tsp, 2) == get_tsp(11, 5, 59, 59)
+        assert shifts.get_next_shift_start(tsp, 2) == (get_tsp(11, 6), 0)
+
+    assert shifts.get_next_shift_start(get_tsp(10, 20), 1) == (get_tsp(10, 22), 2)
+    assert shifts.get_shift_end(get_tsp(10, 20), 1) == get_tsp(10, 21, 59, 59)
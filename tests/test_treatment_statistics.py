@@ -0,0 +1,35 @@
+"""
+Created on Mon Oct 19 14:07:23 2026
+
+@author: agent
+@goal: Smoke tests of the treatment statistics accumulated as the tickets close
+"""
+
+import math
+import numpy as np
+from Code.Utils import Utils
+from Code.TreatmentStatistics import RunningStats, TreatmentStatistics
+
+def test_running_stats():
+    values = [4.0, 7.5, 1.0, 12.25]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    assert math.isclose(stats.mean, np.mean(values)) and math.isclose(stats.get_std(), np.std(values))
+    assert (stats.min, stats.max, stats.count) == (1.0, 12.25, 4)
+
+def test_add_ticket():
+    # Shifts of 8 hours, 2024-03-10 00:00 UTC
+    statistics, day = TreatmentStatistics(Utils.split_day_shifts(3)), 1710028800
+    tickets = [{"raised_tsp": day + 3600, "allocated_tsp": day + 3600, "duration": 10},
+               {"raised_tsp": day + 3600, "allocated_tsp": day + 4200, "duration": 20},
+               {"raised_tsp": day + 7 * 3600, "allocated_tsp": day + 9 * 3600, "duration": 30},
+               {"raised_tsp": day + 23 * 3600, "allocated_tsp": day + 25 * 3600, "duration": 40}]
+    for ticket in tickets:
+        statistics.add_ticket(dict(ticket, team="L1", analyst="Analyst_1", family="A", subfamily="A_1", duration_outlier=ticket["duration"]))
+
+    team_statistics = statistics.teams["L1"]
+    assert statistics.tickets_number == 4 and statistics.get_tickets_shifted() == 3
+    assert team_statistics["scheduled"] == {"other_day": 1, "other_shift": 1, "others": 1}
+    assert math.isclose(statistics.wait_time.mean, (0 + 10 + 120 + 120) / 4)
+    assert team_statistics["incidents"]["A"]["A_1"].count == 4 and team_statistics["shifts"][0]["time_spent"].count == 3
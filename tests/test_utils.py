@@ -0,0 +1,73 @@
+"""
+Created on Mon Oct 19 13:51:28 2026
+
+@author: agent
+@goal: Smoke tests of the ticket helpers used during the generation and treatment
+"""
+
+import os, json
+import pytest
+import pandas as pd
+from Code.Utils import Utils
+
+def get_tickets(seconds):
+    # 2023-01-02 00:00:00 UTC plus the given seconds of the day
+    return [{"subfamily": "A_1", "country": "Portugal", "raised_tsp": 1672617600 + second} for second in seconds]
+
+def test_check_tickets_suspicious_sub_second_window():
+    windows = Utils.compile_suspicious_windows({"Portugal": {"start": "10:00:00.5", "end": "10:00:00.7"}})
+    tickets = get_tickets([36000.6, 36000.8, 3600, 80000])
+
+    suspicious = Utils.check_tickets_suspicious(tickets, {"A_1": {"suspicious": True}}, windows)
+    assert suspicious.tolist() == [True, False, False, False]
+
+def test_check_tickets_suspicious_window_crossing_midnight():
+    windows = Utils.compile_suspicious_windows({"Portugal": {"start": "22:00:00.0", "end": "02:00:00.0"}})
+    tickets = get_tickets([82800, 3600, 43200])
+
+    assert Utils.check_tickets_suspicious(tickets, {"A_1": {"suspicious": True}}, windows).tolist() == [True, True, False]
+    assert not Utils.check_tickets_suspicious(tickets, {"A_1": {"suspicious": False}}, windows).any()
+
+def get_output_data(ids):
+    columns = ["country", "client", "family", "subfamily", "team", "analyst", "status"]
+    return dict({"id": ids, "priority": [1] * len(ids), "init_priority": [1] * len(ids)}, **{column: ["---"] * len(ids) for column in columns})
+
+def test_format_generation_datasets_xlsx_append_writes_new_part(tmp_path, monkeypatch):
+    pytest.importorskip("xlsxwriter")
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("Output/Generation")
+
+    Utils.format_generation_datasets(get_output_data([0, 1]), "Tickets", 1, {}, {}, "Test")
+    Utils.wait_excel_writers()
+    Utils.format_generation_datasets(get_output_data([2]), "Tickets", 1, {}, {}, "Test", True)
+    Utils.wait_excel_writers()
+
+    assert pd.read_excel("Output/Generation/Tickets_Test.xlsx")["id"].tolist() == [0, 1]
+    assert pd.read_excel("Output/Generation/Tickets_Test_2.xlsx")["id"].tolist() == [2]
+
+def test_load_generator_data_restores_known_booleans(tmp_path):
+    input_path = str(tmp_path / "Generation_data.json")
+    with open(input_path, "w") as f:
+        json.dump([{"A": {"ip": "True", "subtypes": 2, "name": "False"}}, {}, {"A_1": {"suspicious": "False"}}, {}, {}], f)
+
+    family_pool, _, subfamily_pool, _, _ = Utils.load_generator_data(input_path)
+    assert family_pool["A"] == {"ip": True, "subtypes": 2, "name": "False"}
+    assert subfamily_pool["A_1"]["suspicious"] is False
+
+def test_check_next_existing_teams_sorts_replicated_tickets():
+    # Replicated tickets only carry epoch timestamps
+    tickets = {"L1": {}, "L2": {0: {"raised_tsp": 200.0}, 1: {"raised_tsp": 100.0}}}
+    assert not Utils.is_dict_sorted(tickets["L2"])
+
+    Utils.check_next_existing_teams(tickets, "L1")
+    assert [ticket["raised_tsp"] for ticket in tickets["L2"].values()] == [100.0, 200.0]
+
+def test_wait_excel_writers_raises_writer_errors(tmp_path, monkeypatch):
+    xlsxwriter = pytest.importorskip("xlsxwriter")
+    monkeypatch.chdir(tmp_path)
+    # The generation folder is missing, so the background writer fails
+    Utils.save_dataset(pd.DataFrame({"id": [0]}), "Tickets", 1, "Test")
+
+    with pytest.raises(xlsxwriter.exceptions.FileCreateError):
+        Utils.wait_excel_writers()
+    Utils.wait_excel_writers()